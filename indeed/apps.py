@@ -15,7 +15,7 @@ class IndeedConfig(AppConfig):
         output_base_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output')
 
         # List of subdirectories to create inside the output directory
-        subdirectories = ['pendingExtraction', 'completed', 'error']
+        subdirectories = ['pendingExtraction', 'completed', 'error', 'extracted', 'shards']
 
         # Create the base output directory
         try:
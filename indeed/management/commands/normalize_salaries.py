@@ -0,0 +1,44 @@
+# indeed/management/commands/normalize_salaries.py
+from django.core.management.base import BaseCommand
+
+from indeed.models import JobRecord
+from indeed.scripts.salary_parser import normalize_salaries
+
+
+class Command(BaseCommand):
+    help = "Re-normalize the salary columns of every JobRecord from its stored salary_raw text"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of records normalized and updated per batch")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        records = (
+            JobRecord.objects.exclude(salary_raw__isnull=True)
+            .only('id', 'salary_raw')
+            .order_by('id')
+        )
+
+        updated = 0
+        batch = []
+        for record in records.iterator(chunk_size=batch_size):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                updated += self.update_batch(batch)
+                batch = []
+        if batch:
+            updated += self.update_batch(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Normalized salaries of {updated} job records."))
+
+    def update_batch(self, batch):
+        # Parse each distinct salary string of the batch once
+        for record, salary in zip(batch, normalize_salaries([record.salary_raw for record in batch])):
+            record.min_salary = salary.min_salary
+            record.max_salary = salary.max_salary
+            record.fixed_salary = salary.min_salary if salary.min_salary == salary.max_salary else None
+            record.salary_unit = salary.salary_unit
+
+        JobRecord.objects.bulk_update(batch, ['min_salary', 'max_salary', 'fixed_salary', 'salary_unit'])
+        return len(batch)
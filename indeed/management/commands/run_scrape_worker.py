@@ -0,0 +1,71 @@
+# indeed/management/commands/run_scrape_worker.py
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from indeed.scripts.metrics import start_metrics_server
+from indeed.scripts.scrape_tasks import claim_next_task, run_task, scrape_tasks_config
+
+
+class Command(BaseCommand):
+    help = "Run queued scrape tasks, several at a time, on this process's warm browser pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Number of tasks run at the same time (defaults to the config value)")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds an idle worker waits before checking the queue again")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty instead of waiting for new tasks")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve this worker's scrape metrics in the Prometheus format on this port")
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or scrape_tasks_config['concurrency']
+        poll_interval = options['poll_interval'] or scrape_tasks_config['poll_interval']
+        worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.stdout.write(f"Worker {worker_name} running {concurrency} tasks at a time.")
+        if options['metrics_port']:
+            start_metrics_server(options['metrics_port'])
+
+        # Every slot claims and runs tasks on its own thread; the tasks share the browser pool
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{worker_name}:{slot}", poll_interval, options['once']),
+                name=f'scrape-worker-{slot}',
+                daemon=True,
+            )
+            for slot in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted, running tasks are claimed again once their lease runs out.")
+            return
+
+        self.stdout.write(self.style.SUCCESS("Task queue is empty."))
+
+    def work(self, worker_id, poll_interval, once):
+        try:
+            while True:
+                close_old_connections()
+                task = claim_next_task(worker_id)
+                if task is None:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                run_task(task)
+        finally:
+            connection.close()
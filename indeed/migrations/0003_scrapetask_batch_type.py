@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indeed', '0002_scrapetask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scrapetask',
+            name='task_type',
+            field=models.CharField(choices=[('scrape_job_ids', 'Scrape job IDs'), ('scrape_job_data', 'Scrape job data'), ('scrape_job_ids_batch', 'Scrape job IDs of a batch of searches')], max_length=50),
+        ),
+    ]
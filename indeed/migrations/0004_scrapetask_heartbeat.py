@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indeed', '0003_scrapetask_batch_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapetask',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
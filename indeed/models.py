@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models  # Django's native models
 from django.utils import timezone
 
@@ -31,3 +33,43 @@ class JobRecord(models.Model):
             models.Index(fields=['job_id'], name='job_id_index'),
             models.Index(fields=['scrape_session_id'], name='scrape_session_index'),
         ]
+
+
+class ScrapeTask(models.Model):
+    TASK_TYPES = [
+        ('scrape_job_ids', 'Scrape job IDs'),
+        ('scrape_job_data', 'Scrape job data'),
+        ('scrape_job_ids_batch', 'Scrape job IDs of a batch of searches'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    task_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    task_type = models.CharField(max_length=50, choices=TASK_TYPES)
+    params = models.JSONField(default=dict)  # Validated request data the task is run with
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_PENDING)
+    progress = models.JSONField(default=dict, blank=True)  # Counters updated while the task runs
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    worker_id = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # Renewed by the worker while the task runs
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.task_id} - {self.task_type} - {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='scrape_task_queue_index'),
+        ]
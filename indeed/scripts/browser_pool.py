@@ -0,0 +1,211 @@
+import asyncio
+import atexit
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from playwright.async_api import async_playwright
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+browser_pool_config = load_config('browser_pool')
+
+
+class BrowserPool:
+    """
+    Process-wide pool of warm Chromium browsers that hands out fresh contexts.
+
+    Playwright objects are bound to the event loop that created them, so the pool owns
+    a dedicated event loop running in a background thread. Scraping coroutines are
+    submitted to that loop with run(), and open contexts with new_context().
+    """
+
+    def __init__(self, max_browsers, max_contexts_per_browser, prelaunch, headless):
+        self.max_browsers = max_browsers
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.prelaunch = prelaunch
+        self.headless = headless
+
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._lock = None
+        # Launched browsers, the headless mode of each and the number of contexts it serves
+        self._browsers = []
+        self._browser_headless = {}
+        self._active_contexts = {}
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        # Start the event loop thread and pre-launch browsers, once per process
+        with self._start_lock:
+            if self._thread is not None:
+                return
+
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool', daemon=True)
+            self._thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+            except Exception:
+                # Leave the pool stopped so the next call can try again
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+                self._stop_loop()
+                raise
+            atexit.register(self.shutdown)
+
+    async def _start(self):
+        # Guards the pool state; waiters are woken whenever a context is released
+        self._lock = asyncio.Condition()
+        self._playwright = await async_playwright().start()
+        for _ in range(min(self.prelaunch, self.max_browsers)):
+            await self._launch_browser(self.headless)
+        logger.info(f"Browser pool started with {len(self._browsers)} pre-launched browser(s).")
+
+    def run(self, coroutine):
+        # Run a scraping coroutine on the pool's event loop and wait for its result
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._run(coroutine), self._loop).result()
+
+    async def _run(self, coroutine):
+        try:
+            return await coroutine
+        finally:
+            # Database calls made on this loop share one thread, so release its connection
+            await sync_to_async(close_old_connections)()
+
+    async def _launch_browser(self, headless):
+        logger.info(f"Launching pooled Chromium browser (headless={headless})...")
+        browser = await self._playwright.chromium.launch(headless=headless)
+        browser.on('disconnected', self._on_disconnected)
+        self._browsers.append(browser)
+        self._browser_headless[browser] = headless
+        self._active_contexts[browser] = 0
+        return browser
+
+    def _on_disconnected(self, browser):
+        # A crashed browser frees its place under the cap, so wake the requests waiting for one
+        self._discard_browser(browser)
+        asyncio.ensure_future(self._notify_waiters())
+
+    async def _notify_waiters(self):
+        async with self._lock:
+            self._lock.notify_all()
+
+    def _discard_browser(self, browser):
+        if browser in self._active_contexts:
+            logger.info("Removing browser from the pool.")
+            self._browsers.remove(browser)
+            del self._browser_headless[browser]
+            del self._active_contexts[browser]
+
+    def _is_healthy(self, browser, headless):
+        return browser.is_connected() and self._browser_headless[browser] == headless
+
+    async def _acquire_browser(self, headless):
+        async with self._lock:
+            while True:
+                # Health check: drop browsers whose process has gone away
+                for browser in list(self._browsers):
+                    if not browser.is_connected():
+                        self._discard_browser(browser)
+
+                candidates = [browser for browser in self._browsers if self._is_healthy(browser, headless)]
+                browser = min(candidates, key=self._active_contexts.get, default=None)
+
+                # Launch another browser when every matching one is busy and the cap allows it
+                busy = browser is None or self._active_contexts[browser] >= self.max_contexts_per_browser
+                if busy and len(self._browsers) < self.max_browsers:
+                    browser = await self._launch_browser(headless)
+                elif busy and browser is not None:
+                    # Every matching browser serves max_contexts_per_browser contexts and the pool
+                    # is full: wait for a context to close rather than going over the cap
+                    logger.info("Every pooled browser is at its context cap. Waiting for a context to close.")
+                    await self._lock.wait()
+                    continue
+                elif browser is None:
+                    # At the cap with no browser of the requested kind: recycle one that serves no
+                    # contexts, or wait for one to drain rather than closing pages in use
+                    idle = next((other for other in self._browsers if self._active_contexts[other] == 0), None)
+                    if idle is None:
+                        logger.info("Browser cap reached. Waiting for a pooled browser to drain to honour "
+                                    "the headless setting.")
+                        await self._lock.wait()
+                        continue
+                    logger.info("Browser cap reached. Replacing an idle pooled browser to honour the headless setting.")
+                    self._discard_browser(idle)
+                    await idle.close()
+                    browser = await self._launch_browser(headless)
+
+                self._active_contexts[browser] += 1
+                return browser
+
+    @asynccontextmanager
+    async def new_context(self, headless=None, **context_options):
+        # Hand out a fresh context on a pooled browser and close it when the caller is done
+        headless = self.headless if headless is None else headless
+        browser = await self._acquire_browser(headless)
+        try:
+            context = await browser.new_context(**context_options)
+        except Exception:
+            await self._release_browser(browser)
+            raise
+
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Failed to close browser context: {e}")
+            await self._release_browser(browser)
+
+    async def _release_browser(self, browser):
+        async with self._lock:
+            if browser in self._active_contexts:
+                self._active_contexts[browser] -= 1
+            self._lock.notify_all()
+
+    def shutdown(self):
+        # Close every browser and stop the event loop thread
+        with self._start_lock:
+            if self._thread is None:
+                return
+
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=30)
+            except Exception as e:
+                logger.error(f"Error shutting down browser pool: {e}")
+
+            self._stop_loop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+        self._thread = None
+        self._loop = None
+
+    async def _shutdown(self):
+        logger.info("Shutting down browser pool...")
+        for browser in list(self._browsers):
+            self._discard_browser(browser)
+            await browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Browser pool shut down.")
+
+
+browser_pool = BrowserPool(
+    max_browsers=browser_pool_config['max_browsers'],
+    max_contexts_per_browser=browser_pool_config['max_contexts_per_browser'],
+    prelaunch=browser_pool_config['prelaunch'],
+    headless=browser_pool_config['headless'],
+)
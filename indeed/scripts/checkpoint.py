@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import shutil
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def checkpoint_path(file_path):
+    # The checkpoint lives next to its job ID file; it does not end in .csv, so it is never taken as input
+    return f'{file_path}.checkpoint'
+
+
+def move_with_checkpoint(file_path, target_folder):
+    # Move a job ID file and, when there is one, its checkpoint
+    file_name = os.path.basename(file_path)
+    shutil.move(file_path, os.path.join(target_folder, file_name))
+    if os.path.exists(checkpoint_path(file_path)):
+        shutil.move(checkpoint_path(file_path), checkpoint_path(os.path.join(target_folder, file_name)))
+
+
+class ExtractionCheckpoint:
+    """
+    Durable record of which job IDs of a file have been extracted.
+
+    Outcomes are appended to a JSON-lines file as soon as each job finishes, so the record
+    survives a crash at any point. The latest line for a job ID wins; IDs without a line are
+    pending. Failed IDs are retried on resume, only done IDs are skipped. A run that does not
+    resume starts the checkpoint over, as it does its output file, so the two always describe
+    the same run.
+    """
+
+    def __init__(self, file_path, resume=True):
+        self.path = checkpoint_path(file_path)
+        self.statuses = {}
+
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a truncated last line
+                        logger.warning(f"Skipping unreadable line in checkpoint {self.path}")
+                        continue
+                    self.statuses[entry['job_id']] = entry['status']
+            logger.info(f"Loaded checkpoint {self.path} with {len(self.statuses)} job IDs.")
+
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def completed_ids(self):
+        return {job_id for job_id, status in self.statuses.items() if status == STATUS_DONE}
+
+    def record(self, job_id, status):
+        self.statuses[job_id] = status
+        self._file.write(json.dumps({'job_id': job_id, 'status': status}) + '\n')
+        self._file.flush()
+
+    def summary(self, job_ids):
+        counts = {STATUS_DONE: 0, STATUS_FAILED: 0, 'pending': 0}
+        for job_id in job_ids:
+            counts[self.statuses.get(job_id, 'pending')] += 1
+        return counts
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,38 @@
+import os
+from functools import lru_cache
+
+import yaml
+from django.core.exceptions import ImproperlyConfigured
+
+from data_scrapper import settings
+
+# The configuration every scraping module reads its section from
+config_path = os.path.join(settings.BASE_DIR, 'indeed', 'config.yaml')
+
+
+@lru_cache(maxsize=None)
+def read_config(path=config_path):
+    # The whole configuration file, parsed once per process
+    try:
+        with open(path, 'r') as config_file:
+            return yaml.safe_load(config_file) or {}
+    except FileNotFoundError as e:
+        raise ImproperlyConfigured(f"Configuration file not found: {path}") from e
+    except yaml.YAMLError as e:
+        raise ImproperlyConfigured(f"Error parsing YAML configuration {path}: {e}") from e
+
+
+def load_config(*keys):
+    """
+    Return the section of config.yaml found by following `keys`, e.g.
+    load_config('get_job_ids', 'defaults').
+
+    Raises ImproperlyConfigured when the file is missing or invalid or has no such section, so
+    a module fails on import rather than later on an undefined config name.
+    """
+    section = read_config()
+    for depth, key in enumerate(keys):
+        if not isinstance(section, dict) or key not in section:
+            raise ImproperlyConfigured(f"Section '{'.'.join(keys[:depth + 1])}' not found in {config_path}")
+        section = section[key]
+    return section
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import statistics
+import time
+
+import httpx
+
+from indeed.scripts.config import load_config
+from indeed.scripts.rate_control import BACKOFF_SIGNALS, block_reason
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+http_fetch_config = load_config('http_fetch')
+
+# HTTP/2 needs the optional h2 package; without it the client speaks HTTP/1.1 with keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def load_cookie_jar(cookies_file):
+    # Read the cookie export the browser sessions are seeded from into a cookie jar for the HTTP client
+    cookies = httpx.Cookies()
+    if not os.path.exists(cookies_file):
+        logger.warning(f"Cookies file {cookies_file} not found. Fetching without cookies.")
+        return cookies
+    with open(cookies_file, 'r') as f:
+        for cookie in json.load(f):
+            cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    return cookies
+
+
+class HttpFetcher:
+    """
+    Fetches pages over a pooled, keep-alive HTTP client instead of rendering them in a browser.
+
+    fetch() returns the page HTML, or None when the response is a block or CAPTCHA page, is
+    missing the required marker of a rendered page, or the request fails; the caller then
+    loads that page in the browser instead. Outcomes are counted per reason for stats().
+    """
+
+    def __init__(self, user_agent, cookies_file, timeout, max_connections, max_keepalive_connections,
+                 http2, required_marker, rate_controller=None):
+        self.required_marker = required_marker
+        self.rate_controller = rate_controller
+
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 is not installed. The HTTP client falls back to HTTP/1.1.")
+
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            headers={
+                'User-Agent': user_agent,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-CA,en;q=0.9',
+            },
+            cookies=load_cookie_jar(cookies_file),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+            follow_redirects=True,
+        )
+
+        # Counters and fetch timings in milliseconds
+        self.requests = 0
+        self.hits = 0
+        self.misses = {}
+        self.timings = []
+
+    @classmethod
+    def from_config(cls, user_agent, cookies_file, rate_controller=None):
+        return cls(
+            user_agent=user_agent,
+            cookies_file=cookies_file,
+            timeout=http_fetch_config['timeout'],
+            max_connections=http_fetch_config['max_connections'],
+            max_keepalive_connections=http_fetch_config['max_keepalive_connections'],
+            http2=http_fetch_config['http2'],
+            required_marker=http_fetch_config['required_marker'],
+            rate_controller=rate_controller,
+        )
+
+    def check_response(self, status_code, html):
+        # Return why a response cannot be used in place of a browser render, or None if it can.
+        # A page with the required marker is a job page, whatever else its markup mentions
+        reason = block_reason(status_code, html, self.required_marker)
+        if reason is not None:
+            return reason
+        if status_code >= 400:
+            return f'status_{status_code}'
+        if self.required_marker and self.required_marker not in html:
+            return 'incomplete'
+        return None
+
+    def _miss(self, reason):
+        self.misses[reason] = self.misses.get(reason, 0) + 1
+        return None
+
+    def _signal(self, url, reason):
+        # Block pages and timeouts slow the scraper down even when the browser fallback succeeds
+        if self.rate_controller is not None and reason in BACKOFF_SIGNALS:
+            self.rate_controller.record(url, reason)
+
+    async def fetch(self, url):
+        self.requests += 1
+        started = time.monotonic()
+        try:
+            response = await self._client.get(url)
+        except httpx.HTTPError as e:
+            logger.warning(f"HTTP fetch of {url} failed: {e}")
+            if isinstance(e, httpx.TimeoutException):
+                self._signal(url, 'timeout')
+            return self._miss('error')
+        self.timings.append((time.monotonic() - started) * 1000)
+
+        reason = self.check_response(response.status_code, response.text)
+        if reason is not None:
+            logger.info(f"HTTP fetch of {url} not usable ({reason}). Falling back to the browser.")
+            self._signal(url, reason)
+            return self._miss(reason)
+
+        self.hits += 1
+        return response.text
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self):
+        return {
+            'http2': self.http2,
+            'requests': self.requests,
+            'hits': self.hits,
+            'misses': dict(self.misses),
+            'hit_rate': round(self.hits / self.requests, 3) if self.requests else None,
+            'median_ms': round(statistics.median(self.timings), 1) if self.timings else None,
+        }
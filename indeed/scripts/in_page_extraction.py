@@ -0,0 +1,192 @@
+import json
+import logging
+
+from indeed.scripts.config import load_config
+from indeed.scripts.job_parser import INSIGHT_FIELDS
+from indeed.scripts.search_payload import JOBCARD_KEYS, search_payload_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+in_page_config = load_config('in_page_extraction')
+
+# Builds the same record as parse_job_page, or null when the page has no job description
+VIEWJOB_SCRIPT = """
+({selectors, insightFields}) => {
+    const first = (selector) => document.querySelector(selector);
+    const text = (element) => element ? element.textContent.trim() : 'N/A';
+
+    const description = first(selectors.description);
+    if (!description) {
+        return null;
+    }
+
+    // Like get_text(separator=' ', strip=True): the stripped text nodes, joined by spaces
+    const parts = [];
+    const walker = document.createTreeWalker(description, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        const part = walker.currentNode.nodeValue.trim();
+        if (part) {
+            parts.push(part);
+        }
+    }
+
+    const record = {
+        job_title: text(first(selectors.job_title)),
+        company_name: text(first(selectors.company_name)),
+        location: text(first(selectors.location)),
+        salary_raw: text(first(selectors.salary_raw)),
+        job_type: 'N/A',
+        shift_and_schedule: 'N/A',
+        apply_link: 'N/A',
+        external_apply: false,
+        job_description_html: description.innerHTML.trim().replace(/\\s+/g, ' ').trim(),
+        job_description_text: parts.join(' '),
+    };
+
+    // The first section with a given header wins. A section nested in another one is read on
+    // its own, so each section only reads the header and items outside its nested sections
+    const found = new Set();
+    const own = (section, selector) => Array.from(section.querySelectorAll(selector))
+        .filter((element) => element.parentElement.closest(selectors.insights) === section);
+    for (const section of document.querySelectorAll(selectors.insights)) {
+        const header = own(section, selectors.insights_header)[0];
+        const field = header ? insightFields[header.textContent.trim()] : undefined;
+        if (!field || found.has(field)) {
+            continue;
+        }
+        found.add(field);
+        const values = own(section, selectors.insights_item)
+            .map((item) => item.textContent.trim())
+            .filter((value) => value);
+        record[field] = values.length ? values.join(', ') : 'N/A';
+    }
+
+    if (first(selectors.easy_apply)) {
+        record.apply_link = 'Indeed Easy Apply';
+    } else {
+        const button = first(selectors.external_apply);
+        const href = button ? button.getAttribute('href') : null;
+        if (href) {
+            record.apply_link = href;
+            record.external_apply = true;
+        }
+    }
+    return record;
+}
+"""
+
+# Returns the job IDs of a results page in page order, without duplicates, its job count text,
+# and the embedded job cards payload cut down to the keys that are read, or null when the page
+# has none of them
+SEARCH_SCRIPT = """
+({jobLinks, jobLinkAttr, jobCount, provider, cardKeys}) => {
+    const jobIds = [];
+    for (const link of document.querySelectorAll(jobLinks)) {
+        const jobId = link.getAttribute(jobLinkAttr);
+        if (!jobIds.includes(jobId)) {
+            jobIds.push(jobId);
+        }
+    }
+    const count = document.querySelector(jobCount);
+
+    let jobcards = null;
+    const providerData = window.mosaic && window.mosaic.providerData;
+    const payload = providerData ? providerData[provider] : null;
+    const model = payload && payload.metaData ? payload.metaData.mosaicProviderJobCardsModel : null;
+    if (model && Array.isArray(model.results)) {
+        const pick = (card) => Object.fromEntries(cardKeys.map((key) => [key, card[key] === undefined ? null : card[key]]));
+        const tiers = Array.isArray(model.tierSummaries) ? model.tierSummaries : [];
+        jobcards = {metaData: {mosaicProviderJobCardsModel: {
+            results: model.results.map(pick),
+            tierSummaries: tiers.map((tier) => ({jobCount: tier.jobCount})),
+        }}};
+    }
+
+    if (!jobIds.length && !count && !jobcards) {
+        return null;
+    }
+    return {job_ids: jobIds, job_count_text: count ? count.textContent : null, jobcards: jobcards};
+}
+"""
+
+
+class InPageExtractor:
+    """
+    Reads the fields of viewjob and results pages inside the page, with page.evaluate.
+
+    Only a compact JSON record crosses the Playwright pipe, instead of the whole DOM returned
+    by page.content(), and nothing is parsed in Python. The selectors come from the
+    in_page_extraction section of config.yaml and mirror what parse_job_page and
+    parse_search_page look for. job_record() and search_results() return None when the page does
+    not hold what the selectors expect or the script fails; the caller then reads the HTML
+    and parses it with BeautifulSoup, which also tells a block page from an empty one.
+    """
+
+    def __init__(self, viewjob_selectors, search_selectors, enabled=True, metrics=None):
+        self.viewjob_selectors = viewjob_selectors
+        self.search_selectors = search_selectors
+        self.enabled = enabled
+        self.metrics = metrics
+
+        # Counters
+        self.records = 0
+        self.fallbacks = 0
+        self.bytes_received = 0
+
+    @classmethod
+    def from_config(cls, enabled=None, metrics=None):
+        return cls(
+            viewjob_selectors=in_page_config['viewjob'],
+            search_selectors=in_page_config['search'],
+            enabled=enabled if enabled is not None else in_page_config['enabled'],
+            metrics=metrics,
+        )
+
+    async def _evaluate(self, page, script, arg):
+        try:
+            result = await page.evaluate(script, arg)
+        except Exception as e:
+            logger.warning(f"In-page extraction failed on {page.url}: {e}. Parsing the page HTML instead.")
+            result = None
+
+        if result is None:
+            self.fallbacks += 1
+            if self.metrics is not None:
+                self.metrics.count('in_page_fallbacks')
+            return None
+
+        self.records += 1
+        size = len(json.dumps(result))
+        self.bytes_received += size
+        if self.metrics is not None:
+            self.metrics.count('bytes', size)
+        return result
+
+    async def job_record(self, page):
+        # The fields of parse_job_page, read from the rendered viewjob page
+        return await self._evaluate(page, VIEWJOB_SCRIPT, {
+            'selectors': self.viewjob_selectors,
+            'insightFields': INSIGHT_FIELDS,
+        })
+
+    async def search_results(self, page, job_count_class, job_link_data_attr):
+        # The job IDs, job count text and job cards payload of a rendered results page. A page
+        # with none of them is left to the HTML path, which tells an empty results page from a
+        # block page
+        return await self._evaluate(page, SEARCH_SCRIPT, {
+            'jobLinks': self.search_selectors['job_links'].format(job_link_data_attr=job_link_data_attr),
+            'jobLinkAttr': job_link_data_attr,
+            'jobCount': self.search_selectors['job_count'].format(job_count_class=job_count_class),
+            'provider': search_payload_config['provider'],
+            'cardKeys': JOBCARD_KEYS,
+        })
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'records': self.records,
+            'fallbacks': self.fallbacks,
+            'bytes_received': self.bytes_received,
+        }
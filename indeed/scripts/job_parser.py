@@ -0,0 +1,164 @@
+import logging
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+job_parser_config = load_config('job_parser')
+
+# lxml is optional: fall back to the built-in parser when it is not installed
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+INSIGHTS_HEADER_CLASS = 'js-match-insights-provider-11n8e9a e1tiznh50'
+INSIGHTS_ITEM_CLASS = 'js-match-insights-provider-tvvxwd ecydgvn1'
+EXTERNAL_APPLY_CLASS = 'css-1oxck4n e8ju0x51'
+
+# Record fields of the insights sections, by section header
+INSIGHT_FIELDS = {'Job type': 'job_type', 'Shift and schedule': 'shift_and_schedule'}
+
+
+def get_parser_backend(parser=None):
+    parser = parser or job_parser_config['parser']
+    if parser == 'lxml' and not LXML_AVAILABLE:
+        logger.warning("lxml is not installed. Falling back to html.parser.")
+        return 'html.parser'
+    return parser
+
+
+# Work out which field, if any, a tag holds. Called while parsing, when class is still a raw string
+def classify_tag(name, attrs):
+    classes = attrs.get('class') or []
+    if isinstance(classes, str):
+        classes = classes.split()
+
+    if name == 'div':
+        if attrs.get('id') == 'jobDescriptionText':
+            return 'description'
+        if 'js-match-insights-provider-e6s05i' in classes:
+            return 'insights'
+        if attrs.get('data-company-name') == 'true':
+            return 'company_name'
+        if attrs.get('data-testid') == 'inlineHeader-companyLocation':
+            return 'location'
+    elif name == 'h1' and 'jobsearch-JobInfoHeader-title' in classes:
+        return 'job_title'
+    elif name == 'span' and 'css-19j1a75' in classes:
+        return 'salary_raw'
+    elif name == 'button':
+        if attrs.get('id') == 'indeedApplyButton':
+            return 'easy_apply'
+        if ' '.join(classes) == EXTERNAL_APPLY_CLASS:
+            return 'external_apply'
+    return None
+
+
+# Only the subtrees holding job fields are built; the rest of the page is skipped while parsing
+JOB_FIELDS_STRAINER = SoupStrainer(lambda name, attrs: classify_tag(name, attrs) is not None)
+
+
+def child_tags(tag):
+    return [child for child in tag.contents if isinstance(child, Tag)]
+
+
+def parse_insights_section(section):
+    # Return the header and the listed values of a "Job type" / "Shift and schedule" section.
+    # Sections nested inside it are left out; they are read as sections of their own
+    header = None
+    values = []
+    stack = list(reversed(child_tags(section)))
+    while stack:
+        tag = stack.pop()
+        if classify_tag(tag.name, tag.attrs) == 'insights':
+            continue
+        tag_class = ' '.join(tag.get('class', []))
+        if tag.name == 'h3' and header is None and tag_class == INSIGHTS_HEADER_CLASS:
+            header = tag.text.strip()
+        elif tag.name == 'div' and tag_class == INSIGHTS_ITEM_CLASS:
+            value = tag.text.strip()
+            if value:
+                values.append(value)
+        stack.extend(reversed(child_tags(tag)))
+    return header, values
+
+
+def parse_job_page(html, parser=None):
+    """
+    Extract the fields of a viewjob page into a record, in a single pass over the page.
+
+    Pure function of the HTML: no browser or database access, so it can be benchmarked and
+    reused on cached pages. Missing fields are reported as 'N/A', like the CSV output.
+    'external_apply' tells the caller that 'apply_link' is an Indeed redirect to resolve.
+    """
+    soup = BeautifulSoup(html, get_parser_backend(parser), parse_only=JOB_FIELDS_STRAINER)
+
+    record = {
+        'job_title': 'N/A',
+        'company_name': 'N/A',
+        'location': 'N/A',
+        'salary_raw': 'N/A',
+        'job_type': 'N/A',
+        'shift_and_schedule': 'N/A',
+        'apply_link': 'N/A',
+        'external_apply': False,
+        'job_description_html': 'N/A',
+        'job_description_text': 'N/A',
+    }
+    found = set()
+    external_apply_link = None
+
+    # The strained document only holds the subtrees of the wanted elements. They are walked in
+    # document order, so an element nested in another matching one is classified too; only the
+    # job description, which is kept whole, is not looked into
+    stack = list(reversed(child_tags(soup)))
+    while stack:
+        tag = stack.pop()
+        field = classify_tag(tag.name, tag.attrs)
+
+        if field == 'insights':
+            header, values = parse_insights_section(tag)
+            field = INSIGHT_FIELDS.get(header)
+            if field and field not in found:
+                found.add(field)
+                record[field] = ', '.join(values) if values else 'N/A'
+            stack.extend(reversed(child_tags(tag)))
+            continue
+
+        if field == 'description':
+            if field not in found:
+                found.add(field)
+                # Preserve the description formatting (HTML) and also keep it as plain text
+                record['job_description_html'] = WHITESPACE_RE.sub(' ', tag.decode_contents().strip()).strip()
+                record['job_description_text'] = tag.get_text(separator=' ', strip=True)
+            continue
+
+        stack.extend(reversed(child_tags(tag)))
+
+        # Like find(), the first matching element of each field wins
+        if field is None or field in found:
+            continue
+        found.add(field)
+
+        if field == 'external_apply':
+            external_apply_link = tag.get('href')
+        elif field != 'easy_apply':
+            record[field] = tag.text.strip()
+
+    # Determine the apply link type
+    if 'easy_apply' in found:
+        record['apply_link'] = "Indeed Easy Apply"
+    elif external_apply_link:
+        record['apply_link'] = external_apply_link
+        record['external_apply'] = True
+
+    return record
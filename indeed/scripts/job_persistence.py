@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.utils import timezone
+
+from indeed.models import JobRecord
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+job_persistence_config = load_config('job_persistence')
+
+# JobRecord columns filled in from a viewjob page
+DETAIL_FIELDS = [
+    'job_url',
+    'job_title',
+    'company_name',
+    'location',
+    'salary_raw',
+    'min_salary',
+    'max_salary',
+    'fixed_salary',
+    'salary_unit',
+    'job_type',
+    'shift_and_schedule',
+    'apply_link',
+    'job_description_text',
+    'job_description_html',
+    'retrieved_date',
+]
+
+# Columns an upsert may overwrite; retrieved_date keeps the time a job was first stored
+UPSERT_FIELDS = [field for field in DETAIL_FIELDS if field != 'retrieved_date']
+# Columns parsed from one salary text, always updated together so they never disagree
+SALARY_FIELDS = ['salary_raw', 'min_salary', 'max_salary', 'fixed_salary', 'salary_unit']
+
+CENTS = Decimal('0.01')
+# Largest value that fits the DecimalField(max_digits=10, decimal_places=2) salary columns
+MAX_SALARY_VALUE = Decimal('99999999.99')
+
+
+def to_salary_decimal(value):
+    if value is None:
+        return None
+    value = Decimal(value).quantize(CENTS)
+    if value > MAX_SALARY_VALUE:
+        logger.warning(f"Salary value {value} does not fit the salary columns. Storing it as empty.")
+        return None
+    return value
+
+
+def build_job_record(job, scrape_session_id, retrieved_date):
+    # Convert an extracted job into a JobRecord, storing 'N/A' placeholders as NULL
+    values = {field: (None if job.get(field) == 'N/A' else job.get(field)) for field in DETAIL_FIELDS}
+    values['min_salary'] = to_salary_decimal(values['min_salary'])
+    values['max_salary'] = to_salary_decimal(values['max_salary'])
+    if values['min_salary'] is not None and values['min_salary'] == values['max_salary']:
+        values['fixed_salary'] = values['min_salary']
+    values['retrieved_date'] = retrieved_date
+
+    # Trim text that would overflow its column rather than failing the whole batch
+    for field in DETAIL_FIELDS:
+        max_length = JobRecord._meta.get_field(field).max_length
+        if max_length and isinstance(values[field], str) and len(values[field]) > max_length:
+            values[field] = values[field][:max_length]
+
+    return JobRecord(
+        job_id=job['job_id'],
+        source='Indeed',
+        status='Active',
+        scrape_session_id=scrape_session_id,
+        **values,
+    )
+
+
+def present_fields(record):
+    # The upsert columns a record has values for; a column the page did not show stays as stored
+    fields = [field for field in UPSERT_FIELDS
+              if field not in SALARY_FIELDS and getattr(record, field) is not None]
+    if any(getattr(record, field) is not None for field in SALARY_FIELDS):
+        fields.extend(SALARY_FIELDS)
+    return tuple(fields)
+
+
+def save_job_details(jobs, scrape_session_id):
+    # Upsert a batch of extracted jobs: new job IDs are inserted, existing ones get the detail
+    # columns the new record has values for and keep their original session, source, status
+    # and retrieved date. Records with the same set of values share one query
+    retrieved_date = timezone.now()
+    groups = {}
+    for job in jobs:
+        record = build_job_record(job, scrape_session_id, retrieved_date)
+        groups.setdefault(present_fields(record), []).append(record)
+
+    # MySQL upserts on any unique key, other backends need the conflicting column named
+    unique_fields = ['job_id'] if connection.features.supports_update_conflicts_with_target else None
+    for fields, records in groups.items():
+        if not fields:
+            # Nothing to update an existing row with
+            JobRecord.objects.bulk_create(records, ignore_conflicts=True)
+            continue
+        JobRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            update_fields=list(fields),
+            unique_fields=unique_fields,
+        )
+    return len(jobs)
+
+
+class JobDetailPersister:
+    """
+    Background stage that writes extracted jobs to JobRecord in batches.
+
+    Scraping workers hand jobs over with put(), which never waits on the database. A single
+    consumer task collects them into batches of batch_size, or whatever has arrived after
+    flush_interval seconds, and upserts each batch from a worker thread.
+    """
+
+    def __init__(self, scrape_session_id, batch_size=None, flush_interval=None, metrics=None):
+        self.scrape_session_id = scrape_session_id
+        self.metrics = metrics
+        self.batch_size = batch_size or job_persistence_config['batch_size']
+        self.flush_interval = flush_interval or job_persistence_config['flush_interval']
+
+        self._queue = asyncio.Queue()
+        self._task = None
+
+        # Counters and per-batch timings in milliseconds
+        self.records_saved = 0
+        self.records_failed = 0
+        self.batch_timings = []
+
+    def start(self):
+        self._task = asyncio.create_task(self._consume())
+
+    def put(self, job):
+        self._queue.put_nowait(job)
+
+    async def close(self):
+        # Flush what is left and wait for the consumer to finish
+        self._queue.put_nowait(None)
+        await self._task
+
+    async def _consume(self):
+        finished = False
+        while not finished:
+            job = await self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+
+            # Fill the batch until it is full or the flush interval has passed
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), max(0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if job is None:
+                    finished = True
+                    break
+                batch.append(job)
+
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch):
+        started = time.monotonic()
+        try:
+            self.records_saved += await sync_to_async(save_job_details)(batch, self.scrape_session_id)
+        except Exception as e:
+            self.records_failed += len(batch)
+            if self.metrics is not None:
+                self.metrics.count('db_write_failures', len(batch))
+            logger.error(f"Failed to save a batch of {len(batch)} job records: {e}")
+            return
+
+        elapsed = time.monotonic() - started
+        if self.metrics is not None:
+            self.metrics.observe('db_write', elapsed)
+        elapsed_ms = elapsed * 1000
+        self.batch_timings.append(round(elapsed_ms, 1))
+        logger.info(f"Saved a batch of {len(batch)} job records in {elapsed_ms:.1f} ms")
+
+    def stats(self):
+        return {
+            'records_saved': self.records_saved,
+            'records_failed': self.records_failed,
+            'batches': len(self.batch_timings),
+            'batch_ms': list(self.batch_timings),
+        }
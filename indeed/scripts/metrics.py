@@ -0,0 +1,263 @@
+import bisect
+import logging
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+metrics_config = load_config('metrics')
+
+
+def format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def drain(self):
+        # Hand over the values counted so far and start again from zero
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for label_values, value in values.items():
+                self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = sorted(buckets)
+        # Per label set: a count per bucket (the last one is +Inf), the sum and the count
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            bucket_counts, total, count = self._values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0, 0))
+            bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[label_values] = (bucket_counts, total + value, count + 1)
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in values.items():
+                own_counts, own_total, own_count = self._values.get(
+                    label_values, ([0] * (len(self.buckets) + 1), 0.0, 0))
+                self._values[label_values] = ([own + other for own, other in zip(own_counts, bucket_counts)],
+                                              own_total + total, own_count + count)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + [float('inf')], bucket_counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    labels = format_labels(self.label_names, label_values, [('le', le)])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = format_labels(self.label_names, label_values)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def drain(self):
+        # Counter and histogram values observed since the last drain, keyed by metric name. Gauges
+        # describe the process holding them and are left out
+        return {metric.name: metric.drain() for metric in self._metrics if isinstance(metric, (Counter, Histogram))}
+
+    def merge(self, drained):
+        # Add the values drained from the registry of another process, e.g. a shard worker
+        for metric in self._metrics:
+            if metric.name in drained:
+                metric.merge(drained[metric.name])
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'indeed_scrape_stage_seconds',
+    'Time spent in each stage of a scrape.',
+    label_names=['scraper', 'stage'],
+    buckets=metrics_config['buckets'],
+))
+
+SCRAPE_EVENTS = registry.register(Counter(
+    'indeed_scrape_events_total',
+    'Pages, failures, retries and bytes counted by the scrapers.',
+    label_names=['scraper', 'event'],
+))
+
+RATE_CONCURRENCY = registry.register(Gauge(
+    'indeed_rate_control_concurrency',
+    'Number of requests the adaptive rate controller currently lets run at the same time.',
+    label_names=['scraper'],
+))
+
+RATE_IN_FLIGHT = registry.register(Gauge(
+    'indeed_rate_control_in_flight',
+    'Requests currently running under the adaptive rate controller.',
+    label_names=['scraper'],
+))
+
+RATE_HOST_RPS = registry.register(Gauge(
+    'indeed_rate_control_requests_per_second',
+    'Refill rate of the token bucket of each host.',
+    label_names=['scraper', 'host'],
+))
+
+
+class ScrapeMetrics:
+    """
+    Stage timings and counters of one scrape run.
+
+    Every observation also feeds the process-wide histograms and counters of the metrics
+    endpoint; summary() condenses the run's own observations for its JSON response.
+    """
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def time(self, stage):
+        # Time a stage, whether it succeeds or raises
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - started)
+
+    def observe(self, stage, seconds):
+        self.timings.setdefault(stage, []).append(seconds)
+        STAGE_SECONDS.observe(seconds, self.scraper, stage)
+
+    def count(self, event, amount=1):
+        self.counters[event] = self.counters.get(event, 0) + amount
+        SCRAPE_EVENTS.inc(self.scraper, event, amount=amount)
+
+    def summary(self):
+        stages = {}
+        for stage, timings in self.timings.items():
+            ordered = sorted(timings)
+            stages[stage] = {
+                'count': len(ordered),
+                'total_ms': round(sum(ordered) * 1000, 1),
+                'mean_ms': round(statistics.mean(ordered) * 1000, 1),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+            }
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+
+def merge_summaries(summaries):
+    # Combine the summaries of several runs; percentiles cannot be combined and are left out
+    stages = {}
+    counters = {}
+    for summary in summaries:
+        for stage, timing in summary['stages'].items():
+            merged = stages.setdefault(stage, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            merged['count'] += timing['count']
+            merged['total_ms'] = round(merged['total_ms'] + timing['total_ms'], 1)
+            merged['max_ms'] = max(merged['max_ms'], timing['max_ms'])
+        for event, value in summary['counters'].items():
+            counters[event] = counters.get(event, 0) + value
+    for merged in stages.values():
+        merged['mean_ms'] = round(merged['total_ms'] / merged['count'], 1) if merged['count'] else 0.0
+    return {'stages': stages, 'counters': counters}
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    # Serve the registry over HTTP from a background thread, for processes without the web app
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Serving metrics on {host}:{port}")
+    return server
@@ -0,0 +1,78 @@
+import logging
+import re
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+network_filter_config = load_config('network_filter')
+
+
+class ResourceBlocker:
+    """
+    Request interception layer that aborts requests the scrapers do not need.
+
+    Rules come from the network_filter section of config.yaml. A request is blocked when its
+    resource type or URL matches a deny rule, unless its URL matches an allow pattern. The
+    response size of a blocked request is never known, so bytes saved is an estimate based on
+    a typical size per resource type.
+    """
+
+    def __init__(self, enabled, block_resource_types, block_url_patterns, allow_url_patterns,
+                 estimated_bytes):
+        self.enabled = enabled
+        self.block_resource_types = set(block_resource_types)
+        self.block_url_patterns = [re.compile(pattern) for pattern in block_url_patterns]
+        self.allow_url_patterns = [re.compile(pattern) for pattern in allow_url_patterns]
+        self.estimated_bytes = estimated_bytes
+
+        # Counters for this blocker's lifetime (one scrape run)
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.estimated_bytes_saved = 0
+        self.blocked_by_type = {}
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            enabled=network_filter_config['enabled'],
+            block_resource_types=network_filter_config['block_resource_types'],
+            block_url_patterns=network_filter_config['block_url_patterns'],
+            allow_url_patterns=network_filter_config['allow_url_patterns'],
+            estimated_bytes=network_filter_config['estimated_bytes'],
+        )
+
+    def should_block(self, url, resource_type):
+        if any(pattern.search(url) for pattern in self.allow_url_patterns):
+            return False
+        if resource_type in self.block_resource_types:
+            return True
+        return any(pattern.search(url) for pattern in self.block_url_patterns)
+
+    async def attach(self, context):
+        # Route every request made by pages of this context through the filter
+        if self.enabled:
+            await context.route('**/*', self._handle_route)
+
+    async def _handle_route(self, route):
+        request = route.request
+        resource_type = request.resource_type
+
+        if self.should_block(request.url, resource_type):
+            self.blocked_requests += 1
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            self.estimated_bytes_saved += self.estimated_bytes.get(resource_type, self.estimated_bytes['other'])
+            await route.abort()
+        else:
+            self.allowed_requests += 1
+            await route.continue_()
+
+    def stats(self):
+        return {
+            'blocked_requests': self.blocked_requests,
+            'allowed_requests': self.allowed_requests,
+            'estimated_bytes_saved': self.estimated_bytes_saved,
+            'blocked_by_type': dict(self.blocked_by_type),
+        }
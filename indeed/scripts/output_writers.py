@@ -0,0 +1,91 @@
+import csv
+import io
+import logging
+import os
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+output_writers_config = load_config('output_writers')
+
+
+class StreamingCsvWriter:
+    """
+    CSV writer that streams rows to disk as they are produced.
+
+    Rows are encoded into an in-memory buffer that is written out and flushed as soon as it
+    holds buffer_limit_bytes, so memory stays flat however many rows a run produces and a
+    crash only loses the rows still in the buffer. In append mode the header is only written
+    when the file is new or empty. on_flush, if given, is called after each flush, once the
+    rows written so far are on disk.
+    """
+
+    def __init__(self, path, fieldnames, buffer_limit_bytes=None, append=False, on_flush=None):
+        self.path = path
+        self.buffer_limit_bytes = buffer_limit_bytes or output_writers_config['buffer_limit_bytes']
+        self.on_flush = on_flush
+        self.rows_written = 0
+
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self._file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=fieldnames)
+        if write_header:
+            self._writer.writeheader()
+
+    def writerow(self, row):
+        self._writer.writerow(row)
+        self.rows_written += 1
+        if self._buffer.tell() >= self.buffer_limit_bytes:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer.getvalue())
+        self._file.flush()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        if self.on_flush:
+            self.on_flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OrderedRowEmitter:
+    """
+    Hands rows to a writer in submission order when they are produced out of order.
+
+    Concurrent workers submit (index, row) pairs; rows are held only until every earlier index
+    has been submitted. A row of None marks an index that produced nothing.
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self._next_index = 0
+        self._pending = {}
+
+    def submit(self, index, row):
+        self._pending[index] = row
+        while self._next_index in self._pending:
+            row = self._pending.pop(self._next_index)
+            if row is not None:
+                self._write(row)
+            self._next_index += 1
+
+    def drain(self):
+        # Write whatever is still held back, for indexes that will never be submitted
+        for index in sorted(self._pending):
+            row = self._pending.pop(index)
+            if row is not None:
+                self._write(row)
@@ -0,0 +1,207 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from data_scrapper import settings
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+page_cache_config = load_config('page_cache')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (url, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+class PageCache:
+    """
+    Local cache of raw page HTML, keyed by URL and fetch time.
+
+    Each snapshot is gzipped into a file named after the SHA-256 of its HTML, so a page that
+    has not changed between fetches is stored once. An SQLite index maps (url, fetched_at)
+    to the blobs. evict() drops snapshots older than the TTL, then the oldest ones until the
+    blobs fit in max_bytes. A disabled cache stores nothing and never hits.
+
+    Compression, file I/O and index writes block, so scrapers call aput() and aget(), which
+    run them on a worker thread instead of the event loop shared by every scrape. close()
+    leaves eviction to a background thread, so it never holds up the end of a request.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds, max_bytes, compress_level=6, enabled=True):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.enabled = enabled
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+        self._db = None
+        self._lock = threading.Lock()
+        if enabled:
+            os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+            # One connection per cache, used from whichever thread the scraper runs on
+            self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), timeout=30,
+                                       check_same_thread=False)
+            self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, enabled=None):
+        return cls(
+            cache_dir=os.path.join(settings.BASE_DIR, page_cache_config['cache_dir']),
+            ttl_seconds=page_cache_config['ttl_days'] * 86400,
+            max_bytes=page_cache_config['max_size_mb'] * 1024 * 1024,
+            compress_level=page_cache_config['compress_level'],
+            enabled=enabled if enabled is not None else page_cache_config['enabled'],
+        )
+
+    def blob_path(self, sha256):
+        return os.path.join(self.cache_dir, 'blobs', sha256[:2], f'{sha256}.html.gz')
+
+    def put(self, url, html, fetched_at=None):
+        if not self.enabled:
+            return
+        content = html.encode('utf-8')
+        sha256 = hashlib.sha256(content).hexdigest()
+        fetched_at = fetched_at or time.time()
+
+        path = self.blob_path(sha256)
+        with self._lock:
+            if os.path.exists(path):
+                size = os.path.getsize(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = gzip.compress(content, compresslevel=self.compress_level)
+                # Write under a temporary name so a crash never leaves a truncated blob
+                temp_path = f'{path}.{os.getpid()}.tmp'
+                with open(temp_path, 'wb') as blob_file:
+                    blob_file.write(compressed)
+                os.replace(temp_path, path)
+                size = len(compressed)
+                self.bytes_written += size
+
+            with self._db:
+                self._db.execute('INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)', (sha256, size))
+                self._db.execute('INSERT OR REPLACE INTO pages (url, fetched_at, sha256) VALUES (?, ?, ?)',
+                                 (url, fetched_at, sha256))
+        self.writes += 1
+
+    async def aput(self, url, html, fetched_at=None):
+        if self.enabled:
+            await asyncio.to_thread(self.put, url, html, fetched_at)
+
+    def get(self, url, before=None):
+        # Return the HTML of the latest snapshot of url, or of the latest one fetched before
+        # the given time, or None when there is none
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sha256 FROM pages WHERE url = ? AND fetched_at <= ? ORDER BY fetched_at DESC LIMIT 1',
+                (url, before if before is not None else float('inf')),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        try:
+            with gzip.open(self.blob_path(row[0]), 'rb') as blob_file:
+                html = blob_file.read().decode('utf-8')
+        except FileNotFoundError:
+            logger.warning(f"Cached page for {url} is missing its blob {row[0]}.")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    async def aget(self, url, before=None):
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, url, before)
+
+    def evict(self):
+        # Drop expired snapshots, then the oldest ones until the blobs fit in max_bytes
+        if not self.enabled:
+            return 0
+        with self._lock, self._db:
+            evicted = self._db.execute('DELETE FROM pages WHERE fetched_at < ?',
+                                       (time.time() - self.ttl_seconds,)).rowcount
+            self._collect_garbage()
+
+            while self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0] > self.max_bytes:
+                deleted = self._db.execute(
+                    'DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY fetched_at LIMIT 100)'
+                ).rowcount
+                if not deleted:
+                    break
+                evicted += deleted
+                self._collect_garbage()
+
+        if evicted:
+            logger.info(f"Evicted {evicted} cached pages.")
+        return evicted
+
+    def _collect_garbage(self):
+        # Remove the blobs no snapshot refers to anymore
+        orphans = self._db.execute(
+            'SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM pages)'
+        ).fetchall()
+        for (sha256,) in orphans:
+            try:
+                os.remove(self.blob_path(sha256))
+            except FileNotFoundError:
+                pass
+        self._db.execute('DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM pages)')
+
+    def close(self, evict=True):
+        if self._db is None:
+            return
+        if evict:
+            threading.Thread(target=self._evict_and_close, name='page-cache-evict', daemon=True).start()
+        else:
+            self._close_db()
+
+    def _evict_and_close(self):
+        try:
+            self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache eviction failed: {e}")
+        finally:
+            self._close_db()
+
+    def _close_db(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'bytes_written': self.bytes_written,
+        }
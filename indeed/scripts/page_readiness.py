@@ -0,0 +1,76 @@
+import logging
+import statistics
+import time
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+page_readiness_config = load_config('page_readiness')
+
+
+class PageReadiness:
+    """
+    Navigates pages and decides they are ready once a key selector is present.
+
+    Each page type ('search', 'viewjob') has its own strategy in the page_readiness section of
+    config.yaml: the load state to navigate with, the selector that marks the data as rendered,
+    and a fallback load state to wait for when the selector never shows up. Every wait is timed
+    so the run can report how long pages took to become ready.
+    """
+
+    def __init__(self, page_types):
+        self.page_types = page_types
+        # Wait durations in milliseconds and outcome counts, per page type
+        self.wait_times = {page_type: [] for page_type in page_types}
+        self.outcomes = {page_type: {} for page_type in page_types}
+
+    @classmethod
+    def from_config(cls):
+        return cls(page_readiness_config)
+
+    async def goto(self, page, url, page_type, timeout, selector=None):
+        strategy = self.page_types[page_type]
+        selector = selector or strategy['selector']
+        started = time.monotonic()
+
+        response = await page.goto(url, wait_until=strategy['wait_until'], timeout=timeout)
+
+        try:
+            await page.wait_for_selector(selector, state='attached', timeout=strategy['selector_timeout'])
+            outcome = 'selector'
+        except PlaywrightTimeoutError:
+            logger.warning(f"Selector '{selector}' not found on {url}. Falling back to '{strategy['fallback']}'.")
+            outcome = 'fallback'
+            if strategy['fallback']:
+                try:
+                    await page.wait_for_load_state(strategy['fallback'], timeout=strategy['fallback_timeout'])
+                except PlaywrightTimeoutError:
+                    # Parse whatever has rendered so far rather than dropping the page
+                    logger.warning(f"Fallback wait timed out on {url}.")
+                    outcome = 'timeout'
+
+        self._record(page_type, outcome, (time.monotonic() - started) * 1000)
+        return response
+
+    def _record(self, page_type, outcome, elapsed_ms):
+        self.wait_times[page_type].append(elapsed_ms)
+        outcomes = self.outcomes[page_type]
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def stats(self):
+        summary = {}
+        for page_type, wait_times in self.wait_times.items():
+            if not wait_times:
+                continue
+            summary[page_type] = {
+                'pages': len(wait_times),
+                'median_ms': round(statistics.median(wait_times), 1),
+                'max_ms': round(max(wait_times), 1),
+                'outcomes': dict(self.outcomes[page_type]),
+            }
+        return summary
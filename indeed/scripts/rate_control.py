@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from indeed.scripts.config import load_config
+from indeed.scripts.metrics import RATE_CONCURRENCY, RATE_HOST_RPS, RATE_IN_FLIGHT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+rate_control_config = load_config('rate_control')
+
+# Signals on which the controller backs off
+BACKOFF_SIGNALS = {'rate_limited', 'blocked', 'timeout'}
+
+
+class BlockedPageError(Exception):
+    """Raised when a page comes back as a rate limit, block or CAPTCHA page instead of content."""
+
+    def __init__(self, url, reason):
+        super().__init__(f"{url} returned a {reason} page")
+        self.reason = reason
+
+
+def block_reason(status_code, html, expected_marker=None):
+    # Return 'rate_limited' or 'blocked' when a response is a block page, or None. A page that
+    # holds the expected content is never taken for a block page because of its markup
+    if status_code == 429:
+        return 'rate_limited'
+    if status_code in rate_control_config['block_statuses']:
+        return 'blocked'
+    if expected_marker and expected_marker in html:
+        return None
+    lowered = html.lower()
+    if any(marker in lowered for marker in rate_control_config['block_markers']):
+        return 'blocked'
+    return None
+
+
+def classify_exception(exception):
+    # Map a failed request to the signal the rate controller reacts to
+    if isinstance(exception, BlockedPageError):
+        return exception.reason
+    if isinstance(exception, (PlaywrightTimeoutError, httpx.TimeoutException, asyncio.TimeoutError)):
+        return 'timeout'
+    return 'error'
+
+
+class TokenBucket:
+    """Hands out requests at `rate` per second, allowing bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveRateController:
+    """
+    AIMD control of how many requests a scraper runs at once and how fast it hits each host.
+
+    Requests run inside slot(url), which waits until fewer than `concurrency` requests are in
+    flight and for a token from the bucket of the URL's host. The outcome of every request is
+    passed to record(): after `success_window` healthy responses in a row the concurrency and
+    the host's rate grow additively, and a 429, block page or timeout multiplies both by
+    `multiplicative_decrease`. Back-off signals arriving within `cooldown_seconds` of a
+    decrease come from the same overload and do not cut again. The state is published to the
+    rate control gauges of the metrics endpoint. A disabled controller never holds requests.
+    """
+
+    def __init__(self, scraper, max_concurrency, initial_concurrency, min_concurrency, additive_increase,
+                 success_window, multiplicative_decrease, initial_rate, min_rate, max_rate, rate_increase,
+                 burst, cooldown_seconds, enabled=True, metrics=None):
+        self.scraper = scraper
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.additive_increase = additive_increase
+        self.success_window = success_window
+        self.multiplicative_decrease = multiplicative_decrease
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_increase = rate_increase
+        self.burst = burst
+        self.cooldown_seconds = cooldown_seconds
+        self.metrics = metrics
+
+        self.concurrency = float(min(initial_concurrency, max_concurrency)) if enabled else float(max_concurrency)
+        self.in_flight = 0
+        self.buckets = {}
+        self._waiters = []
+        self._successes = 0
+        self._last_decrease = float('-inf')
+
+        # Counters
+        self.signals = {}
+        self.decreases = 0
+        self._publish()
+
+    @classmethod
+    def from_config(cls, scraper, max_concurrency, enabled=None, metrics=None):
+        return cls(
+            scraper=scraper,
+            max_concurrency=max_concurrency,
+            initial_concurrency=rate_control_config['initial_concurrency'],
+            min_concurrency=rate_control_config['min_concurrency'],
+            additive_increase=rate_control_config['additive_increase'],
+            success_window=rate_control_config['success_window'],
+            multiplicative_decrease=rate_control_config['multiplicative_decrease'],
+            initial_rate=rate_control_config['initial_rate'],
+            min_rate=rate_control_config['min_rate'],
+            max_rate=rate_control_config['max_rate'],
+            rate_increase=rate_control_config['rate_increase'],
+            burst=rate_control_config['burst'],
+            cooldown_seconds=rate_control_config['cooldown_seconds'],
+            enabled=enabled if enabled is not None else rate_control_config['enabled'],
+            metrics=metrics,
+        )
+
+    def _bucket(self, host):
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.initial_rate, self.burst)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, url):
+        if not self.enabled:
+            yield
+            return
+
+        while self.in_flight >= int(self.concurrency):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+        self._publish()
+        try:
+            await self._bucket(urlparse(url).netloc).acquire()
+            yield
+        finally:
+            self.in_flight -= 1
+            self._publish()
+            self._wake()
+
+    def _wake(self):
+        # Let every waiting request check again for a free slot
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def record(self, url, signal):
+        self.signals[signal] = self.signals.get(signal, 0) + 1
+        if signal in BACKOFF_SIGNALS and self.metrics is not None:
+            self.metrics.count(signal)
+        if not self.enabled:
+            return
+
+        bucket = self._bucket(urlparse(url).netloc)
+        if signal == 'ok':
+            self._successes += 1
+            if self._successes >= self.success_window:
+                self._successes = 0
+                self.concurrency = min(self.max_concurrency, self.concurrency + self.additive_increase)
+                bucket.rate = min(self.max_rate, bucket.rate + self.rate_increase)
+                self._wake()
+        elif signal in BACKOFF_SIGNALS:
+            self._successes = 0
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown_seconds:
+                self._last_decrease = now
+                self.decreases += 1
+                self.concurrency = max(self.min_concurrency, self.concurrency * self.multiplicative_decrease)
+                bucket.rate = max(self.min_rate, bucket.rate * self.multiplicative_decrease)
+                logger.warning(f"Backing off after a {signal} response from {url}: concurrency "
+                               f"{self.concurrency:.1f}, {bucket.rate:.2f} requests/sec.")
+        self._publish()
+
+    def _publish(self):
+        RATE_CONCURRENCY.set(int(self.concurrency), self.scraper)
+        RATE_IN_FLIGHT.set(self.in_flight, self.scraper)
+        for host, bucket in self.buckets.items():
+            RATE_HOST_RPS.set(round(bucket.rate, 3), self.scraper, host)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'concurrency': int(self.concurrency),
+            'max_concurrency': self.max_concurrency,
+            'requests_per_second': {host: round(bucket.rate, 3) for host, bucket in self.buckets.items()},
+            'signals': dict(self.signals),
+            'decreases': self.decreases,
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+
+from indeed.scripts.config import load_config
+from indeed.scripts.http_fetcher import load_cookie_jar
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+apply_redirects_config = load_config('apply_redirects')
+
+
+class RedirectCache:
+    """
+    Bounded LRU cache of resolved redirect links, whose entries expire after ttl_seconds.
+
+    It is shared by every scrape run of the process, so links seen by an earlier run are not
+    followed again.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            final_url, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return final_url
+
+    def put(self, url, final_url):
+        with self._lock:
+            self._entries[url] = (final_url, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+redirect_cache = RedirectCache(
+    max_entries=apply_redirects_config['cache_size'],
+    ttl_seconds=apply_redirects_config['cache_ttl_hours'] * 3600,
+)
+
+
+class ApplyLinkResolver:
+    """
+    Resolves the Indeed redirect links of external apply buttons to the employer's URL.
+
+    The redirect chain is followed with plain HTTP requests whose bodies are never read, so
+    the employer site is not rendered. At most `concurrency` links are followed at a time, on
+    a client of their own, apart from the page fetches. Resolved links are kept in the
+    process-wide redirect cache, and concurrent lookups of the same link share one request.
+    When a link cannot be followed, resolve() returns it unchanged.
+    """
+
+    def __init__(self, user_agent, cookies_file, concurrency, timeout, max_redirects, cache=None, metrics=None):
+        self.cache = cache if cache is not None else redirect_cache
+        self.metrics = metrics
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight = {}
+        self._client = httpx.AsyncClient(
+            headers={
+                'User-Agent': user_agent,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            },
+            cookies=load_cookie_jar(cookies_file),
+            timeout=timeout,
+            follow_redirects=True,
+            max_redirects=max_redirects,
+        )
+
+        # Counters
+        self.resolved = 0
+        self.cache_hits = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, user_agent, cookies_file, metrics=None):
+        return cls(
+            user_agent=user_agent,
+            cookies_file=cookies_file,
+            concurrency=apply_redirects_config['concurrency'],
+            timeout=apply_redirects_config['timeout'],
+            max_redirects=apply_redirects_config['max_redirects'],
+            metrics=metrics,
+        )
+
+    async def resolve(self, url):
+        final_url = self.cache.get(url)
+        if final_url is not None:
+            self.cache_hits += 1
+            return final_url
+
+        # Share the request of a lookup of the same link that is already running
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._follow(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await task
+
+    async def _follow(self, url):
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                # Only the headers of the last response are read
+                async with self._client.stream('GET', url) as response:
+                    final_url = str(response.url)
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
+                logger.warning(f"Could not resolve apply link {url}: {e}. Keeping the redirect link.")
+                self.failures += 1
+                if self.metrics is not None:
+                    self.metrics.count('apply_redirect_failures')
+                return url
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe('apply_redirect', time.monotonic() - started)
+
+        self.cache.put(url, final_url)
+        self.resolved += 1
+        return final_url
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self):
+        return {
+            'resolved': self.resolved,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'cache_entries': len(self.cache),
+        }
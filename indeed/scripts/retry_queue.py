@@ -0,0 +1,117 @@
+import asyncio
+import csv
+import logging
+import os
+import random
+
+from data_scrapper import settings
+from indeed.scripts.config import load_config
+from indeed.scripts.rate_control import classify_exception
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+retry_config = load_config('retries')
+
+# Failed job ID files are written here, in the format of the files in pendingExtraction
+error_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output', 'error')
+
+
+class RetryQueue:
+    """
+    Failures of the main pass of a scrape, retried once that pass is done.
+
+    add() records a failed item with the reason code of its exception. drain() retries every
+    item up to max_attempts times, each attempt after an exponential backoff with jitter, with
+    at most `concurrency` attempts running at a time. Items still failing after that are left
+    in failures() with their last reason and number of attempts.
+    """
+
+    def __init__(self, max_attempts, base_delay, max_delay, jitter, metrics=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.metrics = metrics
+        # Failed items by key: [item, reason, attempts]
+        self._failed = {}
+
+        # Counters
+        self.retried = 0
+        self.recovered = 0
+
+    @classmethod
+    def from_config(cls, enabled=True, metrics=None):
+        return cls(
+            max_attempts=retry_config['max_attempts'] if enabled else 0,
+            base_delay=retry_config['base_delay'],
+            max_delay=retry_config['max_delay'],
+            jitter=retry_config['jitter'],
+            metrics=metrics,
+        )
+
+    def add(self, key, item, exception):
+        self._failed[key] = [item, classify_exception(exception), 1]
+
+    def delay(self, attempt):
+        # Exponential backoff, spread by up to +/- jitter so retries do not arrive in a burst
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def drain(self, retry, concurrency):
+        # Retry the failed items with retry(item, slot), which raises when the item fails
+        # again; slot is a number below concurrency that no other running attempt holds
+        slots = asyncio.Queue()
+        for slot in range(concurrency):
+            slots.put_nowait(slot)
+
+        async def attempt(key, entry, number):
+            await asyncio.sleep(self.delay(number))
+            slot = await slots.get()
+            self.retried += 1
+            if self.metrics is not None:
+                self.metrics.count('retries')
+            try:
+                await retry(entry[0], slot)
+            except Exception as e:
+                logger.warning(f"Retry {number} of {key} failed: {e}")
+                entry[1] = classify_exception(e)
+                entry[2] += 1
+            else:
+                del self._failed[key]
+                self.recovered += 1
+            finally:
+                slots.put_nowait(slot)
+
+        for number in range(1, self.max_attempts + 1):
+            if not self._failed:
+                break
+            logger.info(f"Retrying {len(self._failed)} failed items, attempt {number} of {self.max_attempts}...")
+            await asyncio.gather(*(attempt(key, entry, number) for key, entry in list(self._failed.items())))
+
+    def failures(self):
+        return [(key, item, reason, attempts) for key, (item, reason, attempts) in self._failed.items()]
+
+    def stats(self):
+        reasons = {}
+        for _, reason, _ in self._failed.values():
+            reasons[reason] = reasons.get(reason, 0) + 1
+        return {
+            'retried': self.retried,
+            'recovered': self.recovered,
+            'failed': len(self._failed),
+            'reasons': reasons,
+        }
+
+
+def write_error_file(file_name, fieldnames, rows):
+    # Write rows that still failed to the error folder and return the file's path
+    os.makedirs(error_dir, exist_ok=True)
+    path = os.path.join(error_dir, file_name)
+    with open(path, 'w', newline='', encoding='utf-8') as error_file:
+        writer = csv.writer(error_file)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+    logger.info(f"Wrote {len(rows)} failed items to {path}")
+    return path
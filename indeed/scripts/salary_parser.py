@@ -0,0 +1,135 @@
+import logging
+import re
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+salary_parser_config = load_config('salary_parser')
+
+# A dollar amount with decimals and an optional thousands suffix, e.g. "$22.50" or "$80K"
+SALARY_AMOUNT = r'\$([\d,]+(?:\.\d+)?)(?:\s*([kK])(?![a-zA-Z]))?'
+# Salary range, e.g. "$50,000–$60,000 a year" or "$60K–$70K a year" (multi-word units are captured)
+SALARY_RANGE_RE = re.compile(
+    SALARY_AMOUNT + r'\s*[–-]\s*' + SALARY_AMOUNT + r'\s*(?:per\s+|an?\s+)?([a-zA-Z\s]*)',
+    re.IGNORECASE
+)
+# Single salary, e.g. "$22.50 an hour", "From $20 an hour" or "Up to $80K a year"
+SALARY_FIXED_RE = re.compile(
+    r'(?:\b(from|up\s+to)\s+)?' + SALARY_AMOUNT + r'\s*(?:per\s+|an?\s+)?([a-zA-Z\s]*)',
+    re.IGNORECASE
+)
+
+# Map raw units to standardized units; earlier keywords win when several appear in the raw unit
+SALARY_UNITS = {
+    'year': 'year',
+    'annually': 'year',
+    'month': 'month',
+    'monthly': 'month',
+    'week': 'week',
+    'weekly': 'week',
+    'day': 'day',
+    'daily': 'day',
+    'hour': 'hour',
+    'hourly': 'hour',
+    'per hour': 'hour',
+    'per year': 'year',
+    'per month': 'month',
+    'per week': 'week',
+    'per day': 'day'
+}
+
+# Number of pay periods in a year, used to annualize salaries
+ANNUAL_MULTIPLIERS = {
+    'year': Decimal(1),
+    'month': Decimal(12),
+    'week': Decimal(52),
+    'day': Decimal(260),
+    'hour': Decimal(2080),
+}
+
+CENTS = Decimal('0.01')
+THOUSAND = Decimal(1000)
+
+SalaryInfo = namedtuple('SalaryInfo', ['min_salary', 'max_salary', 'salary_unit', 'annual_min', 'annual_max'])
+
+NO_SALARY = SalaryInfo(None, None, None, None, None)
+
+
+@lru_cache(maxsize=256)
+def normalize_salary_unit(salary_unit_raw):
+    # Most raw units are a bare keyword, so try a direct lookup before the substring scan
+    unit = SALARY_UNITS.get(salary_unit_raw)
+    if unit:
+        return unit
+    for keyword, unit in SALARY_UNITS.items():
+        if keyword in salary_unit_raw:
+            return unit
+    return 'other'
+
+
+def annualize(amount, salary_unit):
+    multiplier = ANNUAL_MULTIPLIERS.get(salary_unit)
+    if amount is None or multiplier is None:
+        return None
+    return (amount * multiplier).quantize(CENTS)
+
+
+def to_amount(digits, suffix):
+    amount = Decimal(digits.replace(',', ''))
+    return amount * THOUSAND if suffix else amount
+
+
+def _normalize_salary(salary_text):
+    """
+    Parse a raw salary string such as "$50,000–$60,000 a year" into a SalaryInfo.
+
+    Amounts are Decimals; every field is None when the text holds no recognizable salary.
+    "From $20 an hour" only sets the minimum and "Up to $80K a year" only the maximum.
+    The result is cached on the raw text, so repeated strings are only parsed once.
+    """
+    if not salary_text or salary_text == 'N/A':
+        return NO_SALARY
+
+    range_match = SALARY_RANGE_RE.search(salary_text)
+    if range_match:
+        min_salary = to_amount(range_match.group(1), range_match.group(2))
+        max_salary = to_amount(range_match.group(3), range_match.group(4))
+        salary_unit_raw = range_match.group(5).strip().lower()
+    else:
+        fixed_match = SALARY_FIXED_RE.search(salary_text)
+        if not fixed_match:
+            logger.warning(f"Unrecognized salary text '{salary_text}'.")
+            return NO_SALARY
+        bound = (fixed_match.group(1) or '').lower()
+        amount = to_amount(fixed_match.group(2), fixed_match.group(3))
+        min_salary = None if bound.startswith('up') else amount
+        max_salary = None if bound == 'from' else amount
+        salary_unit_raw = fixed_match.group(4).strip().lower()
+
+    salary_unit = normalize_salary_unit(salary_unit_raw)
+    if salary_unit == 'other':
+        # Log unrecognized units for further analysis
+        logger.warning(f"Unrecognized salary unit '{salary_unit_raw}' in salary text '{salary_text}'.")
+
+    return SalaryInfo(
+        min_salary=min_salary,
+        max_salary=max_salary,
+        salary_unit=salary_unit,
+        annual_min=annualize(min_salary, salary_unit),
+        annual_max=annualize(max_salary, salary_unit),
+    )
+
+
+normalize_salary = lru_cache(maxsize=salary_parser_config['cache_size'])(_normalize_salary)
+
+
+def normalize_salaries(salary_texts):
+    # Normalize many salary strings at once, parsing each distinct string a single time
+    normalized = {text: normalize_salary(text) for text in set(salary_texts)}
+    return [normalized[text] for text in salary_texts]
@@ -1,19 +1,62 @@
 import asyncio
 import logging
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 import csv
-import re
+from contextlib import AsyncExitStack
 from playwright_stealth import stealth_async
-import json
 import os
 import random
+import uuid
+from datetime import datetime
 from data_scrapper import settings
+from indeed.scripts.config import load_config
+from indeed.scripts.browser_pool import browser_pool
+from indeed.scripts.network_filter import ResourceBlocker
+from indeed.scripts.page_readiness import PageReadiness
+from indeed.scripts.in_page_extraction import InPageExtractor
+from indeed.scripts.job_parser import parse_job_page
+from indeed.scripts.salary_parser import normalize_salary
+from indeed.scripts.output_writers import StreamingCsvWriter, OrderedRowEmitter
+from indeed.scripts.checkpoint import ExtractionCheckpoint, STATUS_DONE, STATUS_FAILED
+from indeed.scripts.job_persistence import JobDetailPersister
+from indeed.scripts.http_fetcher import HttpFetcher
+from indeed.scripts.page_cache import PageCache
+from indeed.scripts.redirect_resolver import ApplyLinkResolver
+from indeed.scripts.rate_control import AdaptiveRateController, BlockedPageError, block_reason, classify_exception
+from indeed.scripts.retry_queue import RetryQueue, write_error_file
+from indeed.scripts.session_state import RotatingContexts
+from indeed.scripts.metrics import ScrapeMetrics
+from indeed.models import JobRecord
+from asgiref.sync import sync_to_async
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+job_data_config = load_config('get_job_data', 'defaults')
+
+# Extracted job data is written to one CSV per input file in this directory
+output_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output', 'extracted')
+
+# Columns of the job data CSV
+JOB_DATA_FIELDNAMES = [
+    'Job URL',
+    'Job Title',
+    'Company Name',
+    'Location',
+    'Salary Text',
+    'Min Salary',
+    'Max Salary',
+    'Salary Unit',
+    'Job Type',
+    'Shift and Schedule',
+    'Apply Link',
+    'Job Description',
+    'Job Description Text'
+]
+
+# Every rendered viewjob page holds the job description; a page without it may be a block page
+VIEWJOB_CONTENT_MARKER = 'id="jobDescriptionText"'
+
 USER_AGENT_POOL = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)'
     ' Chrome/91.0.4472.124 Safari/537.36',
@@ -27,18 +70,6 @@ USER_AGENT_POOL = [
     ' Chrome/91.0.4472.124 Safari/537.36',
 ]
 
-# Function to load cookies from JSON file and ensure correct sameSite attribute
-async def load_cookies(page, cookies_file):
-    logger.info(f"Loading cookies from {cookies_file}...")
-    with open(cookies_file, 'r') as f:
-        cookies = json.load(f)
-        for cookie in cookies:
-            if 'sameSite' in cookie and cookie['sameSite'] not in ['Strict', 'Lax', 'None']:
-                logger.warning(f"Invalid sameSite value '{cookie['sameSite']}' for cookie '{cookie['name']}'. Setting to 'Lax'.")
-                cookie['sameSite'] = 'Lax'  # Set to a default valid value like 'Lax'
-        await page.context.add_cookies(cookies)
-    logger.info("Cookies loaded successfully.")
-
 # Function to read job IDs from the CSV file
 def read_job_ids_from_file(file_path):
     job_ids = []
@@ -52,196 +83,403 @@ def read_job_ids_from_file(file_path):
                 job_ids.append(row[0])
     return job_ids
 
+# Turn the fields parsed from a viewjob page into a job keyed by JobRecord field names
+def build_job(job_id, job_url, record, apply_link):
+    # Extract and parse salary
+    salary_text = record['salary_raw']
+    salary = normalize_salary(salary_text)
+
+    return {
+        'job_id': job_id,
+        'job_url': job_url,
+        'job_title': record['job_title'],
+        'company_name': record['company_name'],
+        'location': record['location'],
+        'salary_raw': salary_text,
+        'min_salary': salary.min_salary,
+        'max_salary': salary.max_salary,
+        'salary_unit': salary.salary_unit,
+        'job_type': record['job_type'],
+        'shift_and_schedule': record['shift_and_schedule'],
+        'apply_link': apply_link,
+        'job_description_html': record['job_description_html'],
+        'job_description_text': record['job_description_text'],
+        # The apply link is an Indeed redirect still to be resolved to the employer's URL
+        'external_apply': record['external_apply'],
+    }
+
+# Extract the details of a single job by navigating the given page to its viewjob URL
+async def scrape_job_page(page, job_id, base_url, network_idle_timeout, readiness, page_cache=None, metrics=None,
+                          extractor=None):
+    metrics = metrics or ScrapeMetrics('job_data')
+    job_url = f"{base_url}?jk={job_id}"
+    logger.info(f"Navigating to job URL: {job_url}...")
+    # Wait for the job description to be rendered rather than for the network to go idle
+    with metrics.time('goto'):
+        response = await readiness.goto(page, job_url, 'viewjob', network_idle_timeout)
+    status = response.status if response is not None else None
+
+    # Read the fields inside the page, unless the raw page is wanted for the page cache
+    if extractor is not None and extractor.enabled and not (page_cache is not None and page_cache.enabled):
+        reason = block_reason(status, '')
+        if reason is not None:
+            raise BlockedPageError(job_url, reason)
+        with metrics.time('extract'):
+            record = await extractor.job_record(page)
+        if record is not None:
+            metrics.count('pages')
+            return build_job(job_id, job_url, record, record['apply_link'])
+
+    logger.info("Page loaded. Extracting job details...")
+    # Extract the HTML content of the job details page
+    with metrics.time('content'):
+        job_content = await page.content()
+
+    # Rate limit and CAPTCHA pages fail the job instead of being parsed into an empty one
+    reason = block_reason(status, job_content, VIEWJOB_CONTENT_MARKER)
+    if reason is not None:
+        raise BlockedPageError(job_url, reason)
+    metrics.count('pages')
+    metrics.count('bytes', len(job_content))
+    if page_cache is not None:
+        await page_cache.aput(job_url, job_content)
+
+    # Extract job details in a single pass over the page
+    with metrics.time('parse'):
+        record = parse_job_page(job_content)
+
+    # External apply links are resolved by the caller, so the page never leaves Indeed
+    return build_job(job_id, job_url, record, record['apply_link'])
+
+# Extract the details of a single job from its viewjob page fetched over HTTP. Returns None
+# when the response is unusable, so the job can be scraped in the browser instead
+async def fetch_job_page(fetcher, job_id, base_url, page_cache=None, metrics=None):
+    metrics = metrics or ScrapeMetrics('job_data')
+    job_url = f"{base_url}?jk={job_id}"
+    with metrics.time('http_fetch'):
+        job_content = await fetcher.fetch(job_url)
+    if job_content is None:
+        return None
+    metrics.count('pages')
+    metrics.count('bytes', len(job_content))
+    if page_cache is not None:
+        await page_cache.aput(job_url, job_content)
+
+    with metrics.time('parse'):
+        record = parse_job_page(job_content)
+    return build_job(job_id, job_url, record, record['apply_link'])
+
+# Extract the details of a single job from the cached snapshot of its viewjob page, without
+# any network access. External apply links are left as the Indeed redirect link
+async def replay_job_page(page_cache, job_id, base_url, metrics=None):
+    metrics = metrics or ScrapeMetrics('job_data')
+    job_url = f"{base_url}?jk={job_id}"
+    with metrics.time('cache_read'):
+        job_content = await page_cache.aget(job_url)
+    if job_content is None:
+        raise LookupError(f"Job page {job_url} is not in the page cache")
+    metrics.count('pages')
+    metrics.count('bytes', len(job_content))
+
+    with metrics.time('parse'):
+        record = parse_job_page(job_content)
+    return build_job(job_id, job_url, record, record['apply_link'])
+
+# Map an extracted job to a row of the job data CSV
+def build_csv_row(job):
+    return {
+        'Job URL': job['job_url'],
+        'Job Title': job['job_title'],
+        'Company Name': job['company_name'],
+        'Location': job['location'],
+        'Salary Text': job['salary_raw'],
+        'Min Salary': job['min_salary'] if job['min_salary'] is not None else 'N/A',
+        'Max Salary': job['max_salary'] if job['max_salary'] is not None else 'N/A',
+        'Salary Unit': job['salary_unit'] or 'N/A',
+        'Job Type': job['job_type'],
+        'Shift and Schedule': job['shift_and_schedule'],
+        'Apply Link': job['apply_link'],
+        'Job Description': job['job_description_html'],
+        'Job Description Text': job['job_description_text']
+    }
+
+# Find the job IDs whose JobRecord already holds a description, in chunks to keep queries small
+def find_extracted_job_ids(job_ids, chunk_size=1000):
+    extracted_ids = set()
+    for start in range(0, len(job_ids), chunk_size):
+        extracted_ids.update(
+            JobRecord.objects.filter(job_id__in=job_ids[start:start + chunk_size])
+            .exclude(job_description_html__isnull=True)
+            .exclude(job_description_html='')
+            .values_list('job_id', flat=True)
+        )
+    return extracted_ids
+
 # Update function to take file path as input
-async def extract_job_details(file_path):
+async def extract_job_details(file_path, concurrency=None, headless=None, base_url=None,
+                              network_idle_timeout=None, resume=False, skip_job_ids=None, persist=None,
+                              fetch_mode=None, progress_callback=None):
     logger.info("Starting the extraction process...")
 
-    # Load job IDs from file
-    job_ids = read_job_ids_from_file(file_path)
+    scrape_session_id = str(uuid.uuid4())
+    logger.info(f"Scrape session ID: {scrape_session_id}")
 
-    async with async_playwright() as p:
-        logger.info("Launching Chromium browser with persistent context...")
+    # Fall back to config values for anything not provided by the caller
+    concurrency = concurrency or job_data_config['concurrency']
+    headless = headless if headless is not None else job_data_config['headless']
+    base_url = base_url or job_data_config['base_url']
+    network_idle_timeout = network_idle_timeout or job_data_config['network_idle_timeout']
+    persist = persist if persist is not None else job_data_config['persist']
+    fetch_mode = fetch_mode or job_data_config['fetch_mode']
 
-        # Launch a persistent Chromium browser (uses Playwright's built-in Chromium)
-        browser = await p.chromium.launch(headless=True)
-        user_agent = random.choice(USER_AGENT_POOL)
-        # Create a new browser context
-        context = await browser.new_context(user_agent=user_agent)
+    # Load job IDs from file, dropping duplicates within the file
+    all_job_ids = list(dict.fromkeys(read_job_ids_from_file(file_path)))
 
-        page = await context.new_page()
+    # The checkpoint next to the file records the outcome of every job ID; like the output
+    # file, it is only continued when resuming
+    checkpoint = ExtractionCheckpoint(file_path, resume=resume)
 
-        # Optional: Apply stealth plugin
-        await stealth_async(page)
+    job_ids = all_job_ids
+    if resume:
+        # Skip IDs completed by an earlier run, handled by an earlier file of this run,
+        # or whose JobRecord already has a description
+        completed_ids = checkpoint.completed_ids() | (skip_job_ids or set())
+        job_ids = [job_id for job_id in job_ids if job_id not in completed_ids]
+        completed_ids = await sync_to_async(find_extracted_job_ids)(job_ids)
+        job_ids = [job_id for job_id in job_ids if job_id not in completed_ids]
+        logger.info(f"Resuming: {len(all_job_ids) - len(job_ids)} job IDs already done, {len(job_ids)} remaining")
 
-        # Load cookies from the JSON file
-        cookies_file = os.path.join(settings.BASE_DIR, 'cookies.json')  # Set the path to cookies file
-        await load_cookies(page, cookies_file)
+    if skip_job_ids is not None:
+        skip_job_ids.update(all_job_ids)
 
-        job_data = []
+    # Never open more pages than there are jobs to scrape
+    concurrency = max(1, min(concurrency, len(job_ids)))
+    logger.info(f"Extracting {len(job_ids)} jobs with a concurrency of {concurrency}")
 
-        for job_id in job_ids:
-            job_url = f"https://ca.indeed.com/viewjob?jk={job_id}"
-            logger.info(f"Navigating to job URL: {job_url}...")
-            try:
-                await page.goto(job_url, wait_until='networkidle', timeout=60000)
-
-                logger.info("Page loaded. Extracting job details...")
-                # Extract the HTML content of the job details page
-                job_content = await page.content()
-
-                job_soup = BeautifulSoup(job_content, 'html.parser', from_encoding='utf-8')
-
-                # Extract job details
-                job_title = job_soup.find('h1', class_='jobsearch-JobInfoHeader-title').text.strip() if job_soup.find('h1', class_='jobsearch-JobInfoHeader-title') else 'N/A'
-                company_name = job_soup.find('div', {'data-company-name': 'true'}).text.strip() if job_soup.find('div', {'data-company-name': 'true'}) else 'N/A'
-                location = job_soup.find('div', {'data-testid': 'inlineHeader-companyLocation'}).text.strip() if job_soup.find('div', {'data-testid': 'inlineHeader-companyLocation'}) else 'N/A'
-
-                # Extract and parse salary
-                salary_text = job_soup.find('span', class_='css-19j1a75').text.strip() if job_soup.find('span', class_='css-19j1a75') else 'N/A'
-                min_salary, max_salary, salary_unit = 'N/A', 'N/A', 'N/A'
-
-                if salary_text != 'N/A':
-                    # Enhanced regex to capture multi-word units
-                    # Attempt to match a salary range with decimals
-                    range_match = re.search(
-                        r'\$([\d,]+(?:\.\d+)?)\s*[–-]\s*\$([\d,]+(?:\.\d+)?)\s*(?:per\s+|an?\s+)?([a-zA-Z\s]+)',
-                        salary_text,
-                        re.IGNORECASE
-                    )
-                    if range_match:
-                        min_salary = range_match.group(1).replace(',', '')
-                        max_salary = range_match.group(2).replace(',', '')
-                        salary_unit_raw = range_match.group(3).strip().lower()
+    # The HTTP clients keep one user agent; browser contexts rotate through the pool
+    user_agent = random.choice(USER_AGENT_POOL)
+
+    # Requests for images, fonts, trackers etc. are aborted by the resource blocker
+    resource_blocker = ResourceBlocker.from_config()
+
+    # Pages count as loaded once the job description is attached
+    readiness = PageReadiness.from_config()
+
+    # Time spent in each stage of the run, also fed to the metrics endpoint
+    metrics = ScrapeMetrics('job_data')
+
+    # Rendered pages are read with the in-page selector map, with BeautifulSoup as the fallback
+    extractor = InPageExtractor.from_config(metrics=metrics)
+
+    # Each input file gets its own output file, named after it, written as jobs are scraped
+    os.makedirs(output_dir, exist_ok=True)
+    input_name = os.path.splitext(os.path.basename(file_path))[0]
+    output_csv = os.path.join(output_dir, f'{input_name}_job_data.csv')
+
+    # Jobs are only marked done in the checkpoint once their row is flushed to disk
+    unflushed_job_ids = []
+
+    def checkpoint_flushed_jobs():
+        for job_id in unflushed_job_ids:
+            checkpoint.record(job_id, STATUS_DONE)
+        unflushed_job_ids.clear()
+
+    # A resumed run appends to the output of the interrupted one
+    writer = StreamingCsvWriter(output_csv, JOB_DATA_FIELDNAMES, append=resume, on_flush=checkpoint_flushed_jobs)
+
+    def write_job(job):
+        writer.writerow(build_csv_row(job))
+        unflushed_job_ids.append(job['job_id'])
+
+    # Rows are emitted in input order, so the output matches a sequential run; jobs that only
+    # succeed on retry are appended at the end
+    emitter = OrderedRowEmitter(write_job)
+
+    # Extracted jobs are also saved to JobRecord in batches, off the page-fetching path
+    persister = JobDetailPersister(scrape_session_id, metrics=metrics) if persist else None
+    if persister is not None:
+        persister.start()
+
+    cookies_file = os.path.join(settings.BASE_DIR, 'cookies.json')  # Set the path to cookies file
+
+    # Raw pages are stored in the page cache when it is enabled; replay mode reads every page
+    # back from it and never opens a browser
+    replay = fetch_mode == 'replay'
+
+    # Up to `concurrency` jobs are fetched at a time, as many as the responses stay healthy for
+    rate_controller = AdaptiveRateController.from_config('job_data', concurrency, enabled=False if replay else None,
+                                                         metrics=metrics)
+
+    # In HTTP mode pages are fetched over a pooled HTTP client with the same cookies, and
+    # only pages that come back blocked or incomplete are rendered in the browser
+    fetcher = HttpFetcher.from_config(user_agent, cookies_file, rate_controller) if fetch_mode == 'http' else None
+    browser_pages = 0
+    page_cache = PageCache.from_config(enabled=True if replay else None)
+
+    # External apply links are followed over HTTP in a stage of their own, so a slow employer
+    # site holds up only its own job and not the page fetches. Replay mode keeps them as they are
+    resolver = None if replay else ApplyLinkResolver.from_config(user_agent, cookies_file, metrics=metrics)
+
+    # Failed jobs are retried after the main pass with backoff; a missing cached page does not
+    # turn up on retry, so replay mode does not retry
+    retry_queue = RetryQueue.from_config(enabled=not replay, metrics=metrics)
+
+    try:
+        async with AsyncExitStack() as stack:
+            # Worker pages are opened on first use, on contexts of the warm browser pool that
+            # start from the session-state snapshots and rotate user agents as they go
+            contexts = RotatingContexts.from_config(headless, USER_AGENT_POOL, setup_context=resource_blocker.attach,
+                                                    setup_page=stealth_async)
+            stack.push_async_callback(contexts.close)
+
+            async def fetch_job(job_id, slot):
+                # Scrape one job, rendering it on the page of the given worker slot when needed
+                nonlocal browser_pages
+                job_url = f"{base_url}?jk={job_id}"
+                job = None
+                try:
+                    async with rate_controller.slot(job_url):
+                        if replay:
+                            job = await replay_job_page(page_cache, job_id, base_url, metrics)
+                        elif fetcher is not None:
+                            job = await fetch_job_page(fetcher, job_id, base_url, page_cache, metrics)
+                        if job is None:
+                            page = await contexts.page(slot)
+                            browser_pages += 1
+                            job = await scrape_job_page(page, job_id, base_url, network_idle_timeout,
+                                                        readiness, page_cache, metrics, extractor)
+                except Exception as e:
+                    rate_controller.record(job_url, classify_exception(e))
+                    raise
+                rate_controller.record(job_url, 'ok')
+                return job
+
+            # Feed the job IDs to the workers through a queue
+            job_queue = asyncio.Queue()
+            for index, job_id in enumerate(job_ids):
+                job_queue.put_nowait((index, job_id))
+
+            jobs_done = 0
+            jobs_failed = 0
+
+            def report_progress():
+                if progress_callback is not None:
+                    progress_callback(jobs_total=len(job_ids), jobs_done=jobs_done, jobs_failed=jobs_failed)
+
+            # Jobs waiting for their apply link to be resolved
+            resolving = set()
+
+            def finish_job(index, job):
+                nonlocal jobs_done, jobs_failed
+                # Failed jobs are submitted as None so later rows are not held back
+                emitter.submit(index, job)
+                if job is not None and persister is not None:
+                    persister.put(job)
+                jobs_done += 1
+                if job is None:
+                    jobs_failed += 1
+                report_progress()
+
+            async def resolve_and_finish(index, job):
+                job['apply_link'] = await resolver.resolve(job['apply_link'])
+                finish_job(index, job)
+
+            async def worker(slot):
+                while True:
+                    try:
+                        index, job_id = job_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    job = None
+                    try:
+                        job = await fetch_job(job_id, slot)
+                    except Exception as e:
+                        # Retried once the main pass is done, rather than holding up this worker
+                        logger.error(f"Error extracting job details for job ID {job_id}: {e}")
+                        metrics.count('failures')
+                        retry_queue.add(job_id, job_id, e)
+                    if job is not None and job['external_apply'] and resolver is not None:
+                        task = asyncio.ensure_future(resolve_and_finish(index, job))
+                        resolving.add(task)
+                        task.add_done_callback(resolving.discard)
                     else:
-                        # Attempt to match a fixed salary with decimals
-                        fixed_match = re.search(
-                            r'\$([\d,]+(?:\.\d+)?)\s*(?:per\s+|an?\s+)?([a-zA-Z\s]+)',
-                            salary_text,
-                            re.IGNORECASE
-                        )
-                        if fixed_match:
-                            min_salary = max_salary = fixed_match.group(1).replace(',', '')
-                            salary_unit_raw = fixed_match.group(2).strip().lower()
-
-                    if salary_unit_raw:
-                        # Map the raw unit to standardized unit using substring matching
-                        salary_units = {
-                            'year': 'year',
-                            'annually': 'year',
-                            'month': 'month',
-                            'monthly': 'month',
-                            'week': 'week',
-                            'weekly': 'week',
-                            'day': 'day',
-                            'daily': 'day',
-                            'hour': 'hour',
-                            'hourly': 'hour',
-                            'per hour': 'hour',
-                            'per year': 'year',
-                            'per month': 'month',
-                            'per week': 'week',
-                            'per day': 'day'
-                        }
-                        # Initialize as 'other'
-                        salary_unit = 'other'
-                        # Iterate through the salary_units dictionary to find a match
-                        for keyword, unit in salary_units.items():
-                            if keyword in salary_unit_raw:
-                                salary_unit = unit
-                                break
-                        else:
-                            # Log unrecognized units for further analysis
-                            logger.warning(f"Unrecognized salary unit '{salary_unit_raw}' in salary text '{salary_text}' for job URL {job_url}.")
-
-                # Extract job type
-                job_type = 'N/A'
-                for section in job_soup.find_all('div', class_='js-match-insights-provider-e6s05i'):
-                    header = section.find('h3', class_='js-match-insights-provider-11n8e9a e1tiznh50')
-                    if header and header.text.strip() == "Job type":
-                        job_types = [div.text.strip() for div in section.find_all('div', class_='js-match-insights-provider-tvvxwd ecydgvn1') if div.text.strip()]
-                        job_type = ', '.join(job_types) if job_types else 'N/A'
-                        break
-
-                # Extract shift and schedule
-                shift_and_schedule = 'N/A'
-                for section in job_soup.find_all('div', class_='js-match-insights-provider-e6s05i'):
-                    header = section.find('h3', class_='js-match-insights-provider-11n8e9a e1tiznh50')
-                    if header and header.text.strip() == "Shift and schedule":
-                        shifts = [div.text.strip() for div in section.find_all('div', class_='js-match-insights-provider-tvvxwd ecydgvn1') if div.text.strip()]
-                        shift_and_schedule = ', '.join(shifts) if shifts else 'N/A'
-                        break
-
-                # Determine the apply link type
-                apply_link = 'N/A'
-                apply_button = job_soup.find('button', id='indeedApplyButton')
-                if apply_button:
-                    apply_link = "Indeed Easy Apply"
-                else:
-                    # Search for a button with the specific classes and extract the href
-                    external_apply_button = job_soup.find('button', class_='css-1oxck4n e8ju0x51')
-                    if external_apply_button and 'href' in external_apply_button.attrs:
-                        apply_link = external_apply_button['href']
-
-                        # Navigate to the redirect link to get the final URL
-                        await page.goto(apply_link, wait_until='networkidle', timeout=60000)
-                        final_url = page.url
-                        apply_link = final_url  # Update apply_link with the final URL
-
-                # Extract and preserve job description formatting (HTML)
-                job_description_element = job_soup.find('div', id='jobDescriptionText')
-                job_description_html = job_description_element.decode_contents().strip() if job_description_element else 'N/A'
-                compact_html_content = re.sub(r'\s+', ' ', job_description_html).strip()
-
-                # **New Step**: Extract job description as plain text
-                job_description_text = job_description_element.get_text(separator=' ', strip=True) if job_description_element else 'N/A'
-
-                # Append the extracted details to the job_data list
-                job_data.append({
-                    'Job URL': job_url,
-                    'Job Title': job_title,
-                    'Company Name': company_name,
-                    'Location': location,
-                    'Salary Text': salary_text,
-                    'Min Salary': min_salary,
-                    'Max Salary': max_salary,
-                    'Salary Unit': salary_unit,
-                    'Job Type': job_type,
-                    'Shift and Schedule': shift_and_schedule,
-                    'Apply Link': apply_link,
-                    'Job Description': compact_html_content,
-                    'Job Description Text': job_description_text  # **New Column**
-                })
-            except Exception as e:
-                logger.error(f"Error extracting job details from {job_url}: {e}")
-
-        # **Update Fieldnames** to include the new column
-        output_csv = os.path.join(os.path.dirname(file_path), 'job_data.csv')
-        with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = [
-                'Job URL',
-                'Job Title',
-                'Company Name',
-                'Location',
-                'Salary Text',
-                'Min Salary',
-                'Max Salary',
-                'Salary Unit',
-                'Job Type',
-                'Shift and Schedule',
-                'Apply Link',
-                'Job Description',
-                'Job Description Text'  # **New Fieldname**
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for job in job_data:
-                writer.writerow(job)
-
-        logger.info(f"Job data has been written to {output_csv}")
-        logger.info("Closing browser...")
-        # Close the browser context (not the entire browser)
-        await context.close()
-        logger.info("Browser closed. Extraction process completed.")
+                        finish_job(index, job)
+
+            async def retry_job(job_id, slot):
+                nonlocal jobs_failed
+                job = await fetch_job(job_id, slot)
+                if job['external_apply'] and resolver is not None:
+                    job['apply_link'] = await resolver.resolve(job['apply_link'])
+                # The main pass has moved past the job's index, so its row goes after the others
+                write_job(job)
+                if persister is not None:
+                    persister.put(job)
+                jobs_failed -= 1
+                report_progress()
+
+            try:
+                await asyncio.gather(*(worker(slot) for slot in range(concurrency)))
+                # Wait for the apply links still being resolved
+                while resolving:
+                    await asyncio.gather(*resolving)
+            finally:
+                for task in resolving:
+                    task.cancel()
+
+            await retry_queue.drain(retry_job, concurrency)
+            for job_id, _, _, _ in retry_queue.failures():
+                checkpoint.record(job_id, STATUS_FAILED)
+
+            logger.info("Closing browser contexts...")
+    finally:
+        # Whatever was scraped is kept on disk, even if the run is interrupted
+        emitter.drain()
+        writer.close()
+        checkpoint.close()
+        if persister is not None:
+            await persister.close()
+        if fetcher is not None:
+            await fetcher.close()
+        if resolver is not None:
+            await resolver.close()
+        page_cache.close()
+    logger.info(f"Job data has been written to {output_csv}")
+
+    # Job IDs that failed every retry go to the error folder, ready to be extracted again
+    failed_ids_file = None
+    if retry_queue.failures():
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        failed_ids_file = write_error_file(
+            f'{input_name}_failed_{timestamp}.csv',
+            ['Job IDs', 'Reason', 'Attempts'],
+            [(job_id, reason, attempts) for job_id, _, reason, attempts in retry_queue.failures()],
+        )
+    # The pool closes the contexts; the browser stays warm for the next run
+    logger.info("Browser contexts closed. Extraction process completed.")
+
+    return {
+        'scrape_session_id': scrape_session_id,
+        'output_file': output_csv,
+        'jobs_extracted': writer.rows_written,
+        'jobs_failed': len(job_ids) - writer.rows_written,
+        'jobs_skipped': len(all_job_ids) - len(job_ids),
+        'checkpoint': checkpoint.summary(all_job_ids),
+        'network': resource_blocker.stats(),
+        'page_readiness': readiness.stats(),
+        'in_page_extraction': extractor.stats(),
+        'persistence': persister.stats() if persister is not None else None,
+        'fetch': {
+            'mode': fetch_mode,
+            'http': fetcher.stats() if fetcher is not None else None,
+            'browser_pages': browser_pages,
+        },
+        'sessions': contexts.stats(),
+        'apply_redirects': resolver.stats() if resolver is not None else None,
+        'rate_control': rate_controller.stats(),
+        'retries': dict(retry_queue.stats(), failed_ids_file=failed_ids_file),
+        'page_cache': page_cache.stats(),
+        'metrics': metrics.summary(),
+    }
 
 # Entry point for the script
 if __name__ == "__main__":
@@ -250,4 +488,4 @@ if __name__ == "__main__":
         print("Usage: python extract_job_details.py <path_to_job_ids_csv>")
     else:
         file_path = sys.argv[1]
-        asyncio.run(extract_job_details(file_path))
+        browser_pool.run(extract_job_details(file_path))
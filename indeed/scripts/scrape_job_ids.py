@@ -1,18 +1,28 @@
 import asyncio
 import logging
-from playwright.async_api import async_playwright
+from contextlib import AsyncExitStack
 from bs4 import BeautifulSoup
-import csv
 import math
 from playwright_stealth import stealth_async
 import re
-import yaml
 import os
 from datetime import datetime
-import random
 import uuid  # For scrape_session_id
+from datetime import timedelta
 from django.utils import timezone
 from asgiref.sync import sync_to_async
+from indeed.scripts.config import load_config
+from indeed.scripts.output_writers import StreamingCsvWriter, OrderedRowEmitter
+from indeed.scripts.network_filter import ResourceBlocker
+from indeed.scripts.page_readiness import PageReadiness
+from indeed.scripts.in_page_extraction import InPageExtractor
+from indeed.scripts.job_persistence import build_job_record
+from indeed.scripts.search_payload import parse_search_payload, read_jobcards, search_payload_config
+from indeed.scripts.page_cache import PageCache
+from indeed.scripts.metrics import ScrapeMetrics
+from indeed.scripts.rate_control import AdaptiveRateController, BlockedPageError, block_reason, classify_exception
+from indeed.scripts.retry_queue import RetryQueue, write_error_file
+from indeed.scripts.session_state import RotatingContexts
 
 # Import settings from Django
 from django.conf import settings
@@ -21,20 +31,7 @@ from django.conf import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load configuration from YAML file using settings.BASE_DIR
-config_path = os.path.join(settings.BASE_DIR, 'indeed', 'config.yaml')
-logger.info(f"Loading configuration from {config_path}")
-
-try:
-    with open(config_path, 'r') as config_file:
-        config = yaml.safe_load(config_file)
-        job_scraper_config = config['get_job_ids']['defaults']
-except FileNotFoundError as e:
-    logger.error(f"Configuration file not found: {e}")
-    # Handle the error as needed
-except yaml.YAMLError as e:
-    logger.error(f"Error parsing YAML configuration: {e}")
-    # Handle the error as needed
+job_scraper_config = load_config('get_job_ids', 'defaults')
 
 # Define output directory path using settings.BASE_DIR
 output_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output', 'pendingExtraction')
@@ -70,9 +67,179 @@ USER_AGENT_POOL = [
 from indeed.models import JobRecord
 
 
+# Work out the start offset of every results page for the given number of jobs
+def build_page_offsets(total_jobs, jobs_per_page):
+    total_pages = math.ceil(total_jobs / jobs_per_page)
+    return [page_num * jobs_per_page for page_num in range(total_pages)]
+
+
+# Return the job IDs of a parsed results page in page order, without duplicates
+def find_job_ids(soup, job_link_data_attr):
+    job_links = soup.find_all('a', {job_link_data_attr: True})
+    return list(dict.fromkeys(link[job_link_data_attr] for link in job_links))
+
+
+# Parse a results page and return its job IDs in page order, without duplicates
+def parse_job_ids(content, job_link_data_attr):
+    return find_job_ids(BeautifulSoup(content, 'html.parser'), job_link_data_attr)
+
+
+# Read the total number of jobs of a search from its job count text
+def parse_job_count(job_count_text):
+    return int(re.search(r'\d+', (job_count_text or '0').replace(',', '')).group())
+
+
+# Parse a results page into its job IDs, total number of jobs and job summaries, read from the
+# embedded job cards payload when the page has one and from the DOM otherwise
+def parse_search_page(content, job_count_class, job_link_data_attr, base_url, use_payload=None):
+    use_payload = use_payload if use_payload is not None else search_payload_config['enabled']
+    results = parse_search_payload(content, base_url) if use_payload else None
+    if results is not None and results['total_jobs'] is not None:
+        return results
+
+    soup = BeautifulSoup(content, 'html.parser')
+    job_count_elem = soup.find('div', {'class': job_count_class})
+    total_jobs = parse_job_count(job_count_elem.find('span').text if job_count_elem else None)
+    if results is not None:
+        # The payload lists the jobs but not how many there are
+        results['total_jobs'] = total_jobs
+        return results
+    return {'job_ids': find_job_ids(soup, job_link_data_attr), 'total_jobs': total_jobs, 'summaries': {}}
+
+
+# Turn what the in-page extractor read from a results page into the results of parse_search_page
+def build_search_results(record, base_url, use_payload=None):
+    use_payload = use_payload if use_payload is not None else search_payload_config['enabled']
+    results = read_jobcards(record['jobcards'], base_url) if use_payload and record['jobcards'] else None
+    if results is None:
+        return {'job_ids': record['job_ids'], 'total_jobs': parse_job_count(record['job_count_text']),
+                'summaries': {}}
+    if results['total_jobs'] is None:
+        results['total_jobs'] = parse_job_count(record['job_count_text'])
+    return results
+
+
+# Load the IDs of the jobs retrieved since the given time, in one query
+def load_known_job_ids(since):
+    return set(JobRecord.objects.filter(retrieved_date__gte=since).values_list('job_id', flat=True).iterator())
+
+
+# Save the job IDs that are not in the database yet with one lookup and one bulk insert. New
+# records get the fields of their job summary, when the results page had one
+def save_new_job_ids(job_ids, scrape_session_id, summaries=None):
+    summaries = summaries or {}
+    existing_ids = set(JobRecord.objects.filter(job_id__in=job_ids).values_list('job_id', flat=True))
+
+    # Create new JobRecords for the IDs we have not seen before
+    retrieved_date = timezone.now()
+    new_records = [
+        build_job_record(summaries[job_id], scrape_session_id, retrieved_date) if job_id in summaries else
+        JobRecord(
+            job_id=job_id,
+            source='Indeed',
+            status='Active',
+            retrieved_date=retrieved_date,
+            scrape_session_id=scrape_session_id,
+        )
+        for job_id in job_ids if job_id not in existing_ids
+    ]
+    if not new_records:
+        return 0
+
+    JobRecord.objects.bulk_create(new_records, ignore_conflicts=True)
+
+    # ignore_conflicts silently skips rows another scrape inserted in the meantime,
+    # so count only the rows that belong to this session
+    return JobRecord.objects.filter(
+        job_id__in=[record.job_id for record in new_records],
+        scrape_session_id=scrape_session_id,
+    ).count()
+
+
+class QueryCrawl:
+    """Pagination state and counters of one search of a batch."""
+
+    def __init__(self, index, job_title, location, search_url, write):
+        self.index = index
+        self.job_title = job_title
+        self.location = location
+        self.search_url = search_url
+        # Pages finish out of order; the emitter writes their job IDs in results page order
+        self.emitter = OrderedRowEmitter(write)
+        # Job IDs found by this search, whichever search of the batch found them first
+        self.seen_job_ids = set()
+        self.known_pages = set()
+        self.loaded = False
+        self.error = None
+        self.stop_pagination = False
+        self.stopped_on_known_pages = False
+
+        # Counters
+        self.pages_fetched = 0
+        self.total_pages = 0
+        self.new_job_ids = 0
+        self.new_job_ids_saved = 0
+        self.duplicate_job_ids_skipped = 0
+
+    def note_known_page(self, page_num, job_ids, known_job_ids, stop_pages):
+        # Record a page made up of known job IDs only, and stop paginating once enough consecutive ones are
+        if not job_ids or any(job_id not in known_job_ids for job_id in job_ids):
+            return
+        self.known_pages.add(page_num)
+        for first in range(page_num - stop_pages + 1, page_num + 1):
+            if all(other in self.known_pages for other in range(first, first + stop_pages)):
+                logger.info(f"Pages {first + 1} to {first + stop_pages} of {self.search_url} hold only known "
+                            f"job IDs. Stopping pagination.")
+                self.stop_pagination = self.stopped_on_known_pages = True
+                return
+
+    def summary(self):
+        return {
+            'job_title': self.job_title,
+            'location': self.location,
+            'pages_fetched': self.pages_fetched,
+            'total_pages': self.total_pages,
+            'job_ids_found': len(self.seen_job_ids),
+            'new_job_ids': self.new_job_ids,
+            'new_job_ids_saved': self.new_job_ids_saved,
+            'duplicate_job_ids_skipped': self.duplicate_job_ids_skipped,
+            'stopped_early': self.stopped_on_known_pages,
+            'completed': self.loaded,
+        }
+
+
 async def extract_job_ids(job_title=None, location=None, user_agent=None, headless=None,
                           base_url=None, network_idle_timeout=None, job_count_class=None,
-                          job_link_data_attr=None):
+                          job_link_data_attr=None, concurrency=None, fetch_mode=None, incremental=None,
+                          progress_callback=None):
+    # A single search is a batch of one
+    return await extract_job_ids_batch(
+        [{'job_title': job_title, 'location': location}],
+        user_agent=user_agent,
+        headless=headless,
+        base_url=base_url,
+        network_idle_timeout=network_idle_timeout,
+        job_count_class=job_count_class,
+        job_link_data_attr=job_link_data_attr,
+        concurrency=concurrency,
+        fetch_mode=fetch_mode,
+        incremental=incremental,
+        progress_callback=progress_callback,
+    )
+
+
+async def extract_job_ids_batch(queries, user_agent=None, headless=None, base_url=None, network_idle_timeout=None,
+                                job_count_class=None, job_link_data_attr=None, concurrency=None, fetch_mode=None,
+                                incremental=None, progress_callback=None):
+    """
+    Crawl the results of several searches in one scrape session.
+
+    `queries` is a list of dicts with a job_title and a location. All searches share one
+    browser context and a pool of `concurrency` pages, which their results pages are loaded
+    on in turn. A job ID found by several searches is written and saved once, by the search
+    that found it first; each search still paginates until it runs out of job IDs of its own.
+    The result holds the totals of the batch and the counts of every search.
+    """
     logger.info("Starting the extraction process...")
 
     # Record the start time
@@ -81,132 +248,297 @@ async def extract_job_ids(job_title=None, location=None, user_agent=None, headle
     scrape_session_id = str(uuid.uuid4())
     logger.info(f"Scrape session ID: {scrape_session_id}")
 
-    # If no user agent is provided, select one randomly from the pool
-    user_agent = user_agent or random.choice(USER_AGENT_POOL)
+    # A given user agent is used for every context; otherwise contexts rotate through the pool
+    user_agents = [user_agent] if user_agent else USER_AGENT_POOL
     headless = headless if headless is not None else job_scraper_config['headless']
     base_url = base_url or job_scraper_config['base_url']
     network_idle_timeout = network_idle_timeout or job_scraper_config['network_idle_timeout']
     job_count_class = job_count_class or job_scraper_config['job_count_class']
     job_link_data_attr = job_link_data_attr or job_scraper_config['job_link_data_attr']
-
-    # Initialize counters
-    total_job_ids_found = 0
-    new_job_ids_saved = 0
-    all_job_ids = []
-
-    async with async_playwright() as p:
-        logger.info("Launching browser with User-Agent: %s", user_agent)
-        browser = await p.chromium.launch(headless=headless)
-
-        # Set a realistic User-Agent and create a new page
-        context = await browser.new_context(user_agent=user_agent)
-        page = await context.new_page()
-
-        # Apply stealth plugin
-        await stealth_async(page)
-
+    concurrency = concurrency or job_scraper_config['concurrency']
+    jobs_per_page = job_scraper_config['jobs_per_page']
+    incremental = incremental if incremental is not None else job_scraper_config['incremental']
+
+    # Job IDs found so far by any search of the batch
+    seen_job_ids = set()
+
+    # An incremental crawl walks the results newest first and stops once `incremental_stop_pages`
+    # pages in a row hold only job IDs retrieved within the lookback window
+    known_job_ids = set()
+    if incremental:
+        since = timezone.now() - timedelta(days=job_scraper_config['incremental_lookback_days'])
+        known_job_ids = await sync_to_async(load_known_job_ids)(since)
+        logger.info(f"Incremental crawl: {len(known_job_ids)} job IDs retrieved since {since:%Y-%m-%d} are known.")
+
+    # Generate a timestamp for the filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    # Create the output CSV filename with the timestamp. Job IDs are streamed to a '.part'
+    # file that only gets its final name once the crawl is complete
+    csv_filename = f'indeed_job_ids_{timestamp}.csv'
+    output_file_path = os.path.join(output_dir, csv_filename)
+    partial_file_path = f'{output_file_path}.part'
+    writer = StreamingCsvWriter(partial_file_path, ['Job IDs'])
+
+    def write_job_ids(job_ids):
+        for job_id in job_ids:
+            writer.writerow({'Job IDs': job_id})
+
+    crawls = []
+    for index, query in enumerate(queries):
         # Construct the URL for the job search
-        search_url = f"{base_url}?q={job_title}&l={location}"
-
-        logger.info(f"Navigating to {search_url}...")
-        # Navigate to the search results page and wait for network to be idle
-        await page.goto(search_url, wait_until='networkidle', timeout=network_idle_timeout)
-
-        logger.info("Page loaded. Extracting HTML content...")
-        # Extract the HTML content
-        content = await page.content()
-
-        logger.info("Parsing HTML content with BeautifulSoup...")
-        # Parse the HTML content using BeautifulSoup
-        soup = BeautifulSoup(content, 'html.parser')
-
-        logger.info("Finding total number of jobs...")
-        # Find total number of jobs
-        job_count_elem = soup.find('div', {'class': job_count_class})
-        job_count_text = job_count_elem.find('span').text if job_count_elem else '0'
-        total_jobs = int(re.search(r'\d+', job_count_text.replace(',', '')).group())
-
-        logger.info(f"Total number of jobs: {total_jobs}")
-
-        jobs_per_page = 15
-        total_pages = math.ceil(total_jobs / jobs_per_page)
-        logger.info(f"Total number of pages: {total_pages}")
-
-        for page_num in range(total_pages):
-            start = page_num * 10  # Calculate the start parameter
-            page_url = f'{search_url}&start={start}'
-            logger.info(f"Navigating to {page_url}...")
-            try:
-                await page.goto(page_url, wait_until='networkidle', timeout=network_idle_timeout)
-
-                logger.info("Page loaded. Extracting HTML content...")
-                # Extract the HTML content
-                content = await page.content()
-
-                logger.info("Parsing HTML content with BeautifulSoup...")
-                # Parse the HTML content using BeautifulSoup
-                soup = BeautifulSoup(content, 'html.parser')
-
-                logger.info(f"Finding all <a> tags with {job_link_data_attr} attribute...")
-                # Find all <a> tags with the job links containing the data-jk attribute
-                job_links = soup.find_all('a', {job_link_data_attr: True})
-
-                if not job_links:
-                    logger.warning(f"No job links found on page {page_num + 1}. Please check the HTML structure.")
-
-                logger.info("Processing job IDs...")
-                for link in job_links:
-                    job_id = link[job_link_data_attr]
-
-                    # Increment the total_job_ids_found counter
-                    total_job_ids_found += 1
-
-                    # Check if job_id exists in database
-                    exists = await sync_to_async(JobRecord.objects.filter(job_id=job_id).exists)()
-                    if exists:
-                        logger.info(f"Job ID {job_id} already exists in the database. Skipping.")
-                    else:
-                        # Create new JobRecord
-                        job_record = JobRecord(
-                            job_id=job_id,
-                            source='Indeed',
-                            status='Active',
-                            retrieved_date=timezone.now(),
-                            scrape_session_id=scrape_session_id,
-                        )
-                        await sync_to_async(job_record.save)()
-                        logger.info(f"Job ID {job_id} saved to database.")
-                        # Increment the new_job_ids_saved counter
-                        new_job_ids_saved += 1
-
-                    # Append the job_id to all_job_ids to write to CSV later
-                    all_job_ids.append(job_id)
-
-            except Exception as e:
-                logger.error(f"Failed to load page {page_num + 1}: {e}")
-
-        # Generate a timestamp for the filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        # Create the output CSV filename with the timestamp
-        csv_filename = f'indeed_job_ids_{timestamp}.csv'
-        output_file_path = os.path.join(output_dir, csv_filename)
-
-        # Save the job IDs to the CSV file in the output directory
-        try:
-            with open(output_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Job IDs'])
-                for job_id in all_job_ids:
-                    writer.writerow([job_id])
-            logger.info(f"Job IDs have been written to {output_file_path}")
-        except Exception as e:
-            logger.error(f"Failed to write CSV file at {output_file_path}: {e}")
-
-        logger.info("Closing browser...")
-        # Close the browser
-        await browser.close()
-        logger.info("Browser closed. Extraction process completed.")
+        search_url = f"{base_url}?q={query['job_title']}&l={query['location']}"
+        if incremental:
+            # Newest jobs first, so the jobs not seen before come before the known ones
+            search_url += '&sort=date'
+        crawls.append(QueryCrawl(index, query['job_title'], query['location'], search_url, write_job_ids))
+
+    def report_progress():
+        if progress_callback is not None:
+            progress_callback(
+                pages_fetched=sum(crawl.pages_fetched for crawl in crawls),
+                total_pages=sum(crawl.total_pages for crawl in crawls),
+                total_job_ids_found=len(seen_job_ids),
+                new_job_ids_saved=sum(crawl.new_job_ids_saved for crawl in crawls),
+            )
+
+    async def process_job_ids(crawl, page_num, results):
+        job_ids = results['job_ids']
+        if incremental:
+            crawl.note_known_page(page_num, job_ids, known_job_ids, job_scraper_config['incremental_stop_pages'])
+
+        # Drop IDs already found on another page of this search
+        found_ids = [job_id for job_id in job_ids if job_id not in crawl.seen_job_ids]
+        crawl.seen_job_ids.update(found_ids)
+
+        # IDs another search of the batch found first are neither written nor saved again
+        new_ids = [job_id for job_id in found_ids if job_id not in seen_job_ids]
+        seen_job_ids.update(new_ids)
+        crawl.new_job_ids += len(new_ids)
+        crawl.duplicate_job_ids_skipped += len(job_ids) - len(new_ids)
+        crawl.emitter.submit(page_num, new_ids)
+
+        logger.info("Processing job IDs...")
+        # Known job IDs are in the database already, so only the others are looked up
+        unknown_ids = [job_id for job_id in new_ids if job_id not in known_job_ids]
+        if unknown_ids:
+            with metrics.time('db_write'):
+                saved = await sync_to_async(save_new_job_ids)(unknown_ids, scrape_session_id, results['summaries'])
+            logger.info(f"Saved {saved} new job IDs to database, {len(unknown_ids) - saved} already existed.")
+            # Increment the new_job_ids_saved counter
+            crawl.new_job_ids_saved += saved
+
+        report_progress()
+        return found_ids
+
+    # Requests for images, fonts, trackers etc. are aborted by the resource blocker
+    resource_blocker = ResourceBlocker.from_config()
+
+    # Pages count as loaded once the job links are attached, not when the network goes idle
+    readiness = PageReadiness.from_config()
+    job_link_selector = f'a[{job_link_data_attr}]'
+
+    # Time spent in each stage of the run, also fed to the metrics endpoint
+    metrics = ScrapeMetrics('job_ids')
+
+    # Rendered results pages are read with the in-page selector map, with BeautifulSoup as the fallback
+    extractor = InPageExtractor.from_config(metrics=metrics)
+
+    # Raw pages are stored in the page cache when it is enabled; replay mode reads every page
+    # back from it and never opens a browser
+    replay = (fetch_mode or job_scraper_config['fetch_mode']) == 'replay'
+    page_cache = PageCache.from_config(enabled=True if replay else None)
+
+    # Up to `concurrency` results pages are loaded at a time, as many as the responses stay healthy for
+    rate_controller = AdaptiveRateController.from_config('job_ids', concurrency, enabled=False if replay else None,
+                                                         metrics=metrics)
+
+    # Failed results pages are retried after the main pass with backoff, except in replay mode
+    retry_queue = RetryQueue.from_config(enabled=not replay, metrics=metrics)
+
+    def count_source(results):
+        # Count the results pages read from the job cards payload rather than the DOM
+        if results['summaries']:
+            metrics.count('payload_pages')
+        return results
+
+    async def load_search_page(search_page, url):
+        # Return the job IDs and job count text of a results page, read inside the browser or
+        # parsed from its HTML, rendered or read back from the cache
+        if replay:
+            with metrics.time('cache_read'):
+                content = await page_cache.aget(url)
+            if content is None:
+                raise LookupError(f"Search page {url} is not in the page cache")
+        else:
+            async with rate_controller.slot(url):
+                try:
+                    # Navigate to the search results page and wait for the job links to be rendered
+                    with metrics.time('goto'):
+                        response = await readiness.goto(search_page, url, 'search', network_idle_timeout,
+                                                         selector=job_link_selector)
+                    status = response.status if response is not None else None
+
+                    # The raw page is only needed when it goes to the page cache
+                    results = None
+                    if extractor.enabled and not page_cache.enabled:
+                        reason = block_reason(status, '')
+                        if reason is not None:
+                            raise BlockedPageError(url, reason)
+                        with metrics.time('extract'):
+                            results = await extractor.search_results(search_page, job_count_class,
+                                                                     job_link_data_attr)
+
+                    if results is None:
+                        logger.info("Page loaded. Extracting HTML content...")
+                        # Extract the HTML content
+                        with metrics.time('content'):
+                            content = await search_page.content()
+
+                        # A rate limit or CAPTCHA page is a failure, not a results page without jobs
+                        reason = block_reason(status, content, job_count_class)
+                        if reason is not None:
+                            raise BlockedPageError(url, reason)
+                except Exception as e:
+                    rate_controller.record(url, classify_exception(e))
+                    raise
+                rate_controller.record(url, 'ok')
+
+            if results is not None:
+                metrics.count('pages')
+                return count_source(build_search_results(results, base_url))
+            await page_cache.aput(url, content)
+
+        metrics.count('pages')
+        metrics.count('bytes', len(content))
+        with metrics.time('parse'):
+            return count_source(parse_search_page(content, job_count_class, job_link_data_attr, base_url))
+
+    try:
+        async with AsyncExitStack() as stack:
+            contexts = None
+            if not replay:
+                # Contexts of the warm browser pool, started from the session-state snapshots
+                # and rotated to the next user agent as the batch goes on
+                contexts = RotatingContexts.from_config(headless, user_agents, setup_context=resource_blocker.attach,
+                                                        setup_page=stealth_async)
+                stack.push_async_callback(contexts.close)
+
+            # Every search loads its results pages on the shared pool of page slots
+            page_slots = asyncio.Queue()
+            for slot in range(concurrency):
+                page_slots.put_nowait(slot)
+
+            async def load_pooled_page(url):
+                slot = await page_slots.get()
+                try:
+                    search_page = await contexts.page(slot) if contexts is not None else None
+                    return await load_search_page(search_page, url)
+                finally:
+                    page_slots.put_nowait(slot)
+
+            async def paginate(crawl, results):
+                # Process the first results page of a search, then fetch the rest of its pages
+                logger.info("Finding total number of jobs...")
+                # Find total number of jobs
+                total_jobs = results['total_jobs']
+
+                logger.info(f"Total number of jobs for {crawl.search_url}: {total_jobs}")
+
+                page_offsets = build_page_offsets(total_jobs, jobs_per_page)
+                crawl.total_pages = len(page_offsets)
+                crawl.loaded = True
+                logger.info(f"Total number of pages: {len(page_offsets)}")
+
+                # The first results page is the one already loaded, so reuse it instead of fetching it again
+                first_page_ids = await process_job_ids(crawl, 0, results)
+                if not first_page_ids and total_jobs:
+                    logger.warning("No job links found on page 1. Please check the HTML structure.")
+
+                # Remaining offsets are handed out in order to the workers of the search
+                remaining_offsets = iter(page_offsets[1:])
+                crawl.stop_pagination = crawl.stop_pagination or not first_page_ids
+
+                async def worker():
+                    for start in remaining_offsets:
+                        if crawl.stop_pagination:
+                            return
+                        page_num = start // jobs_per_page
+                        page_url = f'{crawl.search_url}&start={start}'
+                        logger.info(f"Navigating to {page_url}...")
+                        try:
+                            results = await load_pooled_page(page_url)
+                            crawl.pages_fetched += 1
+
+                            if not results['job_ids']:
+                                logger.warning(f"No job links found on page {page_num + 1}. Please check the HTML structure.")
+
+                            # Stop paginating as soon as a page has nothing this search has not already seen
+                            if not await process_job_ids(crawl, page_num, results):
+                                logger.info(f"Page {page_num + 1} yielded no new job IDs. Stopping pagination.")
+                                crawl.stop_pagination = True
+
+                        except Exception as e:
+                            # Retried once the main pass is done; the emitter holds back later pages until then
+                            logger.error(f"Failed to load page {page_num + 1}: {e}")
+                            metrics.count('failures')
+                            retry_queue.add((crawl.index, page_num), (crawl, page_num, page_url), e)
+
+                await asyncio.gather(*(worker() for _ in range(min(concurrency, len(page_offsets) - 1))))
+
+            async def crawl_search(crawl):
+                logger.info(f"Navigating to {crawl.search_url}...")
+                try:
+                    results = await load_pooled_page(crawl.search_url)
+                except Exception as e:
+                    # Without its first page the search is retried as a whole after the main pass
+                    logger.error(f"Failed to load {crawl.search_url}: {e}")
+                    metrics.count('failures')
+                    crawl.error = e
+                    retry_queue.add((crawl.index, 0), (crawl, 0, crawl.search_url), e)
+                    return
+                crawl.pages_fetched += 1
+                await paginate(crawl, results)
+
+            await asyncio.gather(*(crawl_search(crawl) for crawl in crawls))
+
+            async def retry_page(item, slot):
+                crawl, page_num, page_url = item
+                results = await load_pooled_page(page_url)
+                crawl.pages_fetched += 1
+                if page_num == 0:
+                    await paginate(crawl, results)
+                    return
+                await process_job_ids(crawl, page_num, results)
+
+            await retry_queue.drain(retry_page, concurrency)
+            for _, (crawl, page_num, _), _, _ in retry_queue.failures():
+                crawl.emitter.submit(page_num, None)
+
+            logger.info("Closing browser contexts...")
+    finally:
+        # Job IDs found so far stay on disk in the '.part' file, even if the crawl fails
+        for crawl in crawls:
+            crawl.emitter.drain()
+        writer.close()
+        page_cache.close()
+
+    # A batch none of whose searches could be loaded has failed as a whole
+    if not any(crawl.loaded for crawl in crawls):
+        raise crawls[0].error
+
+    os.replace(partial_file_path, output_file_path)
+    logger.info(f"Job IDs have been written to {output_file_path}")
+
+    # Results pages that failed every retry go to the error folder, to be crawled again
+    failed_pages_file = None
+    if retry_queue.failures():
+        failed_pages_file = write_error_file(
+            f'indeed_job_ids_{timestamp}_failed_pages.csv',
+            ['Page URL', 'Reason', 'Attempts'],
+            [(page_url, reason, attempts) for _, (_, _, page_url), reason, attempts in retry_queue.failures()],
+        )
+    logger.info("Browser contexts closed. Extraction process completed.")
 
     # Record the end time
     end_time = timezone.now()
@@ -215,8 +547,25 @@ async def extract_job_ids(job_title=None, location=None, user_agent=None, headle
     result = {
         'message': 'Scraping completed successfully',
         'scrape_session_id': scrape_session_id,
-        'total_job_ids_found': total_job_ids_found,
-        'new_job_ids_saved': new_job_ids_saved,
+        'total_job_ids_found': len(seen_job_ids),
+        'new_job_ids_saved': sum(crawl.new_job_ids_saved for crawl in crawls),
+        'duplicate_job_ids_skipped': sum(crawl.duplicate_job_ids_skipped for crawl in crawls),
+        'pages_fetched': sum(crawl.pages_fetched for crawl in crawls),
+        'queries': [crawl.summary() for crawl in crawls],
+        'network': resource_blocker.stats(),
+        'in_page_extraction': extractor.stats(),
+        'sessions': contexts.stats() if contexts is not None else None,
+        'page_readiness': readiness.stats(),
+        'page_cache': page_cache.stats(),
+        'rate_control': rate_controller.stats(),
+        'retries': dict(retry_queue.stats(), failed_pages_file=failed_pages_file),
+        'incremental': {
+            'enabled': incremental,
+            'known_job_ids': len(known_job_ids),
+            'known_pages': sum(len(crawl.known_pages) for crawl in crawls),
+            'queries_stopped_early': sum(crawl.stopped_on_known_pages for crawl in crawls),
+        },
+        'metrics': metrics.summary(),
         'start_time': start_time.isoformat(),
         'end_time': end_time.isoformat(),
         'csv_file_name': csv_filename  # Include the CSV file name
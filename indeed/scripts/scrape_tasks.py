@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from data_scrapper import settings
+from indeed.models import ScrapeTask
+from indeed.scripts.browser_pool import browser_pool
+from indeed.scripts.checkpoint import move_with_checkpoint
+from indeed.scripts.config import load_config
+from indeed.scripts.scrape_job_data import extract_job_details
+from indeed.scripts.scrape_job_ids import extract_job_ids, extract_job_ids_batch
+from indeed.scripts.sharded_extraction import extract_job_data_files_sharded, sharded_extraction_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+scrape_tasks_config = load_config('scrape_tasks')
+
+output_base_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output')
+
+
+def find_job_id_files(file_name=None, folder_name='pendingExtraction'):
+    # Return the job ID files to extract: the named file, or every CSV in the folder
+    folder_path = os.path.join(output_base_dir, folder_name)
+
+    if file_name:
+        file_path = os.path.join(folder_path, file_name)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f'File {file_name} not found in folder {folder_name}')
+        return [file_path]
+
+    try:
+        files_in_folder = sorted(os.listdir(folder_path))
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Folder {folder_name} not found")
+
+    # Only job ID CSVs are inputs; skip partial crawls and any other files
+    return [
+        os.path.join(folder_path, f) for f in files_in_folder
+        if f.endswith('.csv') and os.path.isfile(os.path.join(folder_path, f))
+    ]
+
+
+async def extract_job_data_files(file_paths, concurrency=None, resume=False, fetch_mode=None, progress_callback=None):
+    """
+    Extract the job details of each file in turn, moving every finished file to 'completed'.
+
+    When resuming, job IDs handled by one file are skipped in the files after it. Returns one
+    result per file. An error stops the run; the files finished before it have been moved.
+    """
+    completed_folder_path = os.path.join(output_base_dir, 'completed')
+    os.makedirs(completed_folder_path, exist_ok=True)
+
+    seen_job_ids = set() if resume else None
+    results = []
+
+    for file_path in file_paths:
+        file_name = os.path.basename(file_path)
+
+        def file_progress(**counters):
+            progress_callback(files_total=len(file_paths), files_done=len(results), current_file=file_name, **counters)
+
+        if progress_callback is not None:
+            file_progress()
+
+        result = await extract_job_details(
+            file_path,
+            concurrency=concurrency,
+            resume=resume,
+            skip_job_ids=seen_job_ids,
+            fetch_mode=fetch_mode,
+            progress_callback=file_progress if progress_callback is not None else None,
+        )
+
+        # Move the file and its checkpoint to the 'completed' folder after processing
+        await sync_to_async(move_with_checkpoint)(file_path, completed_folder_path)
+        logger.info(f"File {file_name} moved to completed folder.")
+        results.append({'file_name': file_name, **result})
+
+        if progress_callback is not None:
+            progress_callback(files_total=len(file_paths), files_done=len(results))
+
+    return results
+
+
+async def run_scrape_job_ids(params, progress_callback=None):
+    return await extract_job_ids(**params, progress_callback=progress_callback)
+
+
+async def run_scrape_job_ids_batch(params, progress_callback=None):
+    return await extract_job_ids_batch(**params, progress_callback=progress_callback)
+
+
+async def run_scrape_job_data(params, progress_callback=None):
+    file_paths = await sync_to_async(find_job_id_files)(
+        params.get('file_name'), params.get('folder_name', 'pendingExtraction')
+    )
+    if not file_paths:
+        raise FileNotFoundError("No file found for which extraction is pending")
+
+    processes = params.get('processes') or sharded_extraction_config['processes']
+    if processes > 1:
+        # The process pool blocks, so it is driven from a worker thread
+        results = await sync_to_async(extract_job_data_files_sharded, thread_sensitive=False)(
+            file_paths,
+            processes=processes,
+            concurrency=params.get('concurrency'),
+            resume=params.get('resume', False),
+            fetch_mode=params.get('fetch_mode'),
+            progress_callback=progress_callback,
+        )
+    else:
+        results = await extract_job_data_files(
+            file_paths,
+            concurrency=params.get('concurrency'),
+            resume=params.get('resume', False),
+            fetch_mode=params.get('fetch_mode'),
+            progress_callback=progress_callback,
+        )
+    return {
+        'processed_files': [result['file_name'] for result in results if result.get('status') != 'error'],
+        'failed_files': [result['file_name'] for result in results if result.get('status') == 'error'],
+        'files': results,
+    }
+
+
+# Coroutine run for each task type, called with the task params and a progress callback
+TASK_RUNNERS = {
+    'scrape_job_ids': run_scrape_job_ids,
+    'scrape_job_data': run_scrape_job_data,
+    'scrape_job_ids_batch': run_scrape_job_ids_batch,
+}
+
+
+class TaskLeaseLost(Exception):
+    """The task was claimed again by another worker after this worker's lease ran out."""
+
+
+class TaskProgress:
+    """
+    Progress counters and heartbeat of a running task.
+
+    Scrapers report counters through update(), which only touches memory; run() writes
+    the latest counters to the task row every progress_interval seconds, and renews the
+    task's heartbeat every heartbeat_interval seconds so it is not claimed again as orphaned.
+    Only the row this worker still holds is written; once another worker has claimed the
+    task again, run() raises TaskLeaseLost.
+    """
+
+    def __init__(self, task_pk, worker_id, interval=None, heartbeat_interval=None):
+        self.task_pk = task_pk
+        self.worker_id = worker_id
+        self.interval = interval or scrape_tasks_config['progress_interval']
+        self.heartbeat_interval = heartbeat_interval or scrape_tasks_config['heartbeat_interval']
+        self.counters = {}
+        self._dirty = False
+        self._last_heartbeat = time.monotonic()
+
+    def update(self, **counters):
+        self.counters.update(counters)
+        self._dirty = True
+
+    async def flush(self):
+        values = {}
+        if self._dirty:
+            values['progress'] = dict(self.counters)
+        if time.monotonic() - self._last_heartbeat >= self.heartbeat_interval:
+            values['heartbeat_at'] = timezone.now()
+        if not values:
+            return
+        self._dirty = False
+        if 'heartbeat_at' in values:
+            self._last_heartbeat = time.monotonic()
+        held = ScrapeTask.objects.filter(pk=self.task_pk, worker_id=self.worker_id, status=ScrapeTask.STATUS_RUNNING)
+        if not await sync_to_async(held.update)(**values):
+            raise TaskLeaseLost(f"Task {self.task_pk} is no longer held by worker {self.worker_id}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except TaskLeaseLost:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to save the progress of task {self.task_pk}: {e}")
+
+
+async def run_with_progress(runner, params, progress):
+    # Run the task while its progress is reported. The reporter only stops on a lost lease,
+    # which stops the run as well
+    work = asyncio.ensure_future(runner(params, progress_callback=progress.update))
+    reporter = asyncio.ensure_future(progress.run())
+    try:
+        await asyncio.wait([work, reporter], return_when=asyncio.FIRST_COMPLETED)
+        if not work.done():
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+            reporter.result()
+        return work.result()
+    finally:
+        reporter.cancel()
+
+
+def claim_next_task(worker_id, lease_seconds=None):
+    # Take the oldest pending task, or the oldest running task whose worker stopped renewing
+    # its heartbeat. Rows locked by another worker are skipped rather than waited on, and the
+    # conditional update keeps two workers from claiming the same task on backends without
+    # row locks
+    lease_seconds = lease_seconds or scrape_tasks_config['lease_seconds']
+    now = timezone.now()
+    orphaned = Q(status=ScrapeTask.STATUS_RUNNING) & (
+        Q(heartbeat_at__lt=now - timedelta(seconds=lease_seconds)) | Q(heartbeat_at__isnull=True)
+    )
+    with transaction.atomic():
+        task = (
+            ScrapeTask.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ScrapeTask.STATUS_PENDING) | orphaned)
+            .order_by('created_at')
+            .first()
+        )
+        if task is None:
+            return None
+
+        claimed = ScrapeTask.objects.filter(pk=task.pk, status=task.status, worker_id=task.worker_id).update(
+            status=ScrapeTask.STATUS_RUNNING,
+            worker_id=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if not claimed:
+            return None
+
+    if task.status == ScrapeTask.STATUS_RUNNING:
+        logger.warning(f"Task {task.task_id} of worker {task.worker_id} has no heartbeat for {lease_seconds}s. "
+                       f"Running it again.")
+    task.status = ScrapeTask.STATUS_RUNNING
+    task.worker_id = worker_id
+    task.started_at = now
+    task.heartbeat_at = now
+    return task
+
+
+def run_task(task):
+    # Run a claimed task on the warm browser pool and store its outcome
+    logger.info(f"Running task {task.task_id} ({task.task_type})")
+    progress = TaskProgress(task.pk, task.worker_id)
+
+    try:
+        runner = TASK_RUNNERS[task.task_type]
+        task.result = browser_pool.run(run_with_progress(runner, task.params, progress))
+        task.status = ScrapeTask.STATUS_COMPLETED
+    except TaskLeaseLost as e:
+        logger.warning(f"{e}. Stopped the run and left the task to the worker holding it.")
+        return task
+    except Exception as e:
+        logger.error(f"Task {task.task_id} failed: {e}")
+        task.error = str(e) or e.__class__.__name__
+        task.status = ScrapeTask.STATUS_FAILED
+
+    task.progress = progress.counters
+    task.finished_at = timezone.now()
+    # A task claimed again by another worker after its lease ran out is left to that worker
+    saved = ScrapeTask.objects.filter(pk=task.pk, worker_id=task.worker_id, status=ScrapeTask.STATUS_RUNNING).update(
+        status=task.status,
+        progress=task.progress,
+        result=task.result,
+        error=task.error,
+        finished_at=task.finished_at,
+    )
+    if not saved:
+        logger.warning(f"Task {task.task_id} was claimed by another worker. Dropping the outcome of this run.")
+        return task
+    logger.info(f"Task {task.task_id} {task.status}")
+    return task
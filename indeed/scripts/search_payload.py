@@ -0,0 +1,92 @@
+import json
+import logging
+from urllib.parse import urljoin
+
+from indeed.scripts.config import load_config
+from indeed.scripts.salary_parser import normalize_salary
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+search_payload_config = load_config('search_payload')
+
+# Keys of a job card that are read; the in-page extractor sends back only these
+JOBCARD_KEYS = ['jobkey', 'displayTitle', 'title', 'company', 'formattedLocation', 'salarySnippet', 'jobTypes']
+
+
+def find_jobcards_payload(html, provider=None):
+    # Return the job cards object a results page assigns to window.mosaic.providerData, or None
+    provider = provider or search_payload_config['provider']
+    marker = f'window.mosaic.providerData["{provider}"]'
+    start = html.find(marker)
+    if start == -1:
+        return None
+    start = html.find('=', start + len(marker))
+    if start == -1:
+        return None
+    start += 1
+    while start < len(html) and html[start].isspace():
+        start += 1
+    try:
+        # Decodes the one JSON object at start, whatever follows it in the script
+        payload, _ = json.JSONDecoder().raw_decode(html, start)
+    except ValueError as e:
+        logger.warning(f"Could not decode the {provider} payload: {e}")
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def build_job_summary(card, base_url):
+    # Map a job card to the JobRecord fields it holds, like build_job does for a viewjob page
+    job_id = card['jobkey']
+    salary_raw = (card.get('salarySnippet') or {}).get('text') or 'N/A'
+    salary = normalize_salary(salary_raw)
+    job_types = card.get('jobTypes') or []
+    return {
+        'job_id': job_id,
+        'job_url': urljoin(base_url, f'/viewjob?jk={job_id}'),
+        'job_title': card.get('displayTitle') or card.get('title') or 'N/A',
+        'company_name': card.get('company') or 'N/A',
+        'location': card.get('formattedLocation') or 'N/A',
+        'salary_raw': salary_raw,
+        'min_salary': salary.min_salary,
+        'max_salary': salary.max_salary,
+        'salary_unit': salary.salary_unit,
+        'job_type': ', '.join(job_type for job_type in job_types if isinstance(job_type, str)) or 'N/A',
+    }
+
+
+def read_jobcards(payload, base_url):
+    """
+    Read the job IDs, total number of jobs and job summaries of a job cards payload.
+
+    Returns None when the payload does not have the expected shape or lists no jobs, so the
+    caller can read the page's DOM instead. 'total_jobs' is None when the payload has no
+    job counts. 'summaries' maps every job ID to the JobRecord fields of its card.
+    """
+    try:
+        model = payload['metaData']['mosaicProviderJobCardsModel']
+        cards = [card for card in model['results'] if card.get('jobkey')]
+    except (KeyError, TypeError, AttributeError):
+        return None
+    if not cards:
+        return None
+
+    summaries = {}
+    for card in cards:
+        summaries.setdefault(card['jobkey'], build_job_summary(card, base_url))
+
+    total_jobs = None
+    tiers = model.get('tierSummaries') or []
+    counts = [tier.get('jobCount') for tier in tiers if isinstance(tier, dict)]
+    if counts and all(isinstance(count, int) for count in counts):
+        total_jobs = sum(counts)
+
+    return {'job_ids': list(summaries), 'total_jobs': total_jobs, 'summaries': summaries}
+
+
+def parse_search_payload(html, base_url):
+    # The results of a results page read from its embedded job cards payload, or None
+    payload = find_jobcards_payload(html)
+    return read_jobcards(payload, base_url) if payload is not None else None
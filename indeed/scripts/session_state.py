@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from contextlib import AsyncExitStack
+
+from data_scrapper import settings
+from indeed.scripts.browser_pool import browser_pool
+from indeed.scripts.config import load_config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+session_state_config = load_config('session_state')
+
+# The browser cookie export the first session of every user agent starts from
+cookies_file = os.path.join(settings.BASE_DIR, 'cookies.json')
+
+
+def read_cookies_file(path):
+    # Read a browser cookie export, with the sameSite values Playwright rejects set to 'Lax'
+    logger.info(f"Loading cookies from {path}...")
+    with open(path, 'r') as f:
+        cookies = json.load(f)
+    for cookie in cookies:
+        if 'sameSite' in cookie and cookie['sameSite'] not in ['Strict', 'Lax', 'None']:
+            logger.warning(f"Invalid sameSite value '{cookie['sameSite']}' for cookie '{cookie['name']}'. Setting to 'Lax'.")
+            cookie['sameSite'] = 'Lax'
+    return cookies
+
+
+class SessionStateStore:
+    """
+    Playwright storage-state snapshots (cookies and local storage), one per user agent.
+
+    The first context of a user agent is seeded from the cookie export, which is read and
+    validated once per process. Its storage state is taken as the user agent's snapshot
+    right away, and replaced by the state of every context that closes afterwards, so the
+    session cookies set by the site carry over to the next run. Snapshots are kept in memory
+    and in state_dir; a cookie export newer than a snapshot replaces it.
+    """
+
+    def __init__(self, state_dir, cookies_path):
+        self.state_dir = state_dir
+        self.cookies_path = cookies_path
+        self._snapshots = {}
+        self._seed_cookies = None
+        self._seed_mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            state_dir=os.path.join(settings.BASE_DIR, session_state_config['state_dir']),
+            cookies_path=cookies_file,
+        )
+
+    def _path(self, user_agent):
+        digest = hashlib.sha1(user_agent.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.state_dir, f'{digest}.json')
+
+    def _cookies_mtime(self):
+        try:
+            return os.path.getmtime(self.cookies_path)
+        except OSError:
+            return None
+
+    def seed_cookies(self):
+        # The cookie export, read again only when the file changes
+        mtime = self._cookies_mtime()
+        with self._lock:
+            if mtime is None:
+                if self._seed_cookies is None:
+                    logger.warning(f"Cookies file {self.cookies_path} not found. Starting sessions without cookies.")
+                    self._seed_cookies = []
+                return self._seed_cookies
+            if self._seed_mtime != mtime:
+                self._seed_cookies = read_cookies_file(self.cookies_path)
+                self._seed_mtime = mtime
+            return self._seed_cookies
+
+    def snapshot(self, user_agent):
+        # The storage state a new context of this user agent starts from, or None
+        cookies_mtime = self._cookies_mtime() or 0
+        path = self._path(user_agent)
+        with self._lock:
+            entry = self._snapshots.get(user_agent)
+            if entry is None and os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = (json.load(f), os.path.getmtime(path))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable session state {path}: {e}")
+                    entry = None
+            if entry is None:
+                return None
+            state, saved_at = entry
+            if saved_at < cookies_mtime:
+                # The cookie export was refreshed since, so the session is seeded from it again
+                self._snapshots.pop(user_agent, None)
+                return None
+            self._snapshots[user_agent] = entry
+            return state
+
+    def save(self, user_agent, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._path(user_agent)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with self._lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            # Replaced in one step, so other processes never read half a snapshot
+            os.replace(temp_path, path)
+            self._snapshots[user_agent] = (state, os.path.getmtime(path))
+
+
+# Shared by every scrape run of the process
+session_states = SessionStateStore.from_config()
+
+
+class _RunContext:
+    def __init__(self, context, stack, user_agent):
+        self.context = context
+        self.stack = stack
+        self.user_agent = user_agent
+        self.navigations = 0
+        self.open_pages = 0
+        self.retired = False
+
+
+class RotatingContexts:
+    """
+    The browser contexts of one scrape run, opened from the session-state snapshots.
+
+    Workers call page(slot) before every navigation and get the page of their slot. After
+    `rotate_after` navigations the current context is retired and the next pages are opened
+    on a new context with the next user agent of the pool; a retired context is closed, and
+    its storage state saved, once its last page has been handed back. setup_context and
+    setup_page are awaited on every new context and page.
+    """
+
+    def __init__(self, headless, user_agents, rotate_after, setup_context=None, setup_page=None, store=None):
+        self.headless = headless
+        self.user_agents = list(user_agents)
+        self.rotate_after = rotate_after
+        self.setup_context = setup_context
+        self.setup_page = setup_page
+        self.store = store if store is not None else session_states
+        self._next_agent = random.randrange(len(self.user_agents))
+        self._current = None
+        self._slots = {}
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.contexts_opened = 0
+        self.warm_starts = 0
+        self.navigations = 0
+
+    @classmethod
+    def from_config(cls, headless, user_agents, setup_context=None, setup_page=None):
+        return cls(
+            headless=headless,
+            user_agents=user_agents,
+            rotate_after=session_state_config['rotate_after_navigations'],
+            setup_context=setup_context,
+            setup_page=setup_page,
+        )
+
+    async def _open_context(self):
+        user_agent = self.user_agents[self._next_agent % len(self.user_agents)]
+        self._next_agent += 1
+        state = self.store.snapshot(user_agent)
+
+        stack = AsyncExitStack()
+        logger.info(f"Opening browser context with User-Agent: {user_agent}")
+        context = await stack.enter_async_context(
+            browser_pool.new_context(headless=self.headless, user_agent=user_agent, storage_state=state))
+        if state is None:
+            # A cold session: seed it from the cookie export and keep the result as the snapshot
+            cookies = self.store.seed_cookies()
+            if cookies:
+                await context.add_cookies(cookies)
+            self.store.save(user_agent, await context.storage_state())
+        else:
+            self.warm_starts += 1
+        if self.setup_context is not None:
+            await self.setup_context(context)
+        self.contexts_opened += 1
+        return _RunContext(context, stack, user_agent)
+
+    async def _close_context(self, run_context):
+        # Keep the cookies the site set during the run for the next context of the user agent
+        try:
+            self.store.save(run_context.user_agent, await run_context.context.storage_state())
+        except Exception as e:
+            logger.warning(f"Could not save the session state of {run_context.user_agent}: {e}")
+        await run_context.stack.aclose()
+
+    async def _release(self, slot):
+        entry = self._slots.pop(slot, None)
+        if entry is None:
+            return
+        page, run_context = entry
+        run_context.open_pages -= 1
+        try:
+            await page.close()
+        except Exception as e:
+            logger.warning(f"Could not close page: {e}")
+        if run_context.retired and run_context.open_pages == 0:
+            await self._close_context(run_context)
+
+    async def page(self, slot):
+        async with self._lock:
+            if self._current is None or self._current.retired:
+                self._current = await self._open_context()
+            current = self._current
+
+            entry = self._slots.get(slot)
+            if entry is None or entry[1] is not current:
+                await self._release(slot)
+                page = await current.context.new_page()
+                if self.setup_page is not None:
+                    await self.setup_page(page)
+                current.open_pages += 1
+                entry = self._slots[slot] = (page, current)
+
+            current.navigations += 1
+            self.navigations += 1
+            if self.rotate_after and current.navigations >= self.rotate_after:
+                current.retired = True
+            return entry[0]
+
+    async def close(self):
+        async with self._lock:
+            run_contexts = {id(run_context): run_context for _, run_context in self._slots.values()}
+            if self._current is not None:
+                run_contexts[id(self._current)] = self._current
+            self._slots.clear()
+            self._current = None
+            for run_context in run_contexts.values():
+                await self._close_context(run_context)
+
+    def stats(self):
+        return {
+            'contexts_opened': self.contexts_opened,
+            'warm_starts': self.warm_starts,
+            'navigations': self.navigations,
+            'rotate_after_navigations': self.rotate_after,
+        }
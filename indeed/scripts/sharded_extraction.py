@@ -0,0 +1,199 @@
+import csv
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_scrapper import settings
+from indeed.scripts.checkpoint import move_with_checkpoint
+from indeed.scripts.config import load_config
+from indeed.scripts.metrics import merge_summaries, registry
+
+# Worker processes import this module before Django is set up, so everything touching
+# models or the browser pool is imported inside the functions that need it
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+sharded_extraction_config = load_config('sharded_extraction')
+
+output_base_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output')
+
+
+def init_worker():
+    # Each worker process sets up Django for itself; its browser pool starts on first use
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'data_scrapper.settings')
+    django.setup()
+
+
+def extract_shard(shard_path, concurrency, resume, fetch_mode):
+    # Runs in a worker process, on that process's own browser pool. A worker runs one shard at a
+    # time, so the metrics drained afterwards are the shard's own; the parent adds them to its
+    # registry. Those of a failed shard are dropped with the next drain
+    from indeed.scripts.browser_pool import browser_pool
+    from indeed.scripts.scrape_job_data import extract_job_details
+
+    registry.drain()
+    result = browser_pool.run(extract_job_details(shard_path, concurrency=concurrency, resume=resume,
+                                                  fetch_mode=fetch_mode))
+    return dict(result, registry=registry.drain())
+
+
+def write_shards(file_path, job_ids, shard_size):
+    # Split the job IDs of a file into shard files. Shard names only depend on the file and
+    # the shard size, so a resumed run finds the checkpoints of the shards it left behind
+    input_name = os.path.splitext(os.path.basename(file_path))[0]
+    shard_dir = os.path.join(output_base_dir, 'shards', input_name)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shard_paths = []
+    for shard_index, start in enumerate(range(0, len(job_ids), shard_size)):
+        shard_path = os.path.join(shard_dir, f'{input_name}_shard{shard_index:04d}.csv')
+        with open(shard_path, 'w', newline='', encoding='utf-8') as shard_file:
+            writer = csv.writer(shard_file)
+            writer.writerow(['Job IDs'])
+            writer.writerows([job_id] for job_id in job_ids[start:start + shard_size])
+        shard_paths.append(shard_path)
+    return shard_dir, shard_paths
+
+
+def merge_shard_outputs(output_csv, shard_outputs):
+    # Concatenate the shard CSVs in shard order under a single header, so the merged file
+    # has the rows in the same order as a sequential run
+    from indeed.scripts.scrape_job_data import JOB_DATA_FIELDNAMES
+
+    with open(output_csv, 'w', newline='', encoding='utf-8') as merged_file:
+        csv.writer(merged_file).writerow(JOB_DATA_FIELDNAMES)
+        for shard_output in shard_outputs:
+            with open(shard_output, 'r', newline='', encoding='utf-8') as shard_file:
+                shard_file.readline()  # Skip the header
+                shutil.copyfileobj(shard_file, merged_file)
+            os.remove(shard_output)
+
+
+def extract_job_data_files_sharded(file_paths, processes=None, concurrency=None, resume=False,
+                                   shard_size=None, fetch_mode=None, progress_callback=None):
+    """
+    Extract the job details of several files across a pool of worker processes.
+
+    Every file is split into shards of at most shard_size job IDs and all shards are queued
+    at once, so large files are spread across processes as well as small ones. A file whose
+    shards all succeed gets a merged output and is moved to 'completed'; a file with a failed
+    shard is moved to 'error' and keeps its shards, which a resumed run picks up again.
+    Returns one result per file, in input order.
+    """
+    from indeed.scripts.scrape_job_data import output_dir, read_job_ids_from_file
+
+    processes = processes or sharded_extraction_config['processes']
+    shard_size = shard_size or sharded_extraction_config['shard_size']
+
+    completed_folder_path = os.path.join(output_base_dir, 'completed')
+    error_folder_path = os.path.join(output_base_dir, 'error')
+    os.makedirs(completed_folder_path, exist_ok=True)
+    os.makedirs(error_folder_path, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # When resuming, job IDs of one file are skipped in the files after it
+    seen_job_ids = set() if resume else None
+    files = []
+    for file_path in file_paths:
+        job_ids = list(dict.fromkeys(read_job_ids_from_file(file_path)))
+        skipped = 0
+        if seen_job_ids is not None:
+            new_job_ids = [job_id for job_id in job_ids if job_id not in seen_job_ids]
+            skipped = len(job_ids) - len(new_job_ids)
+            seen_job_ids.update(new_job_ids)
+            job_ids = new_job_ids
+        shard_dir, shard_paths = write_shards(file_path, job_ids, shard_size)
+        files.append({
+            'file_path': file_path,
+            'shard_dir': shard_dir,
+            'shard_paths': shard_paths,
+            'shard_results': [None] * len(shard_paths),
+            'errors': [],
+            'pending': len(shard_paths),
+            'skipped': skipped,
+        })
+
+    shards_total = sum(len(file['shard_paths']) for file in files)
+    logger.info(f"Extracting {len(files)} files as {shards_total} shards across {processes} processes")
+
+    results = [None] * len(files)
+    shards_done = 0
+
+    def finish_file(file_index):
+        file = files[file_index]
+        file_name = os.path.basename(file['file_path'])
+        input_name = os.path.splitext(file_name)[0]
+        shard_results = file['shard_results']
+
+        result = {
+            'file_name': file_name,
+            'shards': len(shard_results),
+            'jobs_extracted': sum(r['jobs_extracted'] for r in shard_results if r),
+            'jobs_failed': sum(r['jobs_failed'] for r in shard_results if r),
+            'jobs_skipped': file['skipped'] + sum(r['jobs_skipped'] for r in shard_results if r),
+            'scrape_session_ids': [r['scrape_session_id'] for r in shard_results if r],
+            'metrics': merge_summaries([r['metrics'] for r in shard_results if r]),
+        }
+
+        if file['errors']:
+            # Keep the shards and their outputs for a resumed run
+            errors = [error for _, error in sorted(file['errors'])]
+            move_with_checkpoint(file['file_path'], error_folder_path)
+            logger.error(f"File {file_name} moved to error folder: {'; '.join(errors)}")
+            result.update(status='error', errors=errors)
+        else:
+            output_csv = os.path.join(output_dir, f'{input_name}_job_data.csv')
+            merge_shard_outputs(output_csv, [r['output_file'] for r in shard_results])
+            shutil.rmtree(file['shard_dir'], ignore_errors=True)
+            move_with_checkpoint(file['file_path'], completed_folder_path)
+            logger.info(f"File {file_name} moved to completed folder.")
+            result.update(status='completed', output_file=output_csv)
+
+        results[file_index] = result
+
+    # Files without job IDs have nothing to wait for
+    for file_index, file in enumerate(files):
+        if not file['shard_paths']:
+            finish_file(file_index)
+
+    # Spawned rather than forked workers: the parent may already run the browser pool thread
+    mp_context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context, initializer=init_worker) as executor:
+        futures = {}
+        for file_index, file in enumerate(files):
+            for shard_index, shard_path in enumerate(file['shard_paths']):
+                future = executor.submit(extract_shard, shard_path, concurrency, resume, fetch_mode)
+                futures[future] = (file_index, shard_index)
+
+        for future in as_completed(futures):
+            file_index, shard_index = futures[future]
+            file = files[file_index]
+            try:
+                shard_result = future.result()
+                # Metrics of the worker process reach the metrics endpoint through this process
+                registry.merge(shard_result.pop('registry'))
+                file['shard_results'][shard_index] = shard_result
+            except Exception as e:
+                shard_name = os.path.basename(file['shard_paths'][shard_index])
+                logger.error(f"Shard {shard_name} failed: {e}")
+                file['errors'].append((shard_index, f"{shard_name}: {e}"))
+
+            file['pending'] -= 1
+            if file['pending'] == 0:
+                finish_file(file_index)
+
+            shards_done += 1
+            if progress_callback is not None:
+                progress_callback(
+                    shards_total=shards_total,
+                    shards_done=shards_done,
+                    files_total=len(files),
+                    files_done=sum(1 for result in results if result is not None),
+                )
+
+    return results
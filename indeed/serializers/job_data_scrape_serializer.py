@@ -3,4 +3,8 @@ from rest_framework import serializers
 
 class JobDataScrapeRequestSerializer(serializers.Serializer):
     file_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
-    folder_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
\ No newline at end of file
+    folder_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    concurrency = serializers.IntegerField(required=False, default=None, min_value=1)
+    resume = serializers.BooleanField(required=False, default=False)
+    processes = serializers.IntegerField(required=False, default=None, min_value=1)
+    fetch_mode = serializers.ChoiceField(choices=['browser', 'http', 'replay'], required=False)
\ No newline at end of file
@@ -0,0 +1,49 @@
+# job_id_batch_scrape_serializer.py
+from itertools import product
+
+from rest_framework import serializers
+
+from indeed.scripts.config import load_config
+from .job_id_scrape_serializer import JobIdScrapeRequestSerializer
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    job_title = serializers.CharField(max_length=1000, required=True)
+    location = serializers.CharField(max_length=1000, required=True)
+
+
+class JobIdBatchScrapeRequestSerializer(JobIdScrapeRequestSerializer):
+    # The searches come as a list of queries, or as every combination of titles and locations;
+    # the other options are those of a single search and apply to all of them
+    job_title = None
+    location = None
+    queries = SearchQuerySerializer(many=True, required=False)
+    job_titles = serializers.ListField(child=serializers.CharField(max_length=1000), required=False, allow_empty=False)
+    locations = serializers.ListField(child=serializers.CharField(max_length=1000), required=False, allow_empty=False)
+
+    def validate(self, data):
+        queries = data.pop('queries', None)
+        job_titles = data.pop('job_titles', None)
+        locations = data.pop('locations', None)
+
+        if queries is not None and (job_titles is not None or locations is not None):
+            raise serializers.ValidationError("Provide either 'queries' or 'job_titles' and 'locations', not both.")
+        max_queries = load_config('get_job_ids', 'defaults')['max_batch_queries']
+        if queries is None:
+            if job_titles is None or locations is None:
+                raise serializers.ValidationError("Provide either 'queries' or both 'job_titles' and 'locations'.")
+            # Checked before the combinations are built, so a large request is never expanded
+            if len(set(job_titles)) * len(set(locations)) > max_queries:
+                raise serializers.ValidationError(
+                    f"'job_titles' and 'locations' combine into more than {max_queries} searches.")
+            queries = [{'job_title': job_title, 'location': location}
+                       for job_title, location in product(job_titles, locations)]
+        if not queries:
+            raise serializers.ValidationError({'queries': "At least one query is required."})
+
+        # Drop repeated searches, keeping the order of their first occurrence
+        unique_queries = {(query['job_title'], query['location']): None for query in queries}
+        if len(unique_queries) > max_queries:
+            raise serializers.ValidationError({'queries': f"At most {max_queries} searches are allowed in a batch."})
+        data['queries'] = [{'job_title': job_title, 'location': location} for job_title, location in unique_queries]
+        return data
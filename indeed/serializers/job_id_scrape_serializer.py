@@ -9,4 +9,7 @@ class JobIdScrapeRequestSerializer(serializers.Serializer):
     base_url = serializers.URLField(required=False, default=None)
     network_idle_timeout = serializers.IntegerField(required=False, default=None)
     job_count_class = serializers.CharField(max_length=1000, required=False, default=None)
-    job_link_data_attr = serializers.CharField(max_length=1000, required=False, default=None)
\ No newline at end of file
+    job_link_data_attr = serializers.CharField(max_length=1000, required=False, default=None)
+    concurrency = serializers.IntegerField(required=False, default=None, min_value=1)
+    fetch_mode = serializers.ChoiceField(choices=['browser', 'replay'], required=False)
+    incremental = serializers.BooleanField(required=False, default=None)
\ No newline at end of file
@@ -0,0 +1,10 @@
+# scrape_task_serializer.py
+from rest_framework import serializers
+
+from indeed.models import ScrapeTask
+
+class ScrapeTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScrapeTask
+        fields = ['task_id', 'task_type', 'status', 'params', 'progress', 'result', 'error',
+                  'created_at', 'started_at', 'heartbeat_at', 'finished_at']
@@ -1,3 +1,1487 @@
-from django.test import TestCase
+"""
+Offline regression and benchmark suite for the scraping pipeline.
 
-# Create your tests here.
+Recorded fixture pages under indeed/fixtures/pages are served by a local stand-in for Indeed,
+and the real extract_job_ids and extract_job_details code paths are pointed at it. Benchmarks
+report pages/sec, parse µs/page, DB writes/sec and peak RSS. The baselines in
+indeed/fixtures/benchmark_baselines.json are wall-clock figures of one machine, so a metric is only
+checked against the tolerance of its baseline with RUN_BENCHMARKS=1. Run with
+UPDATE_BENCHMARK_BASELINES=1 to record new baselines instead.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from rest_framework.test import APIClient
+
+from indeed.models import JobRecord, ScrapeTask
+from indeed.scripts import metrics, scrape_job_data, scrape_job_ids, scrape_tasks, sharded_extraction
+from indeed.scripts.browser_pool import BrowserPool
+from indeed.scripts.checkpoint import STATUS_DONE, STATUS_FAILED, ExtractionCheckpoint, checkpoint_path
+from indeed.scripts.config import load_config
+from indeed.scripts.in_page_extraction import InPageExtractor
+from indeed.scripts.http_fetcher import HttpFetcher
+from indeed.scripts.job_parser import parse_job_page
+from indeed.scripts.job_persistence import save_job_details
+from indeed.scripts.network_filter import ResourceBlocker
+from indeed.scripts.page_cache import PageCache, page_cache_config
+from indeed.scripts.page_readiness import PageReadiness
+from indeed.scripts.rate_control import AdaptiveRateController, BlockedPageError, block_reason, rate_control_config
+from indeed.scripts.retry_queue import RetryQueue
+from indeed.scripts.salary_parser import normalize_salary
+from indeed.scripts.scrape_tasks import TaskLeaseLost, TaskProgress
+from indeed.scripts.session_state import SessionStateStore
+from indeed.serializers.job_id_batch_scrape_serializer import JobIdBatchScrapeRequestSerializer
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+FIXTURES_DIR = os.path.join(settings.BASE_DIR, 'indeed', 'fixtures')
+PAGES_DIR = os.path.join(FIXTURES_DIR, 'pages')
+BASELINES_PATH = os.path.join(FIXTURES_DIR, 'benchmark_baselines.json')
+UPDATE_BASELINES = os.environ.get('UPDATE_BENCHMARK_BASELINES') == '1'
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS') == '1'
+
+logger = logging.getLogger(__name__)
+
+JOBS_PER_PAGE = 15
+TOTAL_SEARCH_JOBS = 150
+VIEWJOB_FIXTURES = ['viewjob_salary.html', 'viewjob_no_salary.html', 'viewjob_external_apply.html']
+
+
+def load_page(name):
+    with open(os.path.join(PAGES_DIR, name), 'r', encoding='utf-8') as page_file:
+        return page_file.read()
+
+
+def render(template, **values):
+    return re.sub(r'\{\{(\w+)\}\}', lambda match: str(values[match.group(1)]), template)
+
+
+def fixture_job_id(number):
+    return f'bench{number:05d}'
+
+
+def viewjob_fixture_for(job_id):
+    # Spread the job IDs evenly over the viewjob variants
+    return VIEWJOB_FIXTURES[int(job_id[len('bench'):]) % len(VIEWJOB_FIXTURES)]
+
+
+class FixtureServer:
+    """
+    Local stand-in for Indeed serving the fixture pages.
+
+    /jobs?q=&l=&start= serves a results page of fixture job IDs, /viewjob?jk= a viewjob
+    variant picked from the job ID, and /rc/clk?jk= redirects to /apply/<job ID>, like the
+    external apply links of Indeed.
+    """
+
+    def __init__(self, total_jobs=TOTAL_SEARCH_JOBS, unique_jobs=None):
+        self.total_jobs = total_jobs
+        # Past unique_jobs, results pages repeat the last page of new job IDs, like Indeed does
+        # when a search has fewer jobs than its job count claims
+        self.unique_jobs = unique_jobs or total_jobs
+        self.templates = {name: load_page(name) for name in VIEWJOB_FIXTURES + ['search_results.html',
+                                                                                 'search_job_card.html']}
+        self.requests = 0
+        self.search_queries = []
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self):
+        fixture_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fixture_server.requests += 1
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == '/jobs':
+                    self.send_html(fixture_server.search_page(query))
+                elif url.path == '/viewjob':
+                    self.send_html(fixture_server.viewjob_page(query.get('jk', '')))
+                elif url.path == '/rc/clk':
+                    self.send_response(302)
+                    self.send_header('Location', f"/apply/{query.get('jk', '')}")
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                elif url.path.startswith('/apply/'):
+                    self.send_html('<html><body>Company careers page</body></html>')
+                else:
+                    self.send_error(404)
+
+            def send_html(self, html):
+                body = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def search_page(self, query):
+        self.search_queries.append(query)
+        start = int(query.get('start', 0))
+        if start >= self.unique_jobs:
+            start = (self.unique_jobs - 1) // JOBS_PER_PAGE * JOBS_PER_PAGE
+        cards = ''.join(
+            render(self.templates['search_job_card.html'], job_id=fixture_job_id(number), title=f'Developer {number}')
+            for number in range(start, min(start + JOBS_PER_PAGE, self.unique_jobs))
+        )
+        return render(self.templates['search_results.html'], query=query.get('q', ''), location=query.get('l', ''),
+                      total_jobs=self.total_jobs, job_cards=cards, next_start=start + JOBS_PER_PAGE)
+
+    def viewjob_page(self, job_id):
+        return render(self.templates[viewjob_fixture_for(job_id)], job_id=job_id, title=f'Developer {job_id}',
+                      apply_url=f'{self.base_url}/rc/clk?jk={job_id}')
+
+
+def load_baselines():
+    with open(BASELINES_PATH, 'r', encoding='utf-8') as baselines_file:
+        return json.load(baselines_file)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class BenchmarkMixin:
+    """Records benchmark metrics and checks them against the stored baselines."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Each benchmark class saves only the metrics it measured itself
+        cls.measured = {}
+
+    def record_metric(self, name, value):
+        self.measured[name] = round(value, 2)
+        logger.info(f"Benchmark {name}: {value:.2f}")
+        if UPDATE_BASELINES or not RUN_BENCHMARKS:
+            return
+
+        baselines = load_baselines()
+        baseline = baselines['metrics'].get(name)
+        if baseline is None:
+            return
+        # Noisy metrics set a wider tolerance of their own
+        tolerance = baseline.get('tolerance', baselines['tolerance'])
+        if baseline['higher_is_better']:
+            limit = baseline['value'] * (1 - tolerance)
+            self.assertGreaterEqual(value, limit, f"{name} regressed: {value:.2f} < {limit:.2f} "
+                                                  f"(baseline {baseline['value']})")
+        else:
+            limit = baseline['value'] * (1 + tolerance)
+            self.assertLessEqual(value, limit, f"{name} regressed: {value:.2f} > {limit:.2f} "
+                                               f"(baseline {baseline['value']})")
+
+    @classmethod
+    def save_baselines(cls):
+        if not UPDATE_BASELINES or not cls.measured:
+            return
+        baselines = load_baselines()
+        for name, value in cls.measured.items():
+            baselines['metrics'].setdefault(name, {'higher_is_better': name.endswith('_per_sec')})
+            baselines['metrics'][name]['value'] = value
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write('\n')
+
+
+class LoadConfigTests(SimpleTestCase):
+    def test_nested_section(self):
+        self.assertIn('jobs_per_page', load_config('get_job_ids', 'defaults'))
+
+    def test_missing_section_raises(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'get_job_ids.missing'"):
+            load_config('get_job_ids', 'missing')
+
+
+class SalaryParserTests(SimpleTestCase):
+    def assert_salary(self, text, min_salary, max_salary, salary_unit):
+        salary = normalize_salary(text)
+        self.assertEqual((salary.min_salary, salary.max_salary, salary.salary_unit),
+                         (min_salary, max_salary, salary_unit))
+        return salary
+
+    def test_range(self):
+        self.assert_salary('$50,000–$60,000 a year', Decimal('50000'), Decimal('60000'), 'year')
+
+    def test_range_in_thousands(self):
+        salary = self.assert_salary('$60K–$70K a year', Decimal('60000'), Decimal('70000'), 'year')
+        self.assertEqual((salary.annual_min, salary.annual_max), (Decimal('60000.00'), Decimal('70000.00')))
+
+    def test_range_without_unit(self):
+        self.assert_salary('$60k-$70k', Decimal('60000'), Decimal('70000'), 'other')
+
+    def test_fixed(self):
+        self.assert_salary('$22.50 an hour', Decimal('22.50'), Decimal('22.50'), 'hour')
+
+    def test_from_sets_only_the_minimum(self):
+        salary = self.assert_salary('From $20 an hour', Decimal('20'), None, 'hour')
+        self.assertEqual((salary.annual_min, salary.annual_max), (Decimal('41600.00'), None))
+
+    def test_up_to_sets_only_the_maximum(self):
+        salary = self.assert_salary('Up to $80K a year', None, Decimal('80000'), 'year')
+        self.assertEqual((salary.annual_min, salary.annual_max), (None, Decimal('80000.00')))
+
+    def test_no_salary(self):
+        self.assertIsNone(normalize_salary('N/A').min_salary)
+        self.assertIsNone(normalize_salary('Competitive pay').max_salary)
+
+
+class ParserRegressionTests(SimpleTestCase):
+    def parse_fixture(self, name, job_id='bench00001'):
+        html = render(load_page(name), job_id=job_id, title='Python Developer',
+                      apply_url=f'https://ca.indeed.com/rc/clk?jk={job_id}')
+        return parse_job_page(html)
+
+    def test_viewjob_with_salary(self):
+        record = self.parse_fixture('viewjob_salary.html')
+        self.assertEqual(record['job_title'], 'Python Developer')
+        self.assertEqual(record['company_name'], 'Acme Corp')
+        self.assertEqual(record['location'], 'Toronto, ON')
+        self.assertEqual(record['salary_raw'], '$50,000–$60,000 a year')
+        self.assertEqual(record['job_type'], 'Full-time, Permanent')
+        self.assertEqual(record['shift_and_schedule'], 'Monday to Friday, Day shift')
+        self.assertEqual(record['apply_link'], 'Indeed Easy Apply')
+        self.assertFalse(record['external_apply'])
+        self.assertIn('<li>Build and maintain Django services</li>', record['job_description_html'])
+        self.assertIn('looking for a Python Developer to join', record['job_description_text'])
+
+        salary = normalize_salary(record['salary_raw'])
+        self.assertEqual((salary.min_salary, salary.max_salary, salary.salary_unit),
+                         (Decimal('50000'), Decimal('60000'), 'year'))
+
+    def test_viewjob_without_salary(self):
+        record = self.parse_fixture('viewjob_no_salary.html')
+        self.assertEqual(record['salary_raw'], 'N/A')
+        self.assertIsNone(normalize_salary(record['salary_raw']).min_salary)
+        self.assertEqual(record['job_title'], 'Python Developer')
+
+    def test_viewjob_with_nested_insights(self):
+        record = self.parse_fixture('viewjob_nested_insights.html')
+        self.assertEqual(record['salary_raw'], '$25–$30 an hour')
+        self.assertEqual(record['job_type'], 'Part-time, Contract')
+        self.assertEqual(record['shift_and_schedule'], 'Weekends as needed')
+        self.assertEqual(record['company_name'], 'Acme Corp')
+        self.assertEqual(record['apply_link'], 'Indeed Easy Apply')
+        self.assertEqual(record['job_description_text'], 'We are looking for a Python Developer to help on weekends.')
+
+    def test_viewjob_with_external_apply(self):
+        record = self.parse_fixture('viewjob_external_apply.html')
+        self.assertTrue(record['external_apply'])
+        self.assertEqual(record['apply_link'], 'https://ca.indeed.com/rc/clk?jk=bench00001')
+        salary = normalize_salary(record['salary_raw'])
+        self.assertEqual((salary.min_salary, salary.max_salary, salary.salary_unit),
+                         (Decimal('22.50'), Decimal('22.50'), 'hour'))
+        self.assertEqual(salary.annual_min, Decimal('46800.00'))
+
+    def test_search_page_job_ids(self):
+        server = FixtureServer()
+        server.templates = {name: load_page(name) for name in ['search_results.html', 'search_job_card.html']}
+        html = server.search_page({'q': 'python', 'l': 'Toronto', 'start': '15'})
+        job_ids = scrape_job_ids.parse_job_ids(html, 'data-jk')
+        self.assertEqual(job_ids, [fixture_job_id(number) for number in range(15, 30)])
+
+    def test_search_page_results(self):
+        server = FixtureServer()
+        server.templates = {name: load_page(name) for name in ['search_results.html', 'search_job_card.html']}
+        html = server.search_page({'q': 'python', 'l': 'Toronto', 'start': '0'})
+        results = scrape_job_ids.parse_search_page(html, 'jobsearch-JobCountAndSortPane-jobCount', 'data-jk',
+                                                   'https://ca.indeed.com/jobs')
+        self.assertEqual(results, {'job_ids': [fixture_job_id(number) for number in range(15)],
+                                   'total_jobs': TOTAL_SEARCH_JOBS, 'summaries': {}})
+
+    def test_search_page_payload(self):
+        payload = {'metaData': {'mosaicProviderJobCardsModel': {
+            'results': [
+                {'jobkey': 'abc123', 'displayTitle': 'Python Developer', 'company': 'Acme Corp',
+                 'formattedLocation': 'Toronto, ON', 'salarySnippet': {'text': '$50,000–$60,000 a year'},
+                 'jobTypes': ['Full-time']},
+                {'jobkey': 'def456', 'title': 'Data Engineer', 'company': 'Initech'},
+            ],
+            'tierSummaries': [{'jobCount': 120}, {'jobCount': 30}],
+        }}}
+        html = ('<html><body><script>window.mosaic.providerData["mosaic-provider-jobcards"]='
+                f'{json.dumps(payload)};window.mosaic.providerData["other"]={{}};</script></body></html>')
+        results = scrape_job_ids.parse_search_page(html, 'jobsearch-JobCountAndSortPane-jobCount', 'data-jk',
+                                                   'https://ca.indeed.com/jobs')
+        self.assertEqual(results['job_ids'], ['abc123', 'def456'])
+        self.assertEqual(results['total_jobs'], 150)
+
+        summary = results['summaries']['abc123']
+        self.assertEqual(summary['job_url'], 'https://ca.indeed.com/viewjob?jk=abc123')
+        self.assertEqual((summary['job_title'], summary['company_name'], summary['location'], summary['job_type']),
+                         ('Python Developer', 'Acme Corp', 'Toronto, ON', 'Full-time'))
+        self.assertEqual((summary['min_salary'], summary['max_salary'], summary['salary_unit']),
+                         (Decimal('50000'), Decimal('60000'), 'year'))
+        self.assertEqual(results['summaries']['def456']['salary_raw'], 'N/A')
+
+        # Without the payload, or with payloads turned off, the job links of the DOM are read
+        results = scrape_job_ids.parse_search_page(html, 'jobsearch-JobCountAndSortPane-jobCount', 'data-jk',
+                                                   'https://ca.indeed.com/jobs', use_payload=False)
+        self.assertEqual(results, {'job_ids': [], 'total_jobs': 0, 'summaries': {}})
+
+
+@skipUnless(os.environ.get('BENCHMARK_BROWSER') == '1', "Set BENCHMARK_BROWSER=1 to run the in-page extraction scripts")
+class InPageExtractionTests(SimpleTestCase):
+    def extract(self, extract_records):
+        from indeed.scripts.browser_pool import browser_pool
+
+        async def run():
+            async with browser_pool.new_context() as context:
+                page = await context.new_page()
+                return await extract_records(page)
+        return browser_pool.run(run())
+
+    def test_viewjob_records_match_the_html_parser(self):
+        extractor = InPageExtractor.from_config(enabled=True)
+        pages = [render(load_page(name), job_id='bench00001', title='Python Developer',
+                        apply_url='https://ca.indeed.com/rc/clk?jk=bench00001')
+                 for name in VIEWJOB_FIXTURES]
+
+        async def extract_records(page):
+            records = []
+            for html in pages:
+                await page.set_content(html)
+                records.append(await extractor.job_record(page))
+            return records
+
+        for html, record in zip(pages, self.extract(extract_records)):
+            expected = parse_job_page(html)
+            # The browser serializes the description markup its own way
+            self.assertEqual({**record, 'job_description_html': None}, {**expected, 'job_description_html': None})
+
+    def test_search_results_match_the_html_parser(self):
+        extractor = InPageExtractor.from_config(enabled=True)
+        server = FixtureServer()
+        server.templates = {name: load_page(name) for name in ['search_results.html', 'search_job_card.html']}
+        html = server.search_page({'q': 'python', 'l': 'Toronto', 'start': '15'})
+
+        async def extract_records(page):
+            await page.set_content(html)
+            return await extractor.search_results(page, 'jobsearch-JobCountAndSortPane-jobCount', 'data-jk')
+
+        self.assertEqual(scrape_job_ids.build_search_results(self.extract(extract_records), 'https://ca.indeed.com/jobs'),
+                         scrape_job_ids.parse_search_page(html, 'jobsearch-JobCountAndSortPane-jobCount', 'data-jk',
+                                                          'https://ca.indeed.com/jobs'))
+
+
+class StubBrowser:
+    def __init__(self, headless):
+        self.headless = headless
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **options):
+        return mock.AsyncMock()
+
+    async def close(self):
+        self.closed = True
+
+
+class BrowserPoolTests(SimpleTestCase):
+    def make_pool(self):
+        pool = BrowserPool(max_browsers=1, max_contexts_per_browser=4, prelaunch=0, headless=True)
+        pool._lock = asyncio.Condition()
+        pool._playwright = mock.Mock()
+        pool._playwright.chromium.launch = mock.AsyncMock(side_effect=lambda headless: StubBrowser(headless))
+        return pool
+
+    def test_browser_in_use_is_not_recycled_for_other_headless_setting(self):
+        pool = self.make_pool()
+
+        async def run():
+            async with pool.new_context(headless=True):
+                headless_browser = pool._browsers[0]
+                headed = asyncio.ensure_future(pool._acquire_browser(headless=False))
+                await asyncio.sleep(0.01)
+                # The headed request waits while the headless browser serves a context
+                self.assertFalse(headed.done())
+                self.assertFalse(headless_browser.closed)
+            browser = await asyncio.wait_for(headed, timeout=1)
+            self.assertTrue(headless_browser.closed)
+            self.assertFalse(browser.headless)
+
+        asyncio.run(run())
+
+    def test_full_pool_waits_instead_of_exceeding_the_context_cap(self):
+        pool = self.make_pool()
+        pool.max_contexts_per_browser = 2
+
+        async def run():
+            first = await pool._acquire_browser(headless=True)
+            await pool._acquire_browser(headless=True)
+            third = asyncio.ensure_future(pool._acquire_browser(headless=True))
+            await asyncio.sleep(0.01)
+            self.assertFalse(third.done())
+            self.assertEqual(pool._active_contexts[first], 2)
+
+            await pool._release_browser(first)
+            self.assertIs(await asyncio.wait_for(third, timeout=1), first)
+            self.assertEqual(pool._active_contexts[first], 2)
+
+        asyncio.run(run())
+
+
+class FakeRoute:
+    """A Playwright route of a request with the given URL and resource type, recording how it was handled."""
+
+    def __init__(self, url, resource_type):
+        self.request = mock.Mock(url=url, resource_type=resource_type)
+        self.handled = None
+
+    async def abort(self):
+        self.handled = 'aborted'
+
+    async def continue_(self):
+        self.handled = 'continued'
+
+
+class ResourceBlockerTests(SimpleTestCase):
+    def make_blocker(self, **overrides):
+        options = dict(enabled=True, block_resource_types=['image', 'font'],
+                       block_url_patterns=[r'tracker\.example', r'\.css(\?|$)'],
+                       allow_url_patterns=[r'indeed\.com/logo'],
+                       estimated_bytes={'image': 40000, 'font': 30000, 'other': 5000})
+        options.update(overrides)
+        return ResourceBlocker(**options)
+
+    def test_should_block(self):
+        blocker = self.make_blocker()
+        # Denied by resource type or by URL
+        self.assertTrue(blocker.should_block('https://cdn.example/photo.jpg', 'image'))
+        self.assertTrue(blocker.should_block('https://tracker.example/collect', 'xhr'))
+        self.assertTrue(blocker.should_block('https://cdn.example/site.css?v=2', 'other'))
+        # Anything else passes, and an allow pattern wins over both kinds of deny rule
+        self.assertFalse(blocker.should_block('https://www.indeed.com/viewjob?jk=1', 'document'))
+        self.assertFalse(blocker.should_block('https://www.indeed.com/logo.png', 'image'))
+        self.assertFalse(blocker.should_block('https://www.indeed.com/logo.css', 'stylesheet'))
+
+    def test_configured_rules(self):
+        blocker = ResourceBlocker.from_config()
+        self.assertTrue(blocker.should_block('https://www.indeed.com/images/logo.svg', 'image'))
+        self.assertTrue(blocker.should_block('https://www.google-analytics.com/analytics.js', 'script'))
+        self.assertFalse(blocker.should_block('https://www.indeed.com/viewjob?jk=abc', 'document'))
+        self.assertFalse(blocker.should_block('https://www.indeed.com/jobs?q=python', 'xhr'))
+
+    def test_blocked_requests_are_aborted_and_counted(self):
+        blocker = self.make_blocker()
+        routes = [FakeRoute('https://cdn.example/a.png', 'image'),
+                  FakeRoute('https://cdn.example/b.png', 'image'),
+                  FakeRoute('https://cdn.example/font.woff2', 'font'),
+                  FakeRoute('https://tracker.example/pixel', 'ping'),
+                  FakeRoute('https://www.indeed.com/logo.png', 'image'),
+                  FakeRoute('https://www.indeed.com/viewjob?jk=1', 'document')]
+
+        async def handle_all():
+            for route in routes:
+                await blocker._handle_route(route)
+
+        asyncio.run(handle_all())
+        self.assertEqual([route.handled for route in routes], ['aborted'] * 4 + ['continued'] * 2)
+        # Resource types without an estimate of their own count as 'other'
+        self.assertEqual(blocker.stats(), {
+            'blocked_requests': 4,
+            'allowed_requests': 2,
+            'estimated_bytes_saved': 2 * 40000 + 30000 + 5000,
+            'blocked_by_type': {'image': 2, 'font': 1, 'ping': 1},
+        })
+
+    def test_disabled_blocker_routes_nothing(self):
+        context = mock.Mock(route=mock.AsyncMock())
+        asyncio.run(self.make_blocker(enabled=False).attach(context))
+        context.route.assert_not_called()
+        asyncio.run(self.make_blocker().attach(context))
+        context.route.assert_awaited_once()
+
+
+class StubPage:
+    """A page whose selector and load state waits succeed or time out as told, serving the given HTML."""
+
+    def __init__(self, html='', selector_found=True, load_state_reached=True):
+        self.html = html
+        self.selector_found = selector_found
+        self.load_state_reached = load_state_reached
+        self.calls = []
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.calls.append(('goto', wait_until))
+        return mock.Mock(status=200)
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        self.calls.append(('wait_for_selector', selector))
+        if not self.selector_found:
+            raise PlaywrightTimeoutError(f'Timeout {timeout}ms exceeded.')
+
+    async def wait_for_load_state(self, state, timeout=None):
+        self.calls.append(('wait_for_load_state', state))
+        if not self.load_state_reached:
+            raise PlaywrightTimeoutError(f'Timeout {timeout}ms exceeded.')
+
+    async def content(self):
+        return self.html
+
+
+class PageReadinessTests(SimpleTestCase):
+    STRATEGY = {'wait_until': 'domcontentloaded', 'selector': '#jobDescriptionText', 'selector_timeout': 100,
+                'fallback': 'networkidle', 'fallback_timeout': 100}
+
+    def goto(self, readiness, page, page_type='viewjob'):
+        return asyncio.run(readiness.goto(page, 'https://ca.indeed.com/viewjob?jk=1', page_type, 1000))
+
+    def test_ready_once_the_selector_is_attached(self):
+        readiness = PageReadiness({'viewjob': self.STRATEGY})
+        page = StubPage()
+        self.assertEqual(self.goto(readiness, page).status, 200)
+        self.assertEqual(page.calls, [('goto', 'domcontentloaded'), ('wait_for_selector', '#jobDescriptionText')])
+        self.assertEqual(readiness.stats()['viewjob']['outcomes'], {'selector': 1})
+
+    def test_selector_timeout_falls_back_to_the_load_state(self):
+        readiness = PageReadiness({'viewjob': self.STRATEGY, 'search': dict(self.STRATEGY, fallback=None)})
+        page = StubPage(selector_found=False)
+        self.goto(readiness, page)
+        self.assertEqual(page.calls[-1], ('wait_for_load_state', 'networkidle'))
+        # Without a fallback the page is parsed straight away
+        page = StubPage(selector_found=False)
+        self.goto(readiness, page, 'search')
+        self.assertNotIn('wait_for_load_state', [call for call, _ in page.calls])
+        self.assertEqual(readiness.stats()['viewjob']['outcomes'], {'fallback': 1})
+        self.assertEqual(readiness.stats()['search']['outcomes'], {'fallback': 1})
+
+    def test_what_rendered_is_parsed_when_every_wait_times_out(self):
+        readiness = PageReadiness({'viewjob': self.STRATEGY})
+        html = render(load_page('viewjob_salary.html'), job_id='bench00001', title='Python Developer',
+                      apply_url='https://ca.indeed.com/rc/clk?jk=bench00001')
+        page = StubPage(html, selector_found=False, load_state_reached=False)
+        job = asyncio.run(scrape_job_data.scrape_job_page(page, 'bench00001', 'https://ca.indeed.com/viewjob',
+                                                          1000, readiness))
+        self.assertEqual(job['job_title'], parse_job_page(html)['job_title'])
+        self.assertEqual(job['job_id'], 'bench00001')
+        self.assertEqual(readiness.stats()['viewjob']['outcomes'], {'timeout': 1})
+
+    def test_stats(self):
+        readiness = PageReadiness({'viewjob': self.STRATEGY, 'search': self.STRATEGY})
+        # Start and end times of three waits lasting 10, 50 and 20 ms
+        clock = [0.0, 0.010, 1.0, 1.050, 2.0, 2.020]
+        with mock.patch('indeed.scripts.page_readiness.time', mock.Mock(monotonic=mock.Mock(side_effect=clock))):
+            self.goto(readiness, StubPage())
+            self.goto(readiness, StubPage(selector_found=False))
+            self.goto(readiness, StubPage(selector_found=False, load_state_reached=False))
+        # Page types without pages are left out
+        self.assertEqual(readiness.stats(), {'viewjob': {
+            'pages': 3, 'median_ms': 20.0, 'max_ms': 50.0, 'outcomes': {'selector': 1, 'fallback': 1, 'timeout': 1},
+        }})
+
+
+class ExtractionCheckpointTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.file_path = os.path.join(self.tmp_dir, 'ids.csv')
+        checkpoint = ExtractionCheckpoint(self.file_path)
+        checkpoint.record('a', STATUS_DONE)
+        checkpoint.record('b', STATUS_FAILED)
+        checkpoint.close()
+
+    def test_resume_continues_the_checkpoint(self):
+        checkpoint = ExtractionCheckpoint(self.file_path, resume=True)
+        checkpoint.record('c', STATUS_DONE)
+        checkpoint.close()
+        self.assertEqual(ExtractionCheckpoint(self.file_path).completed_ids(), {'a', 'c'})
+
+    def test_fresh_run_starts_the_checkpoint_over(self):
+        checkpoint = ExtractionCheckpoint(self.file_path, resume=False)
+        self.assertEqual(checkpoint.statuses, {})
+        checkpoint.record('c', STATUS_DONE)
+        checkpoint.close()
+        # A later resume only skips what the fresh run wrote to its output
+        self.assertEqual(ExtractionCheckpoint(self.file_path).completed_ids(), {'c'})
+
+
+class RateControlTests(SimpleTestCase):
+    def make_controller(self, **overrides):
+        options = dict(scraper='test', max_concurrency=8, initial_concurrency=2, min_concurrency=1,
+                       additive_increase=1, success_window=2, multiplicative_decrease=0.5, initial_rate=2.0,
+                       min_rate=0.2, max_rate=4.0, rate_increase=1.0, burst=5, cooldown_seconds=0)
+        options.update(overrides)
+        return AdaptiveRateController(**options)
+
+    def test_additive_increase_after_healthy_responses(self):
+        controller = self.make_controller()
+        for _ in range(6):
+            controller.record('https://ca.indeed.com/viewjob?jk=1', 'ok')
+        self.assertEqual(controller.stats()['concurrency'], 5)
+        self.assertEqual(controller.stats()['requests_per_second'], {'ca.indeed.com': 4.0})
+
+    def test_multiplicative_decrease_on_block_signals(self):
+        controller = self.make_controller(initial_concurrency=8)
+        controller.record('https://ca.indeed.com/viewjob?jk=1', 'rate_limited')
+        controller.record('https://ca.indeed.com/viewjob?jk=2', 'timeout')
+        controller.record('https://ca.indeed.com/viewjob?jk=3', 'error')
+        self.assertEqual(controller.stats()['concurrency'], 2)
+        self.assertEqual(controller.stats()['requests_per_second'], {'ca.indeed.com': 0.5})
+        self.assertEqual(controller.decreases, 2)
+
+    def test_cooldown_cuts_once_per_overload(self):
+        controller = self.make_controller(initial_concurrency=8, cooldown_seconds=60)
+        for _ in range(3):
+            controller.record('https://ca.indeed.com/viewjob?jk=1', 'blocked')
+        self.assertEqual(controller.stats()['concurrency'], 4)
+
+    def test_slot_limits_requests_in_flight(self):
+        controller = self.make_controller(initial_rate=1000.0, burst=1000)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with controller.slot('https://ca.indeed.com/viewjob'):
+                peak = max(peak, controller.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(10)))
+
+        asyncio.run(run())
+        self.assertEqual(peak, 2)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_block_reason(self):
+        self.assertEqual(block_reason(429, ''), 'rate_limited')
+        self.assertEqual(block_reason(200, '<div>Please complete the CAPTCHA</div>'), 'blocked')
+        self.assertIsNone(block_reason(200, '<div id="jobDescriptionText">captcha</div>', 'id="jobDescriptionText"'))
+        self.assertIsNone(block_reason(200, load_page('viewjob_salary.html')))
+
+
+class HttpFetcherTests(SimpleTestCase):
+    def setUp(self):
+        self.fetcher = HttpFetcher.from_config('test-agent', os.path.join(self.id(), 'missing-cookies.json'))
+        self.addCleanup(lambda: asyncio.run(self.fetcher.close()))
+
+    def test_response_without_required_marker_falls_back_to_the_browser(self):
+        self.assertEqual(self.fetcher.check_response(200, '<html><div id="app"></div></html>'), 'incomplete')
+
+    def test_job_page_mentioning_a_block_marker_is_usable(self):
+        html = render(load_page('viewjob_salary.html'), job_id='bench00001', title='CAPTCHA Solver',
+                      apply_url='https://ca.indeed.com/rc/clk?jk=bench00001')
+        self.assertIsNone(self.fetcher.check_response(200, html))
+        self.assertEqual(self.fetcher.check_response(429, html), 'rate_limited')
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_async_round_trip_runs_off_the_event_loop(self):
+        cache = PageCache(self.tmp_dir, ttl_seconds=3600, max_bytes=1024 * 1024)
+        put_threads = []
+        put = cache.put
+
+        def recording_put(*args):
+            put_threads.append(threading.current_thread())
+            put(*args)
+
+        async def run():
+            with mock.patch.object(cache, 'put', recording_put):
+                await cache.aput('https://ca.indeed.com/viewjob?jk=a', '<html>a</html>')
+            return await cache.aget('https://ca.indeed.com/viewjob?jk=a')
+
+        self.assertEqual(asyncio.run(run()), '<html>a</html>')
+        self.assertNotEqual(put_threads, [threading.current_thread()])
+        cache.close(evict=False)
+
+    def test_close_evicts_in_the_background(self):
+        cache = PageCache(self.tmp_dir, ttl_seconds=60, max_bytes=1024 * 1024)
+        cache.put('https://ca.indeed.com/viewjob?jk=a', '<html>a</html>', fetched_at=time.time() - 3600)
+        cache.close()
+        for thread in threading.enumerate():
+            if thread.name == 'page-cache-evict':
+                thread.join(timeout=5)
+
+        cache = PageCache(self.tmp_dir, ttl_seconds=60, max_bytes=1024 * 1024)
+        self.assertIsNone(cache.get('https://ca.indeed.com/viewjob?jk=a'))
+        cache.close(evict=False)
+
+
+class RetryQueueTests(SimpleTestCase):
+    def test_drain_retries_with_backoff_until_max_attempts(self):
+        queue = RetryQueue(max_attempts=3, base_delay=0.001, max_delay=0.01, jitter=0.5)
+        queue.add('flaky', 'flaky', BlockedPageError('https://ca.indeed.com/viewjob?jk=flaky', 'rate_limited'))
+        queue.add('broken', 'broken', asyncio.TimeoutError())
+        attempts = {'flaky': 0, 'broken': 0}
+
+        async def retry(item, slot):
+            attempts[item] += 1
+            if item == 'broken' or attempts[item] < 2:
+                raise asyncio.TimeoutError()
+
+        asyncio.run(queue.drain(retry, concurrency=2))
+        self.assertEqual(attempts, {'flaky': 2, 'broken': 3})
+        self.assertEqual(queue.failures(), [('broken', 'broken', 'timeout', 4)])
+        self.assertEqual(queue.stats(), {'retried': 5, 'recovered': 1, 'failed': 1, 'reasons': {'timeout': 1}})
+
+    def test_delay_grows_exponentially_up_to_the_cap(self):
+        queue = RetryQueue(max_attempts=5, base_delay=1, max_delay=5, jitter=0)
+        self.assertEqual([queue.delay(attempt) for attempt in range(1, 5)], [1, 2, 4, 5])
+
+
+class SessionStateStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.cookies_path = os.path.join(self.tmp_dir, 'cookies.json')
+        with open(self.cookies_path, 'w') as f:
+            json.dump([{'name': 'CTK', 'value': 'abc', 'domain': '.indeed.com', 'path': '/',
+                        'sameSite': 'no_restriction'}], f)
+        self.state_dir = os.path.join(self.tmp_dir, 'state')
+
+    def test_seed_cookies_fix_invalid_same_site(self):
+        store = SessionStateStore(self.state_dir, self.cookies_path)
+        self.assertEqual(store.seed_cookies()[0]['sameSite'], 'Lax')
+
+    def test_snapshots_persist_per_user_agent(self):
+        state = {'cookies': [{'name': 'CTK', 'value': 'refreshed'}], 'origins': []}
+        store = SessionStateStore(self.state_dir, self.cookies_path)
+        self.assertIsNone(store.snapshot('agent-a'))
+        store.save('agent-a', state)
+
+        # A new process reads the snapshot back from disk
+        store = SessionStateStore(self.state_dir, self.cookies_path)
+        self.assertEqual(store.snapshot('agent-a'), state)
+        self.assertIsNone(store.snapshot('agent-b'))
+
+    def test_newer_cookie_export_replaces_snapshot(self):
+        store = SessionStateStore(self.state_dir, self.cookies_path)
+        store.save('agent-a', {'cookies': [], 'origins': []})
+        later = time.time() + 60
+        os.utime(self.cookies_path, (later, later))
+        self.assertIsNone(store.snapshot('agent-a'))
+
+
+class JobPersistenceTests(TestCase):
+    def job(self, **values):
+        job = {'job_id': 'persist001', 'job_title': 'Python Developer', 'company_name': 'Acme Corp',
+               'location': 'Toronto, ON', 'salary_raw': '$50,000–$60,000 a year', 'min_salary': Decimal('50000'),
+               'max_salary': Decimal('60000'), 'salary_unit': 'year',
+               'job_description_text': 'Build and maintain Django services'}
+        job.update(values)
+        return job
+
+    def test_upsert_keeps_stored_values_missing_from_the_new_record(self):
+        save_job_details([self.job()], 'first-session')
+        first = JobRecord.objects.get(job_id='persist001')
+
+        save_job_details([self.job(company_name='N/A', job_description_text=None, job_title='Senior Python Developer')],
+                         'second-session')
+        record = JobRecord.objects.get(job_id='persist001')
+        self.assertEqual(record.job_title, 'Senior Python Developer')
+        self.assertEqual(record.company_name, 'Acme Corp')
+        self.assertEqual(record.job_description_text, 'Build and maintain Django services')
+        self.assertEqual(record.retrieved_date, first.retrieved_date)
+        self.assertEqual(record.scrape_session_id, 'first-session')
+
+    def test_upsert_replaces_the_salary_columns_together(self):
+        save_job_details([self.job(salary_raw='$22.50 an hour', min_salary=Decimal('22.50'),
+                                   max_salary=Decimal('22.50'), salary_unit='hour')], 'first-session')
+        self.assertEqual(JobRecord.objects.get(job_id='persist001').fixed_salary, Decimal('22.50'))
+
+        save_job_details([self.job()], 'second-session')
+        record = JobRecord.objects.get(job_id='persist001')
+        self.assertEqual((record.min_salary, record.max_salary, record.fixed_salary, record.salary_unit),
+                         (Decimal('50000'), Decimal('60000'), None, 'year'))
+
+        save_job_details([self.job(salary_raw='N/A', min_salary=None, max_salary=None, salary_unit=None)],
+                         'third-session')
+        self.assertEqual(JobRecord.objects.get(job_id='persist001').salary_unit, 'year')
+
+
+class ScrapeTaskClaimTests(TestCase):
+    def running_task(self, heartbeat_age):
+        return ScrapeTask.objects.create(
+            task_type='scrape_job_ids', params={}, status=ScrapeTask.STATUS_RUNNING, worker_id='crashed:1:0',
+            heartbeat_at=timezone.now() - timedelta(seconds=heartbeat_age))
+
+    def test_claims_pending_task(self):
+        pending = ScrapeTask.objects.create(task_type='scrape_job_ids', params={})
+        task = scrape_tasks.claim_next_task('worker:1:0', lease_seconds=300)
+        self.assertEqual(task.pk, pending.pk)
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.worker_id), (ScrapeTask.STATUS_RUNNING, 'worker:1:0'))
+        self.assertIsNotNone(pending.heartbeat_at)
+        self.assertIsNone(scrape_tasks.claim_next_task('worker:1:1', lease_seconds=300))
+
+    def test_leaves_running_task_with_live_heartbeat(self):
+        self.running_task(heartbeat_age=10)
+        self.assertIsNone(scrape_tasks.claim_next_task('worker:1:0', lease_seconds=300))
+
+    def test_reclaims_task_of_crashed_worker(self):
+        orphaned = self.running_task(heartbeat_age=600)
+        task = scrape_tasks.claim_next_task('worker:1:0', lease_seconds=300)
+        self.assertEqual(task.pk, orphaned.pk)
+        orphaned.refresh_from_db()
+        self.assertEqual(orphaned.worker_id, 'worker:1:0')
+
+    def test_outcome_of_reclaimed_task_is_dropped(self):
+        stale = self.running_task(heartbeat_age=600)
+        scrape_tasks.claim_next_task('worker:1:0', lease_seconds=300)
+
+        async def runner(params, progress_callback=None):
+            return {'total_job_ids_found': 1}
+
+        with mock.patch.dict(scrape_tasks.TASK_RUNNERS, {'scrape_job_ids': runner}), \
+                mock.patch.object(scrape_tasks.browser_pool, 'run', asyncio.run):
+            scrape_tasks.run_task(stale)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.worker_id), (ScrapeTask.STATUS_RUNNING, 'worker:1:0'))
+        self.assertIsNone(stale.result)
+
+
+class TaskProgressTests(TransactionTestCase):
+    def setUp(self):
+        self.task = ScrapeTask.objects.create(task_type='scrape_job_ids', params={}, status=ScrapeTask.STATUS_RUNNING,
+                                              worker_id='worker:1:0', heartbeat_at=timezone.now())
+
+    def test_flush_renews_heartbeat_of_held_task(self):
+        progress = TaskProgress(self.task.pk, 'worker:1:0', interval=0.01, heartbeat_interval=0.01)
+        time.sleep(0.02)
+        progress.update(pages=3)
+        heartbeat_at = self.task.heartbeat_at
+        asyncio.run(progress.flush())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.progress, {'pages': 3})
+        self.assertGreater(self.task.heartbeat_at, heartbeat_at)
+
+    def test_flush_leaves_reclaimed_task_alone(self):
+        progress = TaskProgress(self.task.pk, 'worker:1:0', interval=0.01, heartbeat_interval=0.01)
+        ScrapeTask.objects.filter(pk=self.task.pk).update(worker_id='worker:2:0', progress={'pages': 1})
+        progress.update(pages=3)
+        with self.assertRaises(TaskLeaseLost):
+            asyncio.run(progress.flush())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.progress, {'pages': 1})
+
+    def test_lost_lease_stops_the_run(self):
+        progress = TaskProgress(self.task.pk, 'worker:1:0', interval=0.01, heartbeat_interval=0.01)
+        ScrapeTask.objects.filter(pk=self.task.pk).update(worker_id='worker:2:0')
+        cancelled = []
+
+        async def runner(params, progress_callback=None):
+            try:
+                while True:
+                    progress_callback(pages=1)
+                    await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with self.assertRaises(TaskLeaseLost):
+            asyncio.run(asyncio.wait_for(scrape_tasks.run_with_progress(runner, {}, progress), timeout=5))
+        self.assertEqual(cancelled, [True])
+
+
+class ScrapeTaskApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def assert_queued(self, url_name, data, task_type):
+        response = self.client.post(reverse(url_name), data, format='json')
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        task = ScrapeTask.objects.get(task_id=body['task_id'])
+        self.assertEqual((task.task_type, task.status, body['status']),
+                         (task_type, ScrapeTask.STATUS_PENDING, ScrapeTask.STATUS_PENDING))
+        self.assertEqual(body['status_url'], f"http://testserver{reverse('scrape-task-status', args=[task.task_id])}")
+        return task, body
+
+    def test_enqueue_endpoints_return_202_with_status_url(self):
+        task, _ = self.assert_queued('scrape-job-ids-async', {'job_title': 'python', 'location': 'Toronto'},
+                                     'scrape_job_ids')
+        self.assertEqual((task.params['job_title'], task.params['location']), ('python', 'Toronto'))
+        task, _ = self.assert_queued('scrape-job-ids-batch-async', {'job_titles': ['python'], 'locations': ['Toronto']},
+                                     'scrape_job_ids_batch')
+        self.assertEqual(task.params['queries'], [{'job_title': 'python', 'location': 'Toronto'}])
+        task, _ = self.assert_queued('scrape-job-data-async', {'file_name': 'ids.csv'}, 'scrape_job_data')
+        self.assertEqual(task.params['file_name'], 'ids.csv')
+
+    def test_enqueue_rejects_invalid_request(self):
+        response = self.client.post(reverse('scrape-job-ids-async'), {'job_title': 'python'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('location', response.json())
+        self.assertFalse(ScrapeTask.objects.exists())
+
+    def test_task_status(self):
+        _, body = self.assert_queued('scrape-job-ids-async', {'job_title': 'python', 'location': 'Toronto'},
+                                     'scrape_job_ids')
+        response = self.client.get(body['status_url'])
+        self.assertEqual(response.status_code, 200)
+        status_body = response.json()
+        self.assertEqual((status_body['task_id'], status_body['task_type'], status_body['status']),
+                         (body['task_id'], 'scrape_job_ids', ScrapeTask.STATUS_PENDING))
+        for field in ['progress', 'result', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']:
+            self.assertIn(field, status_body)
+
+    def test_unknown_task_is_404(self):
+        response = self.client.get(reverse('scrape-task-status', args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
+
+
+class JobIdBatchScrapeSerializerTests(SimpleTestCase):
+    def validate(self, data):
+        serializer = JobIdBatchScrapeRequestSerializer(data=data)
+        return serializer.is_valid(), serializer
+
+    def test_queries_or_combinations_not_both(self):
+        valid, _ = self.validate({'queries': [{'job_title': 'python', 'location': 'Toronto'}], 'job_titles': ['python']})
+        self.assertFalse(valid)
+        valid, _ = self.validate({'job_titles': ['python']})
+        self.assertFalse(valid)
+        valid, _ = self.validate({})
+        self.assertFalse(valid)
+
+    def test_combinations_are_deduplicated_in_order(self):
+        valid, serializer = self.validate({'job_titles': ['python', 'django', 'python'], 'locations': ['Toronto', 'Ottawa']})
+        self.assertTrue(valid, serializer.errors)
+        self.assertEqual([(query['job_title'], query['location']) for query in serializer.validated_data['queries']],
+                         [('python', 'Toronto'), ('python', 'Ottawa'), ('django', 'Toronto'), ('django', 'Ottawa')])
+
+    def test_queries_are_deduplicated(self):
+        query = {'job_title': 'python', 'location': 'Toronto'}
+        valid, serializer = self.validate({'queries': [query, {'job_title': 'django', 'location': 'Toronto'}, query]})
+        self.assertTrue(valid, serializer.errors)
+        self.assertEqual(len(serializer.validated_data['queries']), 2)
+
+    def test_batch_size_is_capped(self):
+        with mock.patch.dict(scrape_job_ids.job_scraper_config, {'max_batch_queries': 3}):
+            valid, _ = self.validate({'job_titles': ['python', 'django'], 'locations': ['Toronto', 'Ottawa']})
+            self.assertFalse(valid)
+            valid, _ = self.validate({'queries': [{'job_title': f'title {number}', 'location': 'Toronto'}
+                                                  for number in range(4)]})
+            self.assertFalse(valid)
+            # Repeats count once
+            valid, serializer = self.validate({'job_titles': ['python', 'python'], 'locations': ['Toronto', 'Ottawa']})
+            self.assertTrue(valid, serializer.errors)
+
+    def test_oversized_batch_is_rejected_with_400(self):
+        with mock.patch.dict(scrape_job_ids.job_scraper_config, {'max_batch_queries': 3}):
+            response = self.client.post(reverse('scrape-job-ids-batch-async'),
+                                        {'job_titles': ['python', 'django'], 'locations': ['Toronto', 'Ottawa']},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class HttpPage:
+    """Stand-in for a Playwright page that loads URLs over HTTP and renders nothing."""
+
+    def __init__(self):
+        self.url = None
+        self.html = ''
+
+    async def goto(self, url, **options):
+        def fetch():
+            with urlopen(url) as response:
+                return response.status, response.read().decode('utf-8')
+
+        status, self.html = await asyncio.to_thread(fetch)
+        self.url = url
+        return mock.Mock(status=status)
+
+    async def wait_for_selector(self, selector, **options):
+        return None
+
+    async def content(self):
+        return self.html
+
+    async def evaluate(self, script, arg=None):
+        # Nothing runs in the page, so the scraper parses the HTML
+        return None
+
+
+class HttpPageContexts:
+    """Replaces RotatingContexts with one HttpPage per slot."""
+
+    def __init__(self):
+        self.pages = {}
+
+    @classmethod
+    def from_config(cls, *args, **kwargs):
+        return cls()
+
+    async def page(self, slot):
+        return self.pages.setdefault(slot, HttpPage())
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {'pages': len(self.pages)}
+
+
+class SearchPipelineTests(TransactionTestCase):
+    """extract_job_ids crawling the results pages of the fixture server, without a browser."""
+
+    UNIQUE_JOBS = 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FixtureServer(unique_jobs=cls.UNIQUE_JOBS)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='indeed-search-')
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        for patcher in [mock.patch.object(scrape_job_ids, 'output_dir', self.work_dir),
+                        mock.patch.object(scrape_job_ids, 'RotatingContexts', HttpPageContexts),
+                        mock.patch.dict(rate_control_config, {'enabled': False})]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.server.requests = 0
+        self.server.search_queries = []
+
+    def extract(self, concurrency, incremental=False):
+        return asyncio.run(scrape_job_ids.extract_job_ids(
+            job_title='python', location='Toronto', base_url=f'{self.server.base_url}/jobs',
+            concurrency=concurrency, fetch_mode='browser', incremental=incremental))
+
+    def seed_job_records(self, numbers, retrieved_date):
+        JobRecord.objects.bulk_create(
+            JobRecord(job_id=fixture_job_id(number), retrieved_date=retrieved_date, scrape_session_id='earlier')
+            for number in numbers
+        )
+
+    def read_output(self, result):
+        with open(os.path.join(self.work_dir, result['csv_file_name']), 'r', encoding='utf-8') as output_file:
+            return [row['Job IDs'] for row in csv.DictReader(output_file)]
+
+    def test_stops_on_the_first_page_without_new_job_ids(self):
+        result = self.extract(concurrency=1)
+        unique_ids = [fixture_job_id(number) for number in range(self.UNIQUE_JOBS)]
+        self.assertEqual(self.read_output(result), unique_ids)
+        self.assertEqual(result['total_job_ids_found'], self.UNIQUE_JOBS)
+        self.assertEqual(result['new_job_ids_saved'], self.UNIQUE_JOBS)
+        self.assertEqual(JobRecord.objects.count(), self.UNIQUE_JOBS)
+        # Four pages of new job IDs and the repeated page that stops the crawl, of the ten the job count promises
+        self.assertEqual(result['pages_fetched'], 5)
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(result['duplicate_job_ids_skipped'], JOBS_PER_PAGE)
+
+    def test_concurrent_pages_are_deduplicated_in_page_order(self):
+        result = self.extract(concurrency=4)
+        self.assertEqual(self.read_output(result), [fixture_job_id(number) for number in range(self.UNIQUE_JOBS)])
+        self.assertEqual(JobRecord.objects.count(), self.UNIQUE_JOBS)
+        self.assertLess(result['pages_fetched'], TOTAL_SEARCH_JOBS // JOBS_PER_PAGE)
+
+    @mock.patch.dict(scrape_job_ids.job_scraper_config, {'incremental_stop_pages': 2, 'incremental_lookback_days': 30})
+    def test_incremental_crawl_stops_after_consecutive_known_pages(self):
+        now = timezone.now()
+        # Page 1 is known, page 2 is mixed: one job retrieved before the lookback and one never seen.
+        # Pages 3 and 4 are known, so the crawl stops after page 4 rather than after page 2
+        self.seed_job_records([number for number in range(60) if number not in (28, 29)], now - timedelta(days=1))
+        self.seed_job_records([28], now - timedelta(days=31))
+
+        with mock.patch.object(scrape_job_ids, 'save_new_job_ids',
+                               wraps=scrape_job_ids.save_new_job_ids) as save_new_job_ids:
+            result = self.extract(concurrency=1, incremental=True)
+
+        self.assertTrue(self.server.search_queries)
+        self.assertTrue(all(query.get('sort') == 'date' for query in self.server.search_queries))
+        self.assertEqual(result['pages_fetched'], 4)
+        self.assertEqual(result['queries'][0]['stopped_early'], True)
+        self.assertEqual(result['incremental']['known_pages'], 3)
+        # Only the two IDs missing from the lookback window are looked up, and only the unseen one is new
+        save_new_job_ids.assert_called_once()
+        self.assertEqual(save_new_job_ids.call_args.args[0], [fixture_job_id(28), fixture_job_id(29)])
+        self.assertEqual(result['new_job_ids_saved'], 1)
+        self.assertEqual(JobRecord.objects.count(), self.UNIQUE_JOBS)
+
+
+def sample_value(exposition, name, labels):
+    # The value of one sample of a Prometheus text exposition, 0 when it is absent
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f'{name}{{{label_text}}} ' if labels else f'{name} '
+    for line in exposition.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0
+
+
+class MetricsExpositionTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+        self.counter = self.registry.register(metrics.Counter('test_events_total', 'Events.', ['kind']))
+        self.gauge = self.registry.register(metrics.Gauge('test_in_flight', 'In flight.'))
+        self.histogram = self.registry.register(metrics.Histogram('test_seconds', 'Latency.', ['stage'],
+                                                                  buckets=[0.1, 1]))
+
+    def test_exposition_format(self):
+        self.counter.inc('page', amount=3)
+        self.gauge.set(2)
+        for seconds in [0.05, 0.5, 0.5, 5]:
+            self.histogram.observe(seconds, 'goto')
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('# HELP test_events_total Events.', lines)
+        self.assertIn('# TYPE test_events_total counter', lines)
+        self.assertIn('# TYPE test_in_flight gauge', lines)
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_events_total{kind="page"} 3', lines)
+        self.assertIn('test_in_flight 2', lines)
+        # Buckets are cumulative and end with +Inf, which equals the count
+        self.assertEqual([line for line in lines if line.startswith('test_seconds')], [
+            'test_seconds_bucket{stage="goto",le="0.1"} 1',
+            'test_seconds_bucket{stage="goto",le="1.0"} 3',
+            'test_seconds_bucket{stage="goto",le="+Inf"} 4',
+            'test_seconds_sum{stage="goto"} 6.05',
+            'test_seconds_count{stage="goto"} 4',
+        ])
+
+    def test_label_values_are_escaped(self):
+        self.counter.inc('say "hi"\\path\nnext')
+        self.assertIn(r'test_events_total{kind="say \"hi\"\\path\nnext"} 1', self.registry.render().splitlines())
+
+    def test_drained_values_merge_into_another_registry(self):
+        self.counter.inc('page', amount=2)
+        self.gauge.set(5)
+        self.histogram.observe(0.5, 'goto')
+        other = metrics.MetricsRegistry()
+        other_counter = other.register(metrics.Counter('test_events_total', 'Events.', ['kind']))
+        other_gauge = other.register(metrics.Gauge('test_in_flight', 'In flight.'))
+        other.register(metrics.Histogram('test_seconds', 'Latency.', ['stage'], buckets=[0.1, 1]))
+        other_counter.inc('page')
+        other_gauge.set(1)
+
+        other.merge(self.registry.drain())
+        exposition = other.render()
+        self.assertEqual(sample_value(exposition, 'test_events_total', {'kind': 'page'}), 3)
+        self.assertEqual(sample_value(exposition, 'test_seconds_bucket', {'stage': 'goto', 'le': '1.0'}), 1)
+        self.assertEqual(sample_value(exposition, 'test_seconds_count', {'stage': 'goto'}), 1)
+        # Gauges stay with their own process
+        self.assertEqual(sample_value(exposition, 'test_in_flight', {}), 1)
+        # Draining starts the counters and histograms again from zero
+        self.assertEqual(self.registry.drain(), {'test_events_total': {}, 'test_seconds': {}})
+
+    def test_metrics_endpoint(self):
+        metrics.ScrapeMetrics('endpoint_test').observe('goto', 0.2)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        exposition = response.content.decode('utf-8')
+        self.assertIn('# TYPE indeed_scrape_stage_seconds histogram', exposition.splitlines())
+        self.assertGreaterEqual(sample_value(exposition, 'indeed_scrape_stage_seconds_count',
+                                             {'scraper': 'endpoint_test', 'stage': 'goto'}), 1)
+        self.assertEqual(self.client.post(reverse('metrics')).status_code, 405)
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Runs the shards on threads of the test process, so a stubbed extract_shard is used."""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None):
+        super().__init__(max_workers=max_workers)
+
+
+class ShardedExtractionTests(SimpleTestCase):
+    FAILING_JOB_ID = 'job0007'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.output_dir = os.path.join(self.tmp_dir, 'extracted')
+        self.pending_dir = os.path.join(self.tmp_dir, 'pendingExtraction')
+        os.makedirs(self.pending_dir)
+        self.shard_job_ids = {}
+        for patcher in [mock.patch.object(sharded_extraction, 'output_base_dir', self.tmp_dir),
+                        mock.patch.object(sharded_extraction, 'ProcessPoolExecutor', InlineExecutor),
+                        mock.patch.object(sharded_extraction, 'extract_shard', self.extract_shard),
+                        mock.patch.object(scrape_job_data, 'output_dir', self.output_dir)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def extract_shard(self, shard_path, concurrency, resume, fetch_mode):
+        # Writes one row per job ID like extract_job_details, and fails the shard holding FAILING_JOB_ID
+        job_ids = scrape_job_data.read_job_ids_from_file(shard_path)
+        self.shard_job_ids[os.path.basename(shard_path)] = job_ids
+        checkpoint = ExtractionCheckpoint(shard_path, resume=resume)
+        for job_id in job_ids:
+            checkpoint.record(job_id, STATUS_DONE)
+        checkpoint.close()
+        if self.FAILING_JOB_ID in job_ids:
+            raise RuntimeError('browser crashed')
+
+        shard_name = os.path.splitext(os.path.basename(shard_path))[0]
+        output_file = os.path.join(self.output_dir, f'{shard_name}_job_data.csv')
+        with open(output_file, 'w', newline='', encoding='utf-8') as shard_output:
+            writer = csv.writer(shard_output)
+            writer.writerow(scrape_job_data.JOB_DATA_FIELDNAMES)
+            writer.writerows([job_id] + [''] * (len(scrape_job_data.JOB_DATA_FIELDNAMES) - 1) for job_id in job_ids)
+        return {'jobs_extracted': len(job_ids), 'jobs_failed': 0, 'jobs_skipped': 0, 'scrape_session_id': shard_name,
+                'metrics': {'stages': {}, 'counters': {'pages': len(job_ids)}}, 'output_file': output_file,
+                'registry': {'indeed_scrape_events_total': {('shard_test', 'pages'): len(job_ids)}}}
+
+    def write_file(self, name, job_ids):
+        path = os.path.join(self.pending_dir, name)
+        with open(path, 'w', newline='', encoding='utf-8') as job_ids_file:
+            writer = csv.writer(job_ids_file)
+            writer.writerow(['Job IDs'])
+            writer.writerows([job_id] for job_id in job_ids)
+        return path
+
+    def extract(self, *file_paths):
+        return sharded_extraction.extract_job_data_files_sharded(list(file_paths), processes=3, shard_size=4)
+
+    def test_shards_are_cut_at_shard_size(self):
+        job_ids = [f'job{number:04d}' for number in range(10)]
+        self.extract(self.write_file('clean.csv', job_ids))
+        self.assertEqual(self.shard_job_ids, {
+            'clean_shard0000.csv': job_ids[0:4],
+            'clean_shard0001.csv': job_ids[4:8],
+            'clean_shard0002.csv': job_ids[8:10],
+        })
+
+    def test_clean_file_is_merged_in_input_order_and_completed(self):
+        job_ids = [f'job{number:04d}' for number in range(100, 90, -1)]
+        [result] = self.extract(self.write_file('clean.csv', job_ids))
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual((result['shards'], result['jobs_extracted']), (3, 10))
+        self.assertEqual(result['metrics']['counters'], {'pages': 10})
+        with open(result['output_file'], 'r', encoding='utf-8') as merged_file:
+            rows = list(csv.reader(merged_file))
+        self.assertEqual(rows[0], scrape_job_data.JOB_DATA_FIELDNAMES)
+        self.assertEqual([row[0] for row in rows[1:]], job_ids)
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir, 'completed')), ['clean.csv'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'shards', 'clean')))
+
+    def test_file_with_failed_shard_goes_to_error_and_keeps_its_shards(self):
+        job_ids = [f'job{number:04d}' for number in range(10)]
+        clean_path = self.write_file('clean.csv', ['job1000', 'job1001'])
+        [failed, clean] = self.extract(self.write_file('failing.csv', job_ids), clean_path)
+
+        self.assertEqual(failed['status'], 'error')
+        self.assertEqual(failed['errors'], ['failing_shard0001.csv: browser crashed'])
+        self.assertEqual(failed['jobs_extracted'], 6)
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir, 'error')), ['failing.csv'])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'failing_job_data.csv')))
+
+        # The shards, their checkpoints and the outputs of the shards that succeeded stay for a resumed run
+        shard_dir = os.path.join(self.tmp_dir, 'shards', 'failing')
+        for shard_index in range(3):
+            shard_path = os.path.join(shard_dir, f'failing_shard{shard_index:04d}.csv')
+            self.assertTrue(os.path.exists(shard_path))
+            self.assertTrue(os.path.exists(checkpoint_path(shard_path)))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'failing_shard0000_job_data.csv')))
+
+        self.assertEqual(clean['status'], 'completed')
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir, 'completed')), ['clean.csv'])
+
+    def test_shard_metrics_are_merged_into_the_parent_registry(self):
+        pages_before = sample_value(metrics.registry.render(), 'indeed_scrape_events_total',
+                                    {'scraper': 'shard_test', 'event': 'pages'})
+        job_ids = [f'job{number:04d}' for number in range(10)]
+        self.extract(self.write_file('failing.csv', job_ids))
+        pages = sample_value(metrics.registry.render(), 'indeed_scrape_events_total',
+                             {'scraper': 'shard_test', 'event': 'pages'})
+        # The failed shard returns no metrics
+        self.assertEqual(pages - pages_before, 6)
+
+
+class ParseBenchmarkTests(BenchmarkMixin, SimpleTestCase):
+    ITERATIONS = 300
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.save_baselines()
+        super().tearDownClass()
+
+    def test_parse_speed(self):
+        pages = [render(load_page(name), job_id='bench00001', title='Python Developer',
+                        apply_url='https://ca.indeed.com/rc/clk?jk=bench00001')
+                 for name in VIEWJOB_FIXTURES]
+
+        started = time.perf_counter()
+        for iteration in range(self.ITERATIONS):
+            parse_job_page(pages[iteration % len(pages)])
+        elapsed = time.perf_counter() - started
+
+        self.record_metric('parse_us_per_page', elapsed / self.ITERATIONS * 1_000_000)
+
+
+class PipelineBenchmarkTests(BenchmarkMixin, TransactionTestCase):
+    JOB_COUNT = 120
+    DB_BATCHES = 10
+    DB_BATCH_SIZE = 100
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FixtureServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.save_baselines()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='indeed-bench-')
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+
+        # The benchmarks measure the pipeline flat out against the local server, not the throttle
+        patcher = mock.patch.dict(rate_control_config, {'enabled': False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_job_ids(self, job_ids):
+        path = os.path.join(self.work_dir, 'bench_job_ids.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as job_ids_file:
+            writer = csv.writer(job_ids_file)
+            writer.writerow(['Job IDs'])
+            writer.writerows([job_id] for job_id in job_ids)
+        return path
+
+    def test_extract_job_details_over_http(self):
+        job_ids = [fixture_job_id(number) for number in range(self.JOB_COUNT)]
+        file_path = self.write_job_ids(job_ids)
+
+        # HTTP mode never needs the browser for fixture pages, so the coroutine runs on its own loop
+        with mock.patch.object(scrape_job_data, 'output_dir', self.work_dir):
+            started = time.perf_counter()
+            result = asyncio.run(scrape_job_data.extract_job_details(
+                file_path, base_url=f'{self.server.base_url}/viewjob', fetch_mode='http', persist=True))
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(result['jobs_extracted'], self.JOB_COUNT)
+        self.assertEqual(result['fetch']['browser_pages'], 0)
+        self.assertEqual(result['persistence']['records_saved'], self.JOB_COUNT)
+        self.assertEqual(JobRecord.objects.count(), self.JOB_COUNT)
+
+        with open(result['output_file'], 'r', encoding='utf-8') as output_file:
+            rows = list(csv.DictReader(output_file))
+        self.assertEqual([row['Job URL'] for row in rows],
+                         [f'{self.server.base_url}/viewjob?jk={job_id}' for job_id in job_ids])
+        external = rows[VIEWJOB_FIXTURES.index('viewjob_external_apply.html')]
+        self.assertTrue(external['Apply Link'].endswith(f"/apply/{job_ids[2]}"))
+
+        record = JobRecord.objects.get(job_id=job_ids[0])
+        self.assertEqual((record.min_salary, record.max_salary, record.salary_unit),
+                         (Decimal('50000.00'), Decimal('60000.00'), 'year'))
+
+        self.record_metric('job_pages_per_sec', self.JOB_COUNT / elapsed)
+
+    def test_db_write_speed(self):
+        html = render(load_page('viewjob_salary.html'), job_id='bench00000', title='Python Developer', apply_url='')
+        record = parse_job_page(html)
+        batches = [
+            [scrape_job_data.build_job(fixture_job_id(batch * self.DB_BATCH_SIZE + number), 'https://ca.indeed.com/viewjob',
+                                       record, record['apply_link'])
+             for number in range(self.DB_BATCH_SIZE)]
+            for batch in range(self.DB_BATCHES)
+        ]
+
+        started = time.perf_counter()
+        for batch in batches:
+            save_job_details(batch, 'bench-session')
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(JobRecord.objects.count(), self.DB_BATCHES * self.DB_BATCH_SIZE)
+        self.record_metric('db_writes_per_sec', self.DB_BATCHES * self.DB_BATCH_SIZE / elapsed)
+
+    def assert_search_output(self, result):
+        self.assertEqual(result['total_job_ids_found'], TOTAL_SEARCH_JOBS)
+        self.assertEqual(result['new_job_ids_saved'], TOTAL_SEARCH_JOBS)
+        with open(os.path.join(self.work_dir, result['csv_file_name']), 'r', encoding='utf-8') as output_file:
+            self.assertEqual([row['Job IDs'] for row in csv.DictReader(output_file)],
+                             [fixture_job_id(number) for number in range(TOTAL_SEARCH_JOBS)])
+
+    def test_extract_job_ids_replay(self):
+        # The fixture results pages are stored in a page cache of their own and crawled in replay
+        # mode, which runs the whole search pipeline but the browser
+        base_url = f'{self.server.base_url}/jobs'
+        cache_dir = os.path.join(self.work_dir, 'page_cache')
+        cache = PageCache(cache_dir, ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+        search_url = f'{base_url}?q=python&l=Toronto'
+        for start in range(0, TOTAL_SEARCH_JOBS, JOBS_PER_PAGE):
+            url = f'{search_url}&start={start}' if start else search_url
+            cache.put(url, self.server.search_page({'q': 'python', 'l': 'Toronto', 'start': str(start)}))
+        cache.close(evict=False)
+
+        with mock.patch.object(scrape_job_ids, 'output_dir', self.work_dir), \
+                mock.patch.dict(page_cache_config, {'cache_dir': cache_dir}):
+            started = time.perf_counter()
+            result = asyncio.run(scrape_job_ids.extract_job_ids(
+                job_title='python', location='Toronto', base_url=base_url, fetch_mode='replay'))
+            elapsed = time.perf_counter() - started
+
+        self.assert_search_output(result)
+        self.record_metric('search_pages_per_sec', result['pages_fetched'] / elapsed)
+
+    @skipUnless(os.environ.get('BENCHMARK_BROWSER') == '1', "Set BENCHMARK_BROWSER=1 to benchmark the browser path")
+    def test_extract_job_ids_in_browser(self):
+        from indeed.scripts.browser_pool import browser_pool
+
+        with mock.patch.object(scrape_job_ids, 'output_dir', self.work_dir):
+            started = time.perf_counter()
+            result = browser_pool.run(scrape_job_ids.extract_job_ids(
+                job_title='python', location='Toronto', base_url=f'{self.server.base_url}/jobs'))
+            elapsed = time.perf_counter() - started
+
+        self.assert_search_output(result)
+        self.record_metric('browser_search_pages_per_sec', result['pages_fetched'] / elapsed)
+
+    # Named to sort after the other benchmarks of the class, so the peak covers all of them
+    @skipUnless(resource is not None, "Peak RSS needs the resource module")
+    def test_peak_rss(self):
+        self.record_metric('peak_rss_mb', peak_rss_mb())
@@ -1,9 +1,17 @@
 # indeed/urls.py
 
 from django.urls import path
-from .views import scrape_job_ids, scrape_job_data  # Import the view from views.py
+from .views import scrape_job_ids, scrape_job_ids_batch, scrape_job_data  # Import the view from views.py
+from .views import enqueue_scrape_job_ids, enqueue_scrape_job_ids_batch, enqueue_scrape_job_data
+from .views import scrape_task_status, prometheus_metrics
 
 urlpatterns = [
     path('scrape-job-ids/', scrape_job_ids, name='scrape-job-ids'),
+    path('scrape-job-ids/batch/', scrape_job_ids_batch, name='scrape-job-ids-batch'),
     path('scrape-job-data/', scrape_job_data, name='scrape-job-data'),
-]
\ No newline at end of file
+    path('scrape-job-ids/async/', enqueue_scrape_job_ids, name='scrape-job-ids-async'),
+    path('scrape-job-ids/batch/async/', enqueue_scrape_job_ids_batch, name='scrape-job-ids-batch-async'),
+    path('scrape-job-data/async/', enqueue_scrape_job_data, name='scrape-job-data-async'),
+    path('tasks/<uuid:task_id>/', scrape_task_status, name='scrape-task-status'),
+    path('metrics/', prometheus_metrics, name='metrics'),
+]
@@ -1,15 +1,18 @@
 # views.py
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status
 from rest_framework.decorators import api_view
-from .serializers import job_id_scrape_serializer, job_data_scrape_serializer
-from .scripts.scrape_job_ids import extract_job_ids
-from asgiref.sync import async_to_sync  # Import async_to_sync
-import os
-from django.conf import settings
-import shutil
+from django.urls import reverse
+from .serializers import job_id_scrape_serializer, job_id_batch_scrape_serializer, job_data_scrape_serializer
+from .serializers import scrape_task_serializer
+from .scripts.scrape_job_ids import extract_job_ids, extract_job_ids_batch
 import logging
-from .scripts.scrape_job_data import extract_job_details
+from .models import ScrapeTask
+from .scripts.browser_pool import browser_pool
+from .scripts.metrics import registry
+from .scripts.scrape_tasks import find_job_id_files, extract_job_data_files
+from .scripts.sharded_extraction import extract_job_data_files_sharded, sharded_extraction_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,9 +34,12 @@ def scrape_job_ids(request):
         network_idle_timeout = params.get('network_idle_timeout')
         job_count_class = params.get('job_count_class')
         job_link_data_attr = params.get('job_link_data_attr')
+        concurrency = params.get('concurrency')
+        fetch_mode = params.get('fetch_mode')
+        incremental = params.get('incremental')
 
-        # Run the async task using async_to_sync and capture the result
-        result = async_to_sync(extract_job_ids)(
+        # Run the async task on the warm browser pool and capture the result
+        result = browser_pool.run(extract_job_ids(
             job_title=job_title,
             location=location,
             user_agent=user_agent,
@@ -41,8 +47,11 @@ def scrape_job_ids(request):
             base_url=base_url,
             network_idle_timeout=network_idle_timeout,
             job_count_class=job_count_class,
-            job_link_data_attr=job_link_data_attr
-        )
+            job_link_data_attr=job_link_data_attr,
+            concurrency=concurrency,
+            fetch_mode=fetch_mode,
+            incremental=incremental
+        ))
 
         # Return the result in the JsonResponse
         return JsonResponse(result, status=status.HTTP_200_OK)
@@ -50,6 +59,18 @@ def scrape_job_ids(request):
         return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+def scrape_job_ids_batch(request):
+    # Crawl several searches in one session, over one shared pool of browser pages
+    serializer = job_id_batch_scrape_serializer.JobIdBatchScrapeRequestSerializer(data=request.data)
+    if serializer.is_valid():
+        # Options left out are passed as None and default to config values
+        result = browser_pool.run(extract_job_ids_batch(**serializer.validated_data))
+        return JsonResponse(result, status=status.HTTP_200_OK)
+    else:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['POST'])
 def scrape_job_data(request):
     # Serialize and validate the incoming request data
@@ -58,82 +79,123 @@ def scrape_job_data(request):
         # Extract the validated data
         file_name = serializer.validated_data.get('file_name')
         folder_name = serializer.validated_data.get('folder_name', 'pendingExtraction')  # Default folder is 'pendingExtraction'
+        concurrency = serializer.validated_data.get('concurrency')  # None falls back to the config value
+        resume = serializer.validated_data.get('resume', False)  # Skip job IDs already extracted
+        processes = serializer.validated_data.get('processes') or sharded_extraction_config['processes']
+        fetch_mode = serializer.validated_data.get('fetch_mode')  # None falls back to the config value
+
+        # Find the named file, or every job ID file in the folder
+        try:
+            file_paths = find_job_id_files(file_name, folder_name)
+        except FileNotFoundError as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        if len(file_paths) == 0:
+            return JsonResponse({'message': "No file found for which extraction is pending, Please provide a file and folder name"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Process the files; each one is moved to the 'completed' folder once it is done
+        try:
+            if processes > 1:
+                # Shard the files across worker processes; files with a failed shard go to 'error'
+                results = extract_job_data_files_sharded(file_paths, processes=processes, concurrency=concurrency,
+                                                         resume=resume, fetch_mode=fetch_mode)
+            else:
+                results = browser_pool.run(extract_job_data_files(file_paths, concurrency=concurrency, resume=resume,
+                                                                  fetch_mode=fetch_mode))
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Stage timings and counters of each file
+        metrics = {result['file_name']: result.get('metrics') for result in results}
+
+        failed_files = [result['file_name'] for result in results if result.get('status') == 'error']
+        if failed_files:
+            results = [result for result in results if result.get('status') != 'error']
+            return JsonResponse({
+                'error': f"Extraction failed, files moved to the error folder: {', '.join(failed_files)}",
+                'folder_name': folder_name,
+                'processed_files': ', '.join(result['file_name'] for result in results),
+                'failed_files': ', '.join(failed_files),
+                'metrics': metrics
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if file_name:
+            return JsonResponse({
+                'message': f"File {file_name} processed and moved successfully",
+                'file_name': file_name,
+                'folder_name': folder_name,
+                'metrics': metrics
+            }, status=status.HTTP_200_OK)
+
+        # Join processed file names into a single string
+        processed_files_str = ', '.join(result['file_name'] for result in results)
+        return JsonResponse({
+            'message': f"Files processed and moved successfully: {processed_files_str}",
+            'folder_name': folder_name,
+            'processed_files': processed_files_str,
+            'metrics': metrics
+        }, status=status.HTTP_200_OK)
+
+    else:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def task_accepted_response(request, task):
+    # 202 response pointing the client at the status endpoint of a queued task
+    return JsonResponse({
+        'task_id': str(task.task_id),
+        'status': task.status,
+        'status_url': request.build_absolute_uri(reverse('scrape-task-status', args=[task.task_id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+def enqueue_scrape_job_ids(request):
+    # Validate like scrape-job-ids, then queue the crawl for run_scrape_worker instead of running it
+    serializer = job_id_scrape_serializer.JobIdScrapeRequestSerializer(data=request.data)
+    if serializer.is_valid():
+        task = ScrapeTask.objects.create(task_type='scrape_job_ids', params=serializer.validated_data)
+        logger.info(f"Queued task {task.task_id} (scrape_job_ids)")
+        return task_accepted_response(request, task)
+    else:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Define the base directory and folder paths
-        output_base_dir = os.path.join(settings.BASE_DIR, 'indeed', 'output')
-        folder_path = os.path.join(output_base_dir, folder_name)
-        completed_folder_path = os.path.join(output_base_dir, 'completed')  # Target folder
-
-        # Ensure the 'completed' folder exists
-        os.makedirs(completed_folder_path, exist_ok=True)
-
-        # Declare the list outside the loop to store all processed file names
-        processed_files = []
-
-        # If file_name is not provided, look for files in the folder
-        if not file_name:
-            try:
-                # List all files in the folder
-                files_in_folder = os.listdir(folder_path)
-                files_in_folder = [f for f in files_in_folder if os.path.isfile(os.path.join(folder_path, f))]
-
-                if len(files_in_folder) == 0:
-                    return JsonResponse({'message': "No file found for which extraction is pending, Please provide a file and folder name"}, status=status.HTTP_404_NOT_FOUND)
-
-                # Process each file in the folder
-                for file_in_folder in files_in_folder:
-                    file_path = os.path.join(folder_path, file_in_folder)
-                    try:
-                        # Call the extract_job_details function and pass the file path
-                        async_to_sync(extract_job_details)(file_path)
-
-                        # Append the processed file name to the list
-                        processed_files.append(file_in_folder)
-
-                        # Move the file to the 'completed' folder after processing
-                        shutil.move(file_path, os.path.join(completed_folder_path, file_in_folder))
-                        logger.info(f"File {file_in_folder} moved to completed folder.")
-
-                    except Exception as e:
-                        return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-                # After processing all files, return the response
-                processed_files_str = ', '.join(processed_files)  # Join processed file names into a single string
-                return JsonResponse({
-                    'message': f"Files processed and moved successfully: {processed_files_str}",
-                    'folder_name': folder_name,
-                    'processed_files': processed_files_str
-                }, status=status.HTTP_200_OK)
-
-            except FileNotFoundError:
-                return JsonResponse({'error': f"Folder {folder_name} not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        # If file_name is provided, process that specific file
-        else:
-            file_path = os.path.join(folder_path, file_name)
-
-            # Check if the file exists
-            if not os.path.exists(file_path):
-                return JsonResponse({'error': f'File {file_name} not found in folder {folder_name}'}, status=status.HTTP_404_NOT_FOUND)
-
-            # Process the provided file
-            try:
-                # Call the extract_job_details function and pass the file path
-                async_to_sync(extract_job_details)(file_path)
-
-                # Move the file to the 'completed' folder after processing
-                shutil.move(file_path, os.path.join(completed_folder_path, file_name))
-                logger.info(f"File {file_name} moved to completed folder.")
-
-                # Return success response
-                return JsonResponse({
-                    'message': f"File {file_name} processed and moved successfully",
-                    'file_name': file_name,
-                    'folder_name': folder_name
-                }, status=status.HTTP_200_OK)
-
-            except Exception as e:
-                return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+def enqueue_scrape_job_ids_batch(request):
+    # Validate like scrape-job-ids/batch, then queue the crawl for run_scrape_worker instead of running it
+    serializer = job_id_batch_scrape_serializer.JobIdBatchScrapeRequestSerializer(data=request.data)
+    if serializer.is_valid():
+        task = ScrapeTask.objects.create(task_type='scrape_job_ids_batch', params=serializer.validated_data)
+        logger.info(f"Queued task {task.task_id} (scrape_job_ids_batch)")
+        return task_accepted_response(request, task)
     else:
-        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+def enqueue_scrape_job_data(request):
+    # Validate like scrape-job-data, then queue the extraction for run_scrape_worker instead of running it
+    serializer = job_data_scrape_serializer.JobDataScrapeRequestSerializer(data=request.data)
+    if serializer.is_valid():
+        task = ScrapeTask.objects.create(task_type='scrape_job_data', params=serializer.validated_data)
+        logger.info(f"Queued task {task.task_id} (scrape_job_data)")
+        return task_accepted_response(request, task)
+    else:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def scrape_task_status(request, task_id):
+    try:
+        task = ScrapeTask.objects.get(task_id=task_id)
+    except ScrapeTask.DoesNotExist:
+        return JsonResponse({'error': f'Task {task_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return JsonResponse(scrape_task_serializer.ScrapeTaskSerializer(task).data, status=status.HTTP_200_OK)
+
+
+@require_GET
+def prometheus_metrics(request):
+    # Stage latencies and scrape counters of this process, in the Prometheus text format
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')